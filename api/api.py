@@ -3,36 +3,85 @@
 
 from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel, HttpUrl, field_validator, validator
-from typing import List
+from typing import Any, List, Optional, Dict
 from pathlib import Path
-import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from dotenv import load_dotenv
-import zipfile
-import io
+# 日志等模块在导入时读取环境变量，需要先加载 .env
+load_dotenv()
 from core.blog_parser import BlogParser
-from fastapi.responses import FileResponse as FastAPIFileResponse, StreamingResponse
+from core.base_parser import wait_prefetch
+from core.save_utils import IMAGE_PROFILES, DEFAULT_IMAGE_PROFILE
+from fastapi.responses import FileResponse as FastAPIFileResponse, StreamingResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from core.log_utils import logger
+from core.zip_utils import stream_archive, ARCHIVE_FORMATS
+from core.evict_utils import ArtifactEvictor
+from core.storage_utils import (
+    create_entry_dir, get_entry_dir, migrate_flat_layout, resolve_legacy_path, compact_shard_index, SHARD_DEPTH
+)
+from core.snapshot_utils import has_snapshot
+from core.negative_cache_utils import NegativeCache
+from core.index_utils import ArticleIndex
+from core.pack_utils import PackReader, PACK_EXTENSION
+from core.warmup_utils import Warmup
+from core.timing_utils import collect_timings, describe
+from core.profile_utils import SamplingProfiler
+from core.memory_utils import MemoryTracker
+from core.metrics_utils import (
+    track_request, render_metrics, observe_memory, CACHE_LOOKUPS, ARCHIVE_SECONDS, OUTPUT_BYTES, MEMORY_ALERTS
+)
+from contextlib import ExitStack
 from datetime import datetime
-from urllib.parse import quote, unquote
+from urllib.parse import quote, unquote, urlparse
 import os
-import shutil
 from datetime import datetime
-from apscheduler.schedulers.background import BackgroundScheduler
 import time
-from errors import BlogKeeperError, ServerError, ParseError
+import mimetypes
+import math
+from threading import Lock
+from errors import BlogKeeperError, ServerError, ParseError, SnapshotError, PlatformError, UnsupportedPageError
 from datetime import datetime, timezone, timedelta
 import hashlib
-
-# 加载环境变量
-load_dotenv()
+import hmac
 
 # 获取配置
 API_HOST = os.getenv('API_HOST', '0.0.0.0')
 API_PORT = int(os.getenv('API_PORT', '3102'))
 
+# 缓存清理配置：未访问超过 TTL 的文章目录被清理，总大小超过配额时按最近最少使用顺序清理
+CACHE_TTL_HOURS = float(os.getenv('CACHE_TTL_HOURS', '24'))
+CACHE_MAX_MB = int(os.getenv('CACHE_MAX_MB', '5120'))
+EVICT_INTERVAL_MINUTES = int(os.getenv('EVICT_INTERVAL_MINUTES', '5'))
+
+# 文章元数据索引数据库，不能放在 temp 目录下，否则会被下载接口暴露
+INDEX_DB_PATH = os.getenv('INDEX_DB_PATH', 'data/blogkeeper.db')
+
+# 失败缓存：不支持的域名和解析失败的文章在有效期内直接返回错误，连续失败时有效期指数增长
+NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', '30'))
+NEGATIVE_CACHE_MAX_TTL = int(os.getenv('NEGATIVE_CACHE_MAX_TTL', '3600'))
+
+# 合集打包文件目录（python -m core.pack_utils pack 生成的 <name>.pack）
+PACK_DIR = os.getenv('PACK_DIR', 'packs')
+
+# 单个请求的性能分析：请求带 X-Profile 头或 profile=1 查询参数时生效，需要 PROFILE_ENABLED
+# 为 true，或请求的 X-Admin-Token 头与 ADMIN_TOKEN 一致
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+
+# 请求内存跟踪：开启后用 tracemalloc 记录各阶段的分配峰值（同一时间只跟踪一个请求），
+# 峰值超过 MEMORY_ALERT_MB 时记录警告日志和分配最多的代码位置
+MEMORY_TRACKING = os.getenv('MEMORY_TRACKING', 'false').lower() in ('1', 'true', 'yes')
+MEMORY_ALERT_MB = float(os.getenv('MEMORY_ALERT_MB', '256'))
+
+# 启动预热：预热完成前 /ready 返回 503。WARMUP_HOSTS 为预先建立连接的主机，
+# WARMUP_FORMATS 为示例文章离线渲染的导出格式，为空时跳过对应阶段
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+WARMUP_HOSTS = [host.strip() for host in os.getenv('WARMUP_HOSTS', '').split(',') if host.strip()]
+WARMUP_FORMATS = [fmt.strip() for fmt in os.getenv('WARMUP_FORMATS', 'html,markdown,pdf,mhtml').split(',') if fmt.strip()]
+
 # 从环境变量获取 CORS 配置
 # CORS_ORIGINS = os.getenv('CORS_ORIGINS', '').split(',')
 # logger.info(f"从环境变量读取的 CORS_ORIGINS: {CORS_ORIGINS}")
@@ -50,23 +99,103 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # 明确指定允许的方法
     allow_headers=["*"],  # 允许所有请求头
-    expose_headers=["Content-Disposition"],  # 暴露文件下载所需的头部
+    expose_headers=["Content-Disposition", "Server-Timing", "X-Profile-URL"],  # 暴露文件下载所需的头部、耗时分解和性能分析结果地址
 )
 
 # 创建临时文件目录
 TEMP_PATH = "temp"
 TEMP_DIR = Path(TEMP_PATH)
 TEMP_DIR.mkdir(exist_ok=True)
+# 将旧版本的扁平目录迁移为分片布局 temp/ab/cd/<stable_id>/
+migrate_flat_layout(TEMP_DIR)
 
 DOWNLOAD_DIR = "/download"
 
+# 文章元数据索引
+article_index = ArticleIndex(INDEX_DB_PATH)
+
+# 启动预热任务
+warmup = Warmup(WARMUP_HOSTS, WARMUP_FORMATS, DEFAULT_IMAGE_PROFILE)
+
+# 失败缓存，键为 host:<域名> 或 url:<规范化URL>
+negative_cache = NegativeCache(NEGATIVE_CACHE_TTL, NEGATIVE_CACHE_MAX_TTL)
+
+def check_negative_cache(key):
+    """命中失败缓存时直接返回缓存的错误，Retry-After 为剩余秒数"""
+    cached = negative_cache.get(key)
+    CACHE_LOOKUPS.labels('negative', 'hit' if cached else 'miss').inc()
+    if cached:
+        error, remaining = cached
+        logger.info(f"命中失败缓存: {key}, 剩余 {remaining:.0f} 秒")
+        raise error.to_http_exception(headers={'Retry-After': str(math.ceil(remaining))})
+
+def record_failure(key, error):
+    ttl = negative_cache.record_failure(key, error)
+    logger.info(f"记录失败缓存: {key}, {ttl} 秒")
+
+def on_temp_evict(entry):
+    """文章目录被清理后整理分片索引并删除元数据索引记录"""
+    compact_shard_index(os.path.dirname(entry))
+    article_index.remove_article(os.path.basename(entry))
+
+# 缓存清理器，temp 目录受磁盘配额限制，blog 目录只按 TTL 清理
+temp_evictor = ArtifactEvictor(
+    TEMP_DIR,
+    ttl_seconds=CACHE_TTL_HOURS * 3600,
+    max_bytes=CACHE_MAX_MB * 1024 * 1024,
+    entry_depth=SHARD_DEPTH + 1,
+    on_evict=on_temp_evict
+)
+blog_evictor = ArtifactEvictor(
+    os.path.join(os.path.dirname(__file__), 'blog'),
+    ttl_seconds=CACHE_TTL_HOURS * 3600
+)
+
+class DownloadStaticFiles(StaticFiles):
+    """下载期间占用文章目录，防止正在下载的文件被清理；兼容旧的扁平布局下载地址"""
+
+    def get_path(self, scope):
+        return os.path.normpath(os.path.join(*resolve_legacy_path(scope["path"]).split("/")))
+
+    async def __call__(self, scope, receive, send):
+        entry = None
+        if scope["type"] == "http":
+            entry = temp_evictor.entry_for(os.path.join(str(TEMP_DIR), self.get_path(scope)))
+        with temp_evictor.pin(entry):
+            await super().__call__(scope, receive, send)
+
 # 挂载临时文件目录
-app.mount(DOWNLOAD_DIR, StaticFiles(directory=str(TEMP_DIR)), name="download")
+app.mount(DOWNLOAD_DIR, DownloadStaticFiles(directory=str(TEMP_DIR)), name="download")
+
+# 已打开的打包文件，按文件名缓存
+pack_readers = {}
+pack_readers_lock = Lock()
+
+def get_pack_reader(pack_name):
+    """获取打包文件读取器，打包文件不存在时返回 None"""
+    if os.path.basename(pack_name) != pack_name or not pack_name.endswith(PACK_EXTENSION):
+        return None
+    with pack_readers_lock:
+        reader = pack_readers.get(pack_name)
+        if reader is None:
+            pack_path = os.path.join(PACK_DIR, pack_name)
+            if not os.path.isfile(pack_path):
+                return None
+            reader = PackReader(pack_path)
+            pack_readers[pack_name] = reader
+    # 读取打包后新追加的成员
+    reader.refresh()
+    return reader
 
 class ParseRequest(BaseModel):
     url: HttpUrl
     fileContent: bool
     formats: List[str]
+    imageProfile: str = DEFAULT_IMAGE_PROFILE
+    # 在返回的每个文件中附带本次请求的耗时分解（毫秒）
+    includeTimings: bool = False
+    # 在返回的每个文件中附带本次请求的内存分配峰值（字节），需要服务端开启 MEMORY_TRACKING
+    includeMemory: bool = False
     
     @field_validator('formats')
     def validate_formats(cls, v):
@@ -76,12 +205,21 @@ class ParseRequest(BaseModel):
                 raise ValueError(f'Invalid format: {fmt}. Valid formats are: {valid_formats}')
         return v
 
+    @field_validator('imageProfile')
+    def validate_image_profile(cls, v):
+        if v not in IMAGE_PROFILES:
+            raise ValueError(f'Invalid image profile: {v}. Valid profiles are: {set(IMAGE_PROFILES)}')
+        return v
+
 class FileInfo(BaseModel):
     title: str
     download_url: str
     size: int
     format: str
     file_content: str
+    timings: Optional[Dict[str, float]] = None
+    profile_url: Optional[str] = None
+    memory: Optional[Dict[str, Any]] = None
 
 class BatchDownloadFile(BaseModel):
     url: str
@@ -95,6 +233,7 @@ class BatchDownloadFile(BaseModel):
 
 class BatchDownloadRequest(BaseModel):
     files: List[BatchDownloadFile]
+    archiveFormat: str = 'zip'
 
     @field_validator('files')
     def validate_files(cls, v):
@@ -102,6 +241,57 @@ class BatchDownloadRequest(BaseModel):
             raise ValueError('files list cannot be empty')
         return v
 
+    @field_validator('archiveFormat')
+    def validate_archive_format(cls, v):
+        if v not in ARCHIVE_FORMATS:
+            raise ValueError(f'Invalid archive format: {v}. Valid formats are: {set(ARCHIVE_FORMATS)}')
+        return v
+
+def get_download_url(file_path):
+    """将 temp 目录下的文件路径转换为下载URL"""
+    # 修改下载URL的格式，确保使用正斜杠并进行URL编码，避免 % 等特殊字符导致的服务端403
+    file_path = file_path.replace('\\', '/')
+    # 提取 temp/ 之后的相对路径并进行编码
+    if file_path.startswith(TEMP_PATH + '/'):
+        relative_path = file_path[len(TEMP_PATH) + 1:]
+    else:
+        # 兼容意外情况，尝试按第一个出现的 temp/ 分割
+        parts = file_path.split(TEMP_PATH + '/', 1)
+        relative_path = parts[1] if len(parts) == 2 else file_path
+    encoded_relative = quote(relative_path, safe='/')
+    return f"{DOWNLOAD_DIR}/{encoded_relative}"
+
+def get_cached_file_list(stable_id, formats, image_profile, with_content):
+    """从索引中获取已归档且文件仍然存在的格式
+    Args:
+        stable_id: 文章 stable_id
+        formats: 请求的格式列表
+        image_profile: 请求的图片输出档位
+        with_content: 是否读取文件内容（html、markdown）
+    Returns:
+        tuple: (与 BaseBlogParser.get_file_list 相同结构的缓存文件列表, 需要重新生成的格式列表)
+    """
+    artifacts = article_index.get_artifacts(stable_id)
+    file_list = []
+    missing_formats = []
+    for fmt in formats:
+        artifact = artifacts.get(fmt)
+        if not artifact or artifact['image_profile'] != image_profile or not os.path.isfile(artifact['path']):
+            missing_formats.append(fmt)
+            continue
+        content = ""
+        if with_content and fmt in ('html', 'markdown'):
+            with open(artifact['path'], 'r', encoding='utf-8') as f:
+                content = f.read()
+        file_list.append({
+            "title": os.path.splitext(os.path.basename(artifact['path']))[0],
+            "download_url": artifact['path'],
+            "size": os.path.getsize(artifact['path']),
+            "format": fmt,
+            "file_content": content
+        })
+    return file_list, missing_formats
+
 def get_beijing_time():
     """获取北京时间"""
     utc_now = datetime.now(timezone.utc)
@@ -113,58 +303,70 @@ def get_beijing_time():
 async def batch_download(request: Request, body: BatchDownloadRequest):
     start_time = time.time()
     try:
-        raw_body = await request.body()
-        logger.info(f"原始请求体: {raw_body}")
-        logger.info(f"解析后的请求参数: {body.dict()}")
+        # 不记录原始请求体，只记录文件数量
+        logger.info("批量下载: %d 个文件, 格式: %s", len(body.files), body.archiveFormat)
 
-        # 创建内存中的ZIP文件
-        zip_buffer = io.BytesIO()
         # 获取第一个文件名作为zip文件名
         first_file = body.files[0] if body.files else None
         filename_without_ext = first_file.filename.rsplit('.', 1)[0] if first_file else "blog_content"
-        zip_filename = f"{filename_without_ext}.zip"
-
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for file_info in body.files:
-                # 获取完整的文件路径（客户端传来的URL已编码，这里先解码再还原到本地路径）
-                relative_url_path = unquote(file_info.url[len(DOWNLOAD_DIR):])
-                file_path = TEMP_PATH + relative_url_path
-                logger.info(f"处理文件: URL={file_info.url}, 路径={file_path}, 文件名={file_info.filename}")
-
-                # 获取完整的文件路径
-                full_path = Path(file_path)
-                logger.info(f"完整路径: {full_path}")
 
-                # 检查文件是否存在
-                if not full_path.is_file():
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"文件不存在: {file_info.filename}"
-                    )
-
-                # 将文件添加到ZIP，使用传入的文件名
-                zip_file.write(full_path, file_info.filename)
-                logger.info(f"已添加到ZIP: {file_info.filename}")
-
-        # 将ZIP文件指针移到开头
-        zip_buffer.seek(0)
-
-        logger.info(f"生成ZIP文件: {zip_filename}")
-
-        # 记录处理时间
-        total_time = time.time() - start_time
-        logger.info("=== 批量下载性能统计 ===")
-        logger.info(f"总处理时间: {total_time:.2f}秒")
-
-        # 返回ZIP文件，使用 urllib.parse.quote 处理中文文件名
+        # 先检查所有文件，流式输出开始后就无法再返回错误状态码
+        entries = []
+        for file_info in body.files:
+            # 获取完整的文件路径（客户端传来的URL已编码，这里先解码再还原到本地路径）
+            relative_url_path = resolve_legacy_path(unquote(file_info.url[len(DOWNLOAD_DIR):]))
+            file_path = TEMP_PATH + '/' + relative_url_path
+            logger.info(f"处理文件: URL={file_info.url}, 路径={file_path}, 文件名={file_info.filename}")
+
+            # 获取完整的文件路径
+            full_path = Path(file_path)
+            logger.info(f"完整路径: {full_path}")
+
+            # 检查文件是否存在
+            if not full_path.is_file():
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"文件不存在: {file_info.filename}"
+                )
+
+            # 使用传入的文件名作为压缩包内的文件名
+            entries.append((file_info.filename, str(full_path)))
+
+        # 文本格式并行压缩，已压缩格式直接存储；客户端可以选择 tar.zst
+        archive_stream, archive_format = stream_archive(entries, body.archiveFormat)
+        archive_info = ARCHIVE_FORMATS[archive_format]
+        zip_filename = f"{filename_without_ext}{archive_info['extension']}"
+
+        def generate_zip():
+            archive_bytes = 0
+            try:
+                # 打包期间占用相关文章目录，防止被清理
+                with ExitStack() as stack:
+                    for entry in {temp_evictor.entry_for(path) for _, path in entries}:
+                        stack.enter_context(temp_evictor.pin(entry))
+                    for chunk in archive_stream:
+                        archive_bytes += len(chunk)
+                        yield chunk
+                logger.info(f"生成压缩文件: {zip_filename}")
+            finally:
+                # 记录处理时间（包含流式传输时间）
+                total_time = time.time() - start_time
+                ARCHIVE_SECONDS.labels(archive_format).observe(total_time)
+                OUTPUT_BYTES.labels(archive_format).inc(archive_bytes)
+                logger.info("=== 批量下载性能统计 ===")
+                logger.info(f"总处理时间: {total_time:.2f}秒")
+
+        # 返回流式ZIP文件，使用 urllib.parse.quote 处理中文文件名
         return StreamingResponse(
-            zip_buffer,
-            media_type="application/zip",
+            generate_zip(),
+            media_type=archive_info['media_type'],
             headers={
                 "Content-Disposition": f'attachment; filename*=UTF-8\'\'{quote(zip_filename)}'
             }
         )
 
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"请求参数验证失败: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
@@ -172,15 +374,137 @@ async def batch_download(request: Request, body: BatchDownloadRequest):
         logger.error(f"批量下载失败: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/parse", response_model=List[FileInfo])
-async def parse_blog_api(request: Request, parse_request: ParseRequest):
+@app.post("/parse", response_model=List[FileInfo], response_model_exclude_none=True)
+async def parse_blog_api(request: Request, parse_request: ParseRequest, response: Response):
+    return export_article(request, parse_request, response)
+
+@app.post("/render", response_model=List[FileInfo], response_model_exclude_none=True)
+async def render_blog_api(request: Request, parse_request: ParseRequest, response: Response):
+    """从已归档文章的快照生成新的格式，不请求原站"""
+    return export_article(request, parse_request, response, snapshot_only=True)
+
+def profiling_requested(request):
+    """请求是否要求性能分析
+    Raises:
+        HTTPException: 要求性能分析但未启用且管理员令牌无效时返回 403
+    """
+    flag = request.headers.get('X-Profile') or request.query_params.get('profile')
+    if not flag or flag.lower() in ('0', 'false', 'no'):
+        return False
+    if PROFILE_ENABLED:
+        return True
+    token = request.headers.get('X-Admin-Token', '')
+    if ADMIN_TOKEN and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        return True
+    raise HTTPException(status_code=403, detail="性能分析未启用或管理员令牌无效")
+
+def check_memory(memory, endpoint, platform, parse_request):
+    """记录请求的内存分配峰值，超过 MEMORY_ALERT_MB 时记录警告"""
+    observe_memory(platform, memory)
+    if memory['peak'] <= MEMORY_ALERT_MB * 1024 * 1024:
+        return
+    MEMORY_ALERTS.labels(endpoint, platform).inc()
+    stages = ', '.join(f"{stage}={peak / 1024 / 1024:.1f}MB" for stage, peak in memory['stages'].items())
+    sites = ', '.join(f"{site['site']}={site['size'] / 1024 / 1024:.1f}MB" for site in memory['top_sites'][:5])
+    logger.warning(
+        f"请求内存峰值超过 {MEMORY_ALERT_MB:g}MB: {memory['peak'] / 1024 / 1024:.1f}MB, "
+        f"url={parse_request.url}, 格式={parse_request.formats}, 阶段: {stages}, 分配位置: {sites}",
+        extra={'memory_peak': memory['peak'], 'url': str(parse_request.url), 'platform': platform}
+    )
+
+def export_article(request, parse_request, response, snapshot_only=False):
+    """生成文章的请求格式：已归档的格式直接使用缓存，有快照时从快照渲染缺少的格式，否则解析原文
+    Args:
+        request: 请求对象
+        parse_request: 请求参数
+        response: 响应对象，写入 Server-Timing 头
+        snapshot_only: 只从快照渲染，快照不存在时返回 404
+    Returns:
+        list: FileInfo 列表
+    """
+    profile = profiling_requested(request)
+    with track_request('render' if snapshot_only else 'parse') as labels, collect_timings() as timings:
+        # 只采样处理该请求的线程
+        profiler = SamplingProfiler(timings.get_threads, PROFILE_INTERVAL_MS / 1000).start() if profile else None
+        memory = MemoryTracker.start() if MEMORY_TRACKING else None
+        try:
+            files, output_dir = _export_article(request, parse_request, snapshot_only, labels)
+        except HTTPException as e:
+            labels['status'] = str(e.status_code)
+            raise
+        finally:
+            if profiler:
+                profiler.stop()
+            if memory:
+                memory_report = memory.stop().to_dict()
+                check_memory(memory_report, 'render' if snapshot_only else 'parse', labels['platform'], parse_request)
+        labels['status'] = '200'
+
+        if memory and parse_request.includeMemory:
+            for file_info in files:
+                file_info.memory = memory_report
+
+        # 性能分析结果保存在文章目录的 profiles 下，通过下载地址返回
+        if profiler:
+            with temp_evictor.pin(str(output_dir)):
+                profile_name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.collapsed.txt"
+                profile_path = profiler.save(os.path.join(str(output_dir), 'profiles', profile_name))
+            if profile_path:
+                profile_url = get_download_url(profile_path)
+                response.headers['X-Profile-URL'] = profile_url
+                for file_info in files:
+                    file_info.profile_url = profile_url
+
+        # 本次请求的耗时分解：fetch、parse、extract、css、images、render_<格式>
+        response.headers['Server-Timing'] = timings.to_header()
+        response.headers['Timing-Allow-Origin'] = '*'
+        if parse_request.includeTimings:
+            breakdown = timings.to_dict()
+            for file_info in files:
+                file_info.timings = breakdown
+        return files
+
+def _export_article(request, parse_request, snapshot_only, labels):
+    """export_article 的实现，labels 为监控指标标签，解析到平台后设置 platform
+    Returns:
+        tuple: (FileInfo 列表, 文章目录)
+    """
     start_time = time.time()
     try:
+        # 不支持的域名直接返回缓存的错误，不再构建解析器
+        request_url = str(parse_request.url)
+        host_key = f"host:{urlparse(request_url).hostname}"
+        check_negative_cache(host_key)
+        blog_parser = BlogParser()
+        try:
+            platform_parser = blog_parser.resolve_parser(request_url)
+        except PlatformError as e:
+            record_failure(host_key, e)
+            raise
+        except UnsupportedPageError as e:
+            # 域名受支持，只缓存该页面的失败，不影响同一平台的其他文章
+            page_key = f"url:{blog_parser.canonicalize_url(request_url)}"
+            check_negative_cache(page_key)
+            record_failure(page_key, e)
+            raise
+
+        labels['platform'] = platform_parser.platform_flag
+
+        # 按平台规则规范化URL，同一篇文章的不同分享链接使用同一个缓存条目
+        url = platform_parser.canonicalize_url(request_url)
+        url_key = f"url:{url}"
+        check_negative_cache(url_key)
+
         # 创建输出目录
-        # 使用稳定的 SHA-256 对 URL 做摘要，避免内置 hash() 的随机化导致目录不稳定
-        stable_id = hashlib.sha256(str(parse_request.url).encode('utf-8')).hexdigest()[:16]
-        output_dir = TEMP_DIR / stable_id
-        output_dir.mkdir(exist_ok=True)
+        # 使用稳定的 SHA-256 对规范化后的 URL 做摘要，避免内置 hash() 的随机化导致目录不稳定
+        stable_id = hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]
+        # 按 stable_id 分片存放：temp/ab/cd/<stable_id>
+        if snapshot_only:
+            output_dir = Path(get_entry_dir(TEMP_DIR, stable_id))
+            if not has_snapshot(output_dir):
+                raise SnapshotError(f"文章快照不存在: {url}")
+        else:
+            output_dir = Path(create_entry_dir(TEMP_DIR, stable_id, url))
 
         # 格式映射
         format_mapping = {
@@ -194,46 +518,71 @@ async def parse_blog_api(request: Request, parse_request: ParseRequest):
         client_host = request.client.host if request.client else "unknown"
         logger.info(f"请求的时间: {get_beijing_time().strftime('%Y-%m-%d %H:%M:%S')}")
         logger.info(f"请求的IP地址: {client_host}")
-        logger.info(f"请求的原始地址: {parse_request.url}")
+        logger.info(f"请求的原始地址: {request_url}")
+        logger.info(f"规范化后的地址: {url}")
 
         # 转换格式名称
         formats = [format_mapping.get(fmt, fmt) for fmt in parse_request.formats]
         logger.info(f"请求的原始格式: {parse_request.formats}")
         logger.info(f"转换后的格式: {formats}")
+        logger.info(f"图片输出档位: {parse_request.imageProfile}")
 
         # 是否返回文件内容
         file_content = parse_request.fileContent
 
         # 准备保存选项
         save_options = {
-            'formats': formats
+            'formats': formats,
+            'image_profile': parse_request.imageProfile,
+            'index': article_index,
+            'article_id': stable_id,
+            'request_url': request_url,
+            'snapshot_dir': str(output_dir)
         }
 
-        # 创建解析器并解析博客
-        parser = BlogParser()
         parse_start = time.time()
-        success = parser.parse(str(parse_request.url), str(output_dir), save_options)
+        # 写入期间占用文章目录，防止被清理
+        with temp_evictor.pin(str(output_dir)):
+            # 已经归档过的格式直接使用缓存，只生成缺少的格式
+            file_list, missing_formats = get_cached_file_list(
+                stable_id, formats, parse_request.imageProfile, file_content
+            )
+            if not missing_formats:
+                logger.info(f"命中文章缓存: {stable_id}")
+                CACHE_LOOKUPS.labels('article', 'hit').inc()
+                describe('source', 'cache')
+            else:
+                CACHE_LOOKUPS.labels('article', 'miss').inc()
+                save_options['formats'] = missing_formats
+                if has_snapshot(output_dir):
+                    # 已有文章快照时只需渲染，不请求原站
+                    logger.info(f"从文章快照渲染: {missing_formats}")
+                    CACHE_LOOKUPS.labels('snapshot', 'hit').inc()
+                    describe('source', 'snapshot')
+                    success = blog_parser.render(str(output_dir), save_options)
+                else:
+                    # 解析博客，失败时记录失败缓存，短时间内的重复请求不再请求原站
+                    CACHE_LOOKUPS.labels('snapshot', 'miss').inc()
+                    describe('source', 'origin')
+                    try:
+                        success = blog_parser.parse(url, str(output_dir), save_options)
+                        if not success:
+                            raise ParseError("博客解析失败")
+                    except BlogKeeperError as e:
+                        record_failure(url_key, e)
+                        raise
+                    negative_cache.clear(url_key)
+                logger.info(f"博客解析状态: {success}")
+                file_list = file_list + blog_parser.get_file_list()
         parse_time = time.time() - parse_start
-        logger.info(f"博客解析状态: {success}")
 
         # 获取文件列表
         files = []
-        file_list = parser.get_file_list()
 
         # 只返回请求的格式
         for file_info in file_list:
             if file_info['format'] in formats:
-                # 修改下载URL的格式，确保使用正斜杠并进行URL编码，避免 % 等特殊字符导致的服务端403
-                file_path = file_info["download_url"].replace('\\', '/')
-                # 提取 temp/ 之后的相对路径并进行编码
-                if file_path.startswith(TEMP_PATH + '/'):
-                    relative_path = file_path[len(TEMP_PATH) + 1:]
-                else:
-                    # 兼容意外情况，尝试按第一个出现的 temp/ 分割
-                    parts = file_path.split(TEMP_PATH + '/', 1)
-                    relative_path = parts[1] if len(parts) == 2 else file_path
-                encoded_relative = quote(relative_path, safe='/')
-                file_info['download_url'] = f"{DOWNLOAD_DIR}/{encoded_relative}"
+                file_info['download_url'] = get_download_url(file_info["download_url"])
 
                 if not file_content:
                     file_info['file_content'] = ""
@@ -248,46 +597,116 @@ async def parse_blog_api(request: Request, parse_request: ParseRequest):
         logger.info(f"内容解析时间: {parse_time:.2f}秒")
         logger.info(f"最终返回的文件列表: {files}")
 
-        return files
+        return files, output_dir
 
+    except HTTPException:
+        raise
     except BlogKeeperError as e:
         logger.error(f"博客解析失败: {e.message}")
         raise e.to_http_exception()
     except Exception as e:
         raise ParseError(message="未知错误").to_http_exception()
 
-# 定义清理函数
-def cleanup_directories():
+@app.get("/articles")
+async def list_articles(platform: str = None, author: str = None, limit: int = 100, offset: int = 0):
+    """按平台、作者查询已归档的文章"""
+    limit = max(1, min(limit, 1000))
+    articles = article_index.list_articles(platform, author, limit, max(0, offset))
+    for article in articles:
+        article['artifacts'] = article_index.get_artifacts(article['id'])
+    return articles
+
+@app.get("/search")
+async def search_articles(q: str, platform: str = None, limit: int = 20, offset: int = 0):
+    """全文检索已归档的文章（标题、作者、正文），按相关度返回摘要和下载地址"""
+    start_time = time.time()
+    limit = max(1, min(limit, 100))
+    results = article_index.search(q, platform, limit, max(0, offset))
+    for article in results:
+        artifacts = article_index.get_artifacts(article['id'])
+        article['files'] = [
+            {
+                'format': artifact['format'],
+                'size': artifact['size'],
+                'download_url': get_download_url(artifact['path'])
+            }
+            for artifact in artifacts.values()
+        ]
+    logger.info(f"全文检索: {q}, 结果数: {len(results)}, 耗时: {(time.time() - start_time) * 1000:.1f}毫秒")
+    return results
+
+@app.get("/pack/{pack_name}/{member:path}")
+async def download_pack_member(pack_name: str, member: str):
+    """直接从打包文件中读取单个成员，不需要解包"""
     try:
-        # 获取当前时间
-        now = get_beijing_time()
-        print(f"开始清理目录... {now}")
-
-        # 清理temp目录
-        temp_dir = os.path.join(os.path.dirname(__file__), 'temp')
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-            os.makedirs(temp_dir)
-            print(f"已清理temp目录: {temp_dir}")
-
-        # 清理blog目录
-        blog_dir = os.path.join(os.path.dirname(__file__), 'blog')
-        if os.path.exists(blog_dir):
-            shutil.rmtree(blog_dir)
-            os.makedirs(blog_dir)
-            print(f"已清理blog目录: {blog_dir}")
+        reader = get_pack_reader(pack_name)
+    except ValueError as e:
+        logger.error(f"打开打包文件失败 {pack_name}: {str(e)}")
+        reader = None
+    if reader is None or member not in reader.members:
+        raise HTTPException(status_code=404, detail=f"文件不存在: {pack_name}/{member}")
+
+    size = reader.members[member]['size']
+    media_type = mimetypes.guess_type(member)[0] or 'application/octet-stream'
+    encoded_filename = quote(os.path.basename(member))
+    return StreamingResponse(
+        reader.iter_chunks(member),
+        media_type=media_type,
+        headers={
+            'Content-Length': str(size),
+            'Content-Disposition': f"inline; filename*=UTF-8''{encoded_filename}"
+        }
+    )
 
-    except Exception as e:
-        print(f"清理目录时出错: {str(e)}")
-
-# 创建调度器
-scheduler = BackgroundScheduler()
-# 添加定时任务，每天凌晨12:00执行
-scheduler.add_job(cleanup_directories, 'cron', hour=0, minute=0)
-# 添加测试用的定时任务，每分钟执行一次（仅在测试时启用）
-# scheduler.add_job(cleanup_directories, 'interval', minutes=1)
-# 启动调度器
-scheduler.start()
+# 定义清理函数
+def cleanup_directories():
+    """增量清理过期或超出配额的文章目录"""
+    temp_evictor.run_once()
+    blog_evictor.run_once()
+
+# 定时清理调度器，在服务启动时创建，只导入模块（如命令行工具、基准测试）时不会启动后台线程
+scheduler = None
+
+@app.on_event("startup")
+def start_scheduler():
+    global scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+    scheduler = BackgroundScheduler()
+    # 添加定时任务，定期增量清理缓存
+    scheduler.add_job(cleanup_directories, 'interval', minutes=EVICT_INTERVAL_MINUTES, max_instances=1, coalesce=True)
+    scheduler.start()
+
+@app.on_event("startup")
+def start_warmup():
+    if WARMUP_ENABLED:
+        warmup.start()
+    else:
+        warmup.skip()
+
+@app.get("/ready")
+async def ready():
+    """就绪检查：启动预热完成后返回 200，之前返回 503"""
+    report = warmup.report()
+    if not report['ready']:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus 监控指标"""
+    data, content_type = render_metrics()
+    return Response(content=data, headers={'Content-Type': content_type})
+
+@app.on_event("shutdown")
+def stop_scheduler():
+    if scheduler:
+        scheduler.shutdown(wait=False)
+
+@app.on_event("shutdown")
+def finish_prefetch():
+    """等待后台快照图片预取完成，避免快照缺少图片"""
+    if not wait_prefetch(timeout=30):
+        logger.warning("后台快照图片预取未在关闭前完成")
 
 # 启动服务器
 if __name__ == "__main__":
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""批量下载压缩包性能测试
+
+生成 100 篇文章的混合格式文件（html、md、mhtml、pdf、png），对比：
+    1. 旧实现：zipfile 在内存中对所有文件串行 deflate
+    2. stream_zip 单线程
+    3. stream_zip 多线程（已压缩格式直接存储，文本格式并行压缩）
+    4. tar.zst（需要安装 zstandard）
+
+用法：
+    python benchmarks/bench_archive.py [--articles 100] [--repeat 3]
+"""
+
+import argparse
+import base64
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.zip_utils import stream_zip, stream_tar_zst, zstd_available
+
+WORDS = [
+    '博客', '文章', '性能', '优化', '压缩', '服务器', 'python', 'fastapi', 'html', 'markdown',
+    'div', 'class', 'content', 'article', '图片', '缓存', '线程', '进程', '请求', '响应',
+]
+
+def _text(rng, size):
+    """生成接近真实文章压缩率的文本"""
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        length += len(word.encode('utf-8')) + 1
+    return ' '.join(parts).encode('utf-8')[:size]
+
+def create_articles(root, count, seed=42):
+    """生成测试文件，返回 (压缩包内文件名, 路径) 列表"""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        name = f"文章{i:03d}-作者-CSDN-2025-01-01"
+        files = {
+            '.html': _text(rng, rng.randint(100, 400) * 1024),
+            '.md': _text(rng, rng.randint(20, 80) * 1024),
+        }
+        # 一部分文章同时导出 mhtml 和 pdf，图片数据本身不可压缩
+        if i % 2 == 0:
+            image = rng.randbytes(rng.randint(200, 800) * 1024)
+            files['.mhtml'] = _text(rng, 100 * 1024) + base64.encodebytes(image)
+        if i % 3 == 0:
+            files['.pdf'] = rng.randbytes(rng.randint(300, 1500) * 1024)
+        if i % 5 == 0:
+            files['.png'] = rng.randbytes(rng.randint(100, 500) * 1024)
+        for ext, data in files.items():
+            path = os.path.join(root, name + ext)
+            with open(path, 'wb') as f:
+                f.write(data)
+            entries.append((name + ext, path))
+    return entries
+
+def legacy_zip(entries):
+    """旧实现：在内存中构建完整ZIP"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for arcname, path in entries:
+            zip_file.write(path, arcname)
+    return buffer.getbuffer().nbytes
+
+def consume(stream):
+    """消费生成器，返回输出字节数"""
+    return sum(len(chunk) for chunk in stream)
+
+def measure(func, repeat):
+    """返回最佳墙钟时间、对应CPU时间和输出大小"""
+    best = None
+    for _ in range(repeat):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        size = func()
+        result = (time.perf_counter() - wall_start, time.process_time() - cpu_start, size)
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='批量下载压缩包性能测试')
+    parser.add_argument('--articles', type=int, default=100, help='文章数量')
+    parser.add_argument('--repeat', type=int, default=3, help='每种方式重复次数，取最快一次')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bench_archive_')
+    try:
+        entries = create_articles(root, args.articles)
+        total = sum(os.path.getsize(path) for _, path in entries)
+        print(f"文件数: {len(entries)}, 原始大小: {total / 1024 / 1024:.1f} MiB, CPU核数: {os.cpu_count()}")
+
+        cases = [
+            ('zipfile 内存串行(旧)', lambda: legacy_zip(entries)),
+            ('stream_zip 单线程', lambda: consume(stream_zip(entries, max_workers=1))),
+            ('stream_zip 并行', lambda: consume(stream_zip(entries))),
+        ]
+        if zstd_available():
+            cases.append(('tar.zst 多线程', lambda: consume(stream_tar_zst(entries))))
+        else:
+            print("未安装 zstandard，跳过 tar.zst")
+
+        print(f"{'方式':<24}{'墙钟(秒)':>10}{'CPU(秒)':>10}{'大小(MiB)':>12}")
+        for label, func in cases:
+            wall, cpu, size = measure(func, args.repeat)
+            print(f"{label:<24}{wall:>10.2f}{cpu:>10.2f}{size / 1024 / 1024:>12.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
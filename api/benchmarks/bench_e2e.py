@@ -0,0 +1,387 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""离线端到端性能测试
+
+启动本地替身服务器（fixture_server.py，可设置延迟和带宽），通过 ORIGIN_OVERRIDE 将所有原站请求
+转到替身服务器，对每个平台的示例文章分别测试：
+    parser  在子进程中直接调用 BlogParser.parse
+    api     启动 uvicorn 子进程，请求 /parse 接口
+每种模式的每种格式使用独立的子进程和临时工作目录，每次请求使用不同的文章 ID，不会命中缓存。
+统计各平台的吞吐量、p50/p95 延迟、CPU 时间，以及子进程的 CPU 时间和峰值 RSS，
+结果以 JSON 写入 --output，便于对比不同版本。子进程资源占用通过 os.wait4 读取，只支持 Linux 和 macOS。
+
+用法：
+    python benchmarks/bench_e2e.py [--modes parser,api] [--formats html,md,pdf,mhtml] [--platforms CSDN,简书]
+        [--iterations 5] [--warmup 1] [--concurrency 1] [--latency-ms 50] [--bandwidth-kbps 0]
+        [--warc DIR] [--output bench_e2e.json]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+from benchmarks.fixture_server import FIXTURES, start_server
+
+MODES = ['parser', 'api']
+# 接口的格式名称，parser 模式中 md 对应 markdown
+FORMATS = ['html', 'md', 'pdf', 'mhtml']
+FORMAT_NAMES = {'md': 'markdown'}
+
+# 等待 API 服务就绪的最长时间（秒）
+SERVER_START_TIMEOUT = 60
+
+def percentile(values, p):
+    """最近秩百分位数"""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(p / 100 * len(ordered)) - 1, 0)]
+
+def summarize(latencies, percentiles=(50, 95)):
+    """延迟统计（毫秒）"""
+    if not latencies:
+        return None
+    result = {f"p{p}": round(percentile(latencies, p) * 1000, 1) for p in percentiles}
+    result['mean'] = round(sum(latencies) / len(latencies) * 1000, 1)
+    result['max'] = round(max(latencies) * 1000, 1)
+    return result
+
+def run_load(func, ids, concurrency):
+    """并发执行 func(id)
+    Returns:
+        tuple: (成功请求的延迟列表, 失败数, 墙钟时间)
+    """
+    def timed(article_id):
+        start = time.perf_counter()
+        try:
+            ok = func(article_id)
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, ids))
+    wall = time.perf_counter() - start
+    return [seconds for ok, seconds in results if ok], sum(1 for ok, _ in results if not ok), wall
+
+def measure_platform(fixture, func, ids, warmup, concurrency, cpu_seconds):
+    """测试一个平台：先预热，再统计
+    Args:
+        func: 处理一篇文章，返回是否成功
+        ids: 文章 ID 生成器
+        cpu_seconds: 返回被测进程累计 CPU 时间的函数
+    """
+    run_load(func, [next(ids) for _ in range(warmup)], concurrency)
+    cpu_start = cpu_seconds()
+    latencies, errors, wall = run_load(func, [next(ids) for _ in range(fixture['iterations'])], concurrency)
+    cpu = cpu_seconds() - cpu_start
+    return {
+        'platform': fixture['platform'],
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': round(wall, 3),
+        'throughput': round(len(latencies) / wall, 3) if wall else None,
+        'latency_ms': summarize(latencies),
+        'cpu_seconds': round(cpu, 3),
+    }
+
+def _fixture_url(fixture, article_id):
+    return fixture['url'].format(id=article_id)
+
+def run_parser_worker(args):
+    """parser 模式的子进程：在当前进程中调用 BlogParser.parse，结果写入 --result-file"""
+    from core.blog_parser import BlogParser
+    from core.save_utils import DEFAULT_IMAGE_PROFILE
+
+    output_dir = os.path.join(os.getcwd(), 'output')
+    save_options = {'formats': [FORMAT_NAMES.get(args.format, args.format)], 'image_profile': DEFAULT_IMAGE_PROFILE}
+    ids = itertools.count(1)
+    rows = []
+    for fixture in selected_fixtures(args):
+        def parse(article_id):
+            return BlogParser().parse(_fixture_url(fixture, article_id), output_dir, dict(save_options))
+        rows.append(measure_platform(fixture, parse, ids, args.warmup, args.concurrency, time.process_time))
+
+    with open(args.result_file, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def reap_process(proc, timeout=None):
+    """等待子进程退出，用 wait4 回收以读取其资源占用，超时后结束子进程
+    Returns:
+        dict: 退出码、CPU 时间和峰值 RSS
+    """
+    deadline = None if timeout is None else time.time() + timeout
+    while True:
+        pid, status, usage = os.wait4(proc.pid, 0 if deadline is None else os.WNOHANG)
+        if pid:
+            break
+        if time.time() > deadline:
+            proc.kill()
+            deadline = None
+        time.sleep(0.1)
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # Linux 的 ru_maxrss 单位为 KB，macOS 为字节
+    peak_rss = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return {
+        'exit_code': proc.returncode,
+        'cpu_seconds': round(usage.ru_utime + usage.ru_stime, 3),
+        'peak_rss_mb': round(peak_rss / 1024 / 1024, 1),
+    }
+
+def child_env(origin):
+    """被测子进程的环境变量：原站请求转到替身服务器"""
+    env = dict(os.environ)
+    env['ORIGIN_OVERRIDE'] = origin
+    env['PYTHONPATH'] = API_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    # 关闭启动预热和多进程指标，避免影响测量
+    env['WARMUP_ENABLED'] = 'false'
+    env.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    env.pop('WARC_MODE', None)
+    return env
+
+def run_parser(args, fmt, origin, workdir):
+    """在子进程中运行 parser 模式"""
+    result_file = os.path.join(workdir, 'result.json')
+    cmd = [
+        sys.executable, os.path.abspath(__file__), '--worker', '--format', fmt,
+        '--platforms', ','.join(args.platforms), '--iterations', str(args.iterations),
+        '--warmup', str(args.warmup), '--concurrency', str(args.concurrency), '--result-file', result_file,
+    ]
+    if args.all:
+        cmd.append('--all')
+    with open(os.path.join(workdir, 'worker.log'), 'wb') as log:
+        proc = subprocess.Popen(cmd, cwd=workdir, env=child_env(origin), stdout=log, stderr=subprocess.STDOUT)
+        process = reap_process(proc)
+    if process['exit_code'] != 0 or not os.path.exists(result_file):
+        raise RuntimeError(f"parser 子进程失败，日志: {os.path.join(workdir, 'worker.log')}")
+    with open(result_file, 'r', encoding='utf-8') as f:
+        return json.load(f), process
+
+class ApiServer:
+    """在 uvicorn 子进程中运行的 API 服务，工作目录下保存 temp、data、logs 和 server.log"""
+
+    def __init__(self, workdir, origin, workers=1):
+        """初始化
+        Args:
+            workdir: 服务的工作目录
+            origin: 替身服务器地址
+            workers: uvicorn worker 进程数，多于 1 个时通过 PROMETHEUS_MULTIPROC_DIR 汇总指标
+        """
+        self.workdir = workdir
+        self.origin = origin
+        self.workers = workers
+        self.base_url = None
+        self.proc = None
+        self._log = None
+
+    def start(self, timeout=SERVER_START_TIMEOUT):
+        """启动服务并等待 /ready 返回 200"""
+        import requests
+
+        port = free_port()
+        self.base_url = f"http://127.0.0.1:{port}"
+        cmd = [
+            sys.executable, '-m', 'uvicorn', 'api:app', '--app-dir', API_DIR,
+            '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--workers', str(self.workers),
+        ]
+        env = child_env(self.origin)
+        if self.workers > 1:
+            env['PROMETHEUS_MULTIPROC_DIR'] = os.path.join(self.workdir, 'metrics')
+            os.makedirs(env['PROMETHEUS_MULTIPROC_DIR'], exist_ok=True)
+        log_path = os.path.join(self.workdir, 'server.log')
+        self._log = open(log_path, 'wb')
+        self.proc = subprocess.Popen(cmd, cwd=self.workdir, env=env, stdout=self._log, stderr=subprocess.STDOUT)
+
+        deadline = time.time() + timeout
+        while True:
+            # 不能用 poll() 检查，poll() 回收子进程后无法再读取资源占用
+            if os.wait4(self.proc.pid, os.WNOHANG)[0]:
+                self.proc.returncode = -1
+                self.stop()
+                raise RuntimeError(f"API 服务启动失败，日志: {log_path}")
+            try:
+                if requests.get(f"{self.base_url}/ready", timeout=1).status_code == 200:
+                    return self
+            except requests.ConnectionError:
+                pass
+            if time.time() > deadline:
+                self.stop()
+                raise RuntimeError("等待 API 服务就绪超时")
+            time.sleep(0.2)
+
+    def stop(self):
+        """停止服务
+        Returns:
+            dict: 主进程的退出码、CPU 时间和峰值 RSS，服务已经退出时返回 None
+        """
+        process = None
+        if self.proc and self.proc.returncode is None:
+            os.kill(self.proc.pid, signal.SIGINT)
+            process = reap_process(self.proc, timeout=30)
+        if self._log:
+            self._log.close()
+            self._log = None
+        return process
+
+def _server_cpu_seconds(session, base_url):
+    """API 服务进程累计 CPU 时间，来自 /metrics 的 process_cpu_seconds_total（只支持 Linux）"""
+    response = session.get(f"{base_url}/metrics", timeout=10)
+    for line in response.text.splitlines():
+        if line.startswith('process_cpu_seconds_total '):
+            return float(line.split()[1])
+    return 0.0
+
+def run_api(args, fmt, origin, workdir):
+    """启动 uvicorn 子进程，通过 /parse 接口测试"""
+    import requests
+
+    server = ApiServer(workdir, origin).start()
+    base_url = server.base_url
+    session = requests.Session()
+    try:
+        ids = itertools.count(1)
+        rows = []
+        for fixture in selected_fixtures(args):
+            def parse(article_id):
+                response = session.post(f"{base_url}/parse", json={
+                    'url': _fixture_url(fixture, article_id), 'formats': [fmt], 'fileContent': False,
+                }, timeout=300)
+                return response.status_code == 200
+            rows.append(measure_platform(
+                fixture, parse, ids, args.warmup, args.concurrency, lambda: _server_cpu_seconds(session, base_url)
+            ))
+    finally:
+        session.close()
+        process = server.stop()
+    return rows, process
+
+def selected_fixtures(args):
+    fixtures = []
+    for fixture in FIXTURES:
+        if args.platforms and fixture['platform'] not in args.platforms:
+            continue
+        if fixture.get('slow') and not (args.all or fixture['platform'] in args.platforms):
+            continue
+        fixtures.append(dict(fixture, iterations=args.iterations))
+    return fixtures
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=API_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_report(runs):
+    print(f"\n{'模式':<8}{'格式':<7}{'平台':<14}{'成功/总数':>10}{'吞吐(篇/秒)':>12}{'p50(ms)':>10}{'p95(ms)':>10}{'CPU(秒)':>9}")
+    for run in runs:
+        for row in run['platforms']:
+            latency = row['latency_ms'] or {}
+            print(
+                f"{run['mode']:<8}{run['format']:<7}{row['platform']:<14}"
+                f"{row['requests'] - row['errors']:>5}/{row['requests']:<4}"
+                f"{row['throughput'] or 0:>12.2f}{latency.get('p50', float('nan')):>10.1f}"
+                f"{latency.get('p95', float('nan')):>10.1f}{row['cpu_seconds']:>9.2f}"
+            )
+        process = run['process']
+        print(f"{'':<15}进程 CPU {process['cpu_seconds']} 秒，峰值 RSS {process['peak_rss_mb']} MB")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='离线端到端性能测试')
+    parser.add_argument('--modes', default=','.join(MODES), help='测试模式：parser、api')
+    parser.add_argument('--formats', default=','.join(FORMATS), help='导出格式：html、md、pdf、mhtml')
+    parser.add_argument('--platforms', default='', help='只测试这些平台（名称见 fixture_server.FIXTURES），默认全部')
+    parser.add_argument('--all', action='store_true', help='包括解析器自身有随机等待的平台')
+    parser.add_argument('--iterations', type=int, default=5, help='每个平台统计的请求数')
+    parser.add_argument('--warmup', type=int, default=1, help='每个平台不计入统计的预热请求数')
+    parser.add_argument('--concurrency', type=int, default=1, help='并发请求数')
+    parser.add_argument('--latency-ms', type=float, default=50, help='替身服务器每个响应的首字节延迟（毫秒）')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='替身服务器每个响应的带宽（KB/s），0 为不限速')
+    parser.add_argument('--warc', help='替身服务器优先回放的 WARC 目录（WARC_MODE=record 录制）')
+    parser.add_argument('--output', default='bench_e2e.json', help='JSON 报告路径')
+    parser.add_argument('--keep', action='store_true', help='保留临时工作目录（输出文件和日志）')
+    # 子进程参数
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--format', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    args.formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    args.platforms = [name.strip() for name in args.platforms.split(',') if name.strip()]
+    for mode in args.modes:
+        if mode not in MODES:
+            parser.error(f"不支持的模式: {mode}")
+    for fmt in args.formats:
+        if fmt not in FORMATS:
+            parser.error(f"不支持的格式: {fmt}")
+    return args
+
+def main():
+    args = parse_args()
+    if args.worker:
+        run_parser_worker(args)
+        return
+
+    fixtures = selected_fixtures(args)
+    if not fixtures:
+        print("没有要测试的平台")
+        sys.exit(1)
+
+    server, origin = start_server(latency_ms=args.latency_ms, bandwidth_kbps=args.bandwidth_kbps, warc_dir=args.warc)
+    root = tempfile.mkdtemp(prefix='bench_e2e_')
+    print(f"替身服务器: {origin}，平台: {[fixture['platform'] for fixture in fixtures]}，工作目录: {root}")
+
+    started = datetime.now().isoformat(timespec='seconds')
+    runs = []
+    try:
+        for mode, fmt in itertools.product(args.modes, args.formats):
+            workdir = os.path.join(root, f"{mode}-{fmt}")
+            os.makedirs(workdir)
+            print(f"测试 {mode} {fmt} ...", flush=True)
+            rows, process = (run_parser if mode == 'parser' else run_api)(args, fmt, origin, workdir)
+            runs.append({'mode': mode, 'format': fmt, 'process': process, 'platforms': rows})
+    finally:
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'started': started,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'system': f"{platform.system()} {platform.machine()}",
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'iterations': args.iterations, 'warmup': args.warmup, 'concurrency': args.concurrency,
+            'latency_ms': args.latency_ms, 'bandwidth_kbps': args.bandwidth_kbps, 'warc': args.warc,
+        },
+        'runs': runs,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_report(runs)
+    print(f"\n报告已写入 {args.output}")
+
+if __name__ == '__main__':
+    main()
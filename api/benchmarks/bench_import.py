@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""启动导入耗时测试
+
+在独立的子进程中运行 python -X importtime，分别统计 API 服务（import api）和
+命令行工具（import main）的模块导入耗时，多次运行取最小值，并列出耗时最多的模块。
+
+用法：
+    python benchmarks/bench_import.py [--repeat 5] [--top 15]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    ('API', 'api'),
+    ('CLI', 'main'),
+]
+
+def measure(module):
+    """运行一次导入
+    Returns:
+        tuple: (总耗时微秒, [(直接依赖模块, 累计耗时微秒)])
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=API_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+
+    # 输出按导入完成的顺序排列，子模块在父模块之前，缩进表示嵌套层级
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        cumulative = int(parts[1])
+        depth = (len(parts[2]) - len(parts[2].lstrip())) // 2
+        name = parts[2].strip()
+        if depth == 1:
+            children.append((name, cumulative))
+        elif depth == 0:
+            if name == module:
+                return cumulative, children
+            # 解释器启动时导入的模块（site 等）不计入
+            children = []
+    raise RuntimeError(f"没有找到 {module} 的导入记录")
+
+def main():
+    parser = argparse.ArgumentParser(description='启动导入耗时测试')
+    parser.add_argument('--repeat', type=int, default=5, help='每个入口的运行次数，取最小值')
+    parser.add_argument('--top', type=int, default=15, help='列出耗时最多的模块数量')
+    args = parser.parse_args()
+
+    for label, module in TARGETS:
+        runs = [measure(module) for _ in range(args.repeat)]
+        totals = sorted(total for total, _ in runs)
+        total, children = min(runs, key=lambda run: run[0])
+
+        print(f"\n{label}: import {module}")
+        print(f"  最小 {totals[0] / 1000:.1f} ms, 中位数 {totals[len(totals) // 2] / 1000:.1f} ms ({args.repeat} 次)")
+
+        # 直接依赖（第二层）的累计耗时，对应入口模块导入的各个包
+        direct = sorted(children, key=lambda item: item[1], reverse=True)
+        print("  耗时最多的直接依赖:")
+        for name, cumulative in direct[:args.top]:
+            print(f"    {cumulative / 1000:8.1f} ms  {cumulative * 100 / total:5.1f}%  {name}")
+
+if __name__ == '__main__':
+    main()
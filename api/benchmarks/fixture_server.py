@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""基准测试的本地替身服务器
+
+代替 CSDN、微信公众号、博客园等原站返回固定的页面、CSS 和图片，配合 http_utils 的
+ORIGIN_OVERRIDE 使用：请求 http://<本服务器>/<原始主机名>/<路径>，按以下顺序查找响应：
+    1. --warc 指定的 WARC 记录（WARC_MODE=record 录制的真实页面）
+    2. fixtures/<主机名>/<路径> 下的静态文件（首页等）
+    3. FIXTURES 中各平台的文章地址，返回 fixtures/pages/ 下的示例文章，文章 ID 任意
+    4. STYLESHEETS 中示例文章引用的样式表，按地址生成固定的规则
+    5. 文件名为 <名称>-<宽>x<高>.<png|jpg|gif|webp> 的图片，按尺寸生成
+每个响应先等待 --latency-ms，再按 --bandwidth-kbps 限速发送。
+
+用法：
+    python benchmarks/fixture_server.py [--port 8765] [--latency-ms 50] [--bandwidth-kbps 0] [--warc DIR]
+"""
+
+import argparse
+import functools
+import io
+import mimetypes
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# 各平台的示例文章，url 中的 {id} 为任意数字，基准测试每次请求使用不同的 ID 避免命中文章缓存。
+# slow 的平台解析器本身有随机等待（阮一峰在请求文章前等待 3~7 秒），默认不测试
+FIXTURES = [
+    {'platform': 'CSDN', 'url': 'https://blog.csdn.net/blogkeeper/article/details/{id}', 'page': 'csdn.html'},
+    {'platform': '博客园', 'url': 'https://www.cnblogs.com/blogkeeper/p/{id}.html', 'page': 'cnblog.html'},
+    {'platform': '简书', 'url': 'https://www.jianshu.com/p/bench{id}', 'page': 'jianshu.html'},
+    {'platform': '微信公众号', 'url': 'https://mp.weixin.qq.com/s/bench{id}', 'page': 'wechat.html'},
+    {'platform': '思否', 'url': 'https://segmentfault.com/a/{id}', 'page': 'segmentfault.html'},
+    {'platform': '腾讯云开发者社区', 'url': 'https://cloud.tencent.com/developer/article/{id}', 'page': 'tencentcloud.html'},
+    {'platform': '硅谷王川', 'url': 'https://chuan.us/archives/{id}', 'page': 'wangchuan.html'},
+    {'platform': '阮一峰', 'url': 'https://www.ruanyifeng.com/blog/2025/01/bench-{id}.html', 'page': 'ruanyifeng.html',
+     'slow': True},
+]
+
+IMAGE_PATTERN = re.compile(r'-(\d+)x(\d+)\.(png|jpe?g|gif|webp)$', re.IGNORECASE)
+IMAGE_FORMATS = {'png': ('PNG', 'image/png'), 'jpg': ('JPEG', 'image/jpeg'), 'jpeg': ('JPEG', 'image/jpeg'),
+                 'gif': ('GIF', 'image/gif'), 'webp': ('WEBP', 'image/webp')}
+
+# 示例文章引用的样式表：<主机名><路径> -> 规则数，大小与真实页面的样式表相当
+STYLESHEETS = {
+    'csdnimg.cn/release/blogv2/dist/pc/css/detail_enter.css': 900,
+    'csdnimg.cn/release/blogv2/dist/mdeditor/css/editerView/markdown_views.css': 500,
+    'www.cnblogs.com/css/blog-common.min.css': 700,
+    'www.cnblogs.com/skins/simplememory/bundle-simplememory.min.css': 400,
+    'static.segmentfault.com/main_site_next/prod/_next/static/css/bench.css': 800,
+    'cloudcache.tencent-cloud.com/qcloud/developer/bench.css': 600,
+    'www.ruanyifeng.com/blog/styles.css': 300,
+}
+
+# 发送响应的分块大小
+CHUNK_SIZE = 16 * 1024
+
+def _compile_route(fixture):
+    """文章地址模板转换为 (主机名, 路径正则)"""
+    parts = urlsplit(fixture['url'])
+    pattern = re.escape(parts.path).replace(re.escape('{id}'), r'\d+')
+    return parts.netloc, re.compile(f'^{pattern}$')
+
+ROUTES = [(_compile_route(fixture), fixture) for fixture in FIXTURES]
+
+@functools.lru_cache(maxsize=256)
+def generate_image(width, height, ext):
+    """按尺寸生成图片，渐变叠加噪点，编码后的大小接近真实照片"""
+    from PIL import Image
+    image_format, _ = IMAGE_FORMATS[ext]
+    gradient = Image.linear_gradient('L').resize((width, height))
+    noise = Image.effect_noise((width, height), 48)
+    image = Image.merge('RGB', (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)))
+    if image_format == 'GIF':
+        image = image.convert('P', palette=Image.Palette.ADAPTIVE)
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **({'quality': 85} if image_format in ('JPEG', 'WEBP') else {}))
+    return buffer.getvalue()
+
+@functools.lru_cache(maxsize=None)
+def generate_stylesheet(url, rules):
+    """按地址生成样式表，同一地址每次生成的内容相同"""
+    rng = random.Random(url)
+    lines = []
+    for i in range(rules):
+        lines.append(
+            f".c{i:04d} .item-{rng.randint(1, 99)}{{margin:{rng.randint(0, 20)}px {rng.randint(0, 20)}px;"
+            f"color:#{rng.randrange(0x1000000):06x};font-size:{rng.randint(12, 20)}px;"
+            f"line-height:{rng.randint(12, 18) / 10}}}"
+        )
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+@functools.lru_cache(maxsize=None)
+def read_fixture(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+class FixtureResolver:
+    """按原始地址查找替身响应"""
+
+    def __init__(self, warc_dir=None):
+        self.archive = None
+        if warc_dir:
+            from core.http_utils import WarcArchive
+            self.archive = WarcArchive(warc_dir)
+
+    def _static_path(self, host, path):
+        relative = os.path.normpath(f"{host}/{path.lstrip('/')}")
+        if relative.startswith('..') or os.path.isabs(relative):
+            return None
+        full = os.path.join(FIXTURES_DIR, relative)
+        if os.path.isdir(full):
+            full = os.path.join(full, 'index.html')
+        return full if os.path.isfile(full) else None
+
+    def resolve(self, host, path, query=''):
+        """查找响应
+        Returns:
+            tuple: (状态码, Content-Type, 响应体)
+        """
+        if self.archive:
+            for scheme in ('https', 'http'):
+                url = f"{scheme}://{host}{path}" + (f"?{query}" if query else '')
+                response = self.archive.replay(url)
+                if response is not None:
+                    return response.status_code, response.headers.get('Content-Type', 'application/octet-stream'), response.content
+
+        static_path = self._static_path(host, path)
+        if static_path:
+            content_type = mimetypes.guess_type(static_path)[0] or 'application/octet-stream'
+            if content_type.startswith('text/'):
+                content_type += '; charset=utf-8'
+            return 200, content_type, read_fixture(static_path)
+
+        for (route_host, route_path), fixture in ROUTES:
+            if host == route_host and route_path.match(path):
+                return 200, 'text/html; charset=utf-8', read_fixture(os.path.join(FIXTURES_DIR, 'pages', fixture['page']))
+
+        stylesheet = f"{host}{path}"
+        if stylesheet in STYLESHEETS:
+            return 200, 'text/css; charset=utf-8', generate_stylesheet(stylesheet, STYLESHEETS[stylesheet])
+
+        match = IMAGE_PATTERN.search(path)
+        if match:
+            ext = match.group(3).lower()
+            return 200, IMAGE_FORMATS[ext][1], generate_image(int(match.group(1)), int(match.group(2)), ext)
+
+        return 404, 'text/plain; charset=utf-8', b'not found'
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    resolver = None
+    latency = 0.0
+    bandwidth = 0
+
+    def _respond(self, with_body):
+        parts = urlsplit(self.path)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        status, content_type, body = self.resolver.resolve(host, '/' + path, parts.query)
+
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if not with_body:
+            return
+
+        # 限速：每个分块按带宽计算应发送完成的时间
+        start = time.perf_counter()
+        for offset in range(0, len(body), CHUNK_SIZE):
+            self.wfile.write(body[offset:offset + CHUNK_SIZE])
+            if self.bandwidth:
+                delay = (offset + CHUNK_SIZE) / self.bandwidth - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+
+    def do_GET(self):
+        self._respond(True)
+
+    def do_HEAD(self):
+        self._respond(False)
+
+    def log_message(self, format, *args):
+        pass
+
+def create_server(port=0, latency_ms=0, bandwidth_kbps=0, warc_dir=None, host='127.0.0.1'):
+    """创建替身服务器
+    Args:
+        port: 端口，0 为随机端口
+        latency_ms: 每个响应的首字节延迟（毫秒）
+        bandwidth_kbps: 每个响应的带宽（KB/s），0 为不限速
+        warc_dir: 优先回放的 WARC 目录
+    Returns:
+        ThreadingHTTPServer: 服务器，server_address[1] 为实际端口
+    """
+    handler = type('Handler', (FixtureHandler,), {
+        'resolver': FixtureResolver(warc_dir),
+        'latency': latency_ms / 1000,
+        'bandwidth': bandwidth_kbps * 1024,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def start_server(**kwargs):
+    """在后台线程中启动替身服务器
+    Returns:
+        tuple: (服务器, 地址 http://127.0.0.1:<端口>)
+    """
+    server = create_server(**kwargs)
+    threading.Thread(target=server.serve_forever, name='fixture-server', daemon=True).start()
+    return server, f"http://{server.server_address[0]}:{server.server_address[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description='基准测试的本地替身服务器')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--latency-ms', type=float, default=50, help='每个响应的首字节延迟（毫秒）')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='每个响应的带宽（KB/s），0 为不限速')
+    parser.add_argument('--warc', help='优先回放的 WARC 目录')
+    args = parser.parse_args()
+
+    server = create_server(args.port, args.latency_ms, args.bandwidth_kbps, args.warc)
+    print(f"替身服务器: http://127.0.0.1:{server.server_address[1]}，设置 ORIGIN_OVERRIDE 为该地址")
+    for fixture in FIXTURES:
+        print(f"  {fixture['platform']}: {fixture['url'].format(id=1)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,396 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""API 服务压力测试
+
+启动本地替身服务器（fixture_server.py）和 uvicorn 子进程（api:app），用 aiohttp 按开环泊松到达发送混合请求，
+请求的发送不等待之前的请求完成，服务变慢时排队请求会累积，能反映真实流量下的饱和：
+    parse     /parse，随机平台、1~2 种格式和 fileContent；按 --cache-hit-ratio 重复请求已解析的文章
+    download  /download/...，下载之前 /parse 返回的文件
+    batch     /batch-download，打包 2~5 个之前返回的文件
+对每个 worker 数依次提高到达率（--rates，次/秒），每档运行 --duration 秒，统计延迟百分位数、错误率、
+实际吞吐量，以及服务进程树（主进程和所有 worker）的 RSS 峰值（读取 /proc，只支持 Linux）。
+第一个 p95 延迟超过 --slo-ms、错误率超过 --max-error-rate，或停止发送后排队的请求超过 --slo-ms 仍未完成的
+档位为饱和点，达到饱和点后不再测试更高的到达率。结果以 JSON 写入 --output。
+
+用法：
+    python benchmarks/loadtest.py [--workers 1,2,4] [--rates 0.5,1,2,4,8] [--duration 30]
+        [--mix parse=0.6,download=0.3,batch=0.1] [--formats html,md,pdf,mhtml] [--slo-ms 5000]
+        [--latency-ms 50] [--output loadtest.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+from benchmarks.bench_e2e import ApiServer, summarize, git_commit
+from benchmarks.fixture_server import FIXTURES, start_server
+
+REQUEST_TYPES = ['parse', 'download', 'batch']
+DEFAULT_MIX = 'parse=0.6,download=0.3,batch=0.1'
+FORMATS = ['html', 'md', 'pdf', 'mhtml']
+PERCENTILES = (50, 90, 95, 99)
+
+# 服务进程 RSS 的采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.5
+
+def _read_ppids():
+    """/proc 中所有进程的 pid -> 父进程 pid"""
+    ppids = {}
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat', 'r') as f:
+                # comm 字段可能包含空格，从最后一个右括号之后解析
+                fields = f.read().rsplit(')', 1)[1].split()
+            ppids[int(name)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return ppids
+
+def process_tree_rss(root_pid):
+    """进程及其所有子进程的 RSS 合计（字节），不支持 /proc 时返回 None"""
+    if not os.path.isdir('/proc'):
+        return None
+    ppids = _read_ppids()
+    pids = {root_pid}
+    changed = True
+    while changed:
+        children = {pid for pid, ppid in ppids.items() if ppid in pids and pid not in pids}
+        pids |= children
+        changed = bool(children)
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+class RssSampler:
+    """后台线程定期采样服务进程树的 RSS，记录峰值"""
+
+    def __init__(self, pid, interval=RSS_SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = process_tree_rss(self.pid)
+            if rss is None:
+                return
+            self.peak = max(self.peak, rss)
+            self._stop.wait(self.interval)
+
+    def reset(self):
+        """开始新一档时清零峰值"""
+        self.peak = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+class TrafficMix:
+    """生成混合请求，记录 /parse 返回的文件供下载和打包请求使用"""
+
+    def __init__(self, weights, formats, cache_hit_ratio, file_content_ratio, seed=None):
+        self.weights = weights
+        self.formats = formats
+        self.cache_hit_ratio = cache_hit_ratio
+        self.file_content_ratio = file_content_ratio
+        self.random = random.Random(seed)
+        self.fixtures = [fixture for fixture in FIXTURES if not fixture.get('slow')]
+        self.ids = itertools.count(int(time.time()))
+        # 已解析的请求 (url, formats) 和返回的文件 (download_url, 文件名)
+        self.parsed = []
+        self.files = []
+
+    def next_request(self):
+        """生成下一个请求
+        Returns:
+            tuple: (请求类型, 方法, 路径, JSON 请求体)
+        """
+        kind = self.random.choices(list(self.weights), weights=list(self.weights.values()))[0]
+        # 还没有可下载的文件时改为解析请求
+        if kind != 'parse' and not self.files:
+            kind = 'parse'
+
+        if kind == 'download':
+            download_url, _ = self.random.choice(self.files)
+            return kind, 'GET', download_url, None
+        if kind == 'batch':
+            files = self.random.sample(self.files, min(len(self.files), self.random.randint(2, 5)))
+            return kind, 'POST', '/batch-download', {
+                'files': [{'url': url, 'filename': name} for url, name in files], 'archiveFormat': 'zip'
+            }
+
+        if self.parsed and self.random.random() < self.cache_hit_ratio:
+            url, formats = self.random.choice(self.parsed)
+        else:
+            fixture = self.random.choice(self.fixtures)
+            url = fixture['url'].format(id=next(self.ids))
+            formats = self.random.sample(self.formats, min(len(self.formats), self.random.randint(1, 2)))
+        return kind, 'POST', '/parse', {
+            'url': url, 'formats': formats, 'fileContent': self.random.random() < self.file_content_ratio
+        }
+
+    def record_parse(self, body, files):
+        """记录成功的解析请求和返回的文件"""
+        self.parsed.append((body['url'], body['formats']))
+        for file_info in files:
+            extension = os.path.splitext(file_info['download_url'])[1]
+            self.files.append((file_info['download_url'], f"{file_info['title']}{extension}"))
+
+async def send_request(session, base_url, mix, request, results):
+    """发送一个请求并记录 (类型, 是否成功, 延迟, 响应字节数)"""
+    kind, method, path, body = request
+    start = time.perf_counter()
+    ok, size = False, 0
+    try:
+        async with session.request(method, base_url + path, json=body) as response:
+            if kind == 'parse':
+                data = await response.read()
+                size = len(data)
+                if response.status == 200:
+                    mix.record_parse(body, json.loads(data))
+            else:
+                # 下载和打包是流式响应，读完整个响应体
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    size += len(chunk)
+            ok = response.status == 200
+    except Exception:
+        ok = False
+    results.append((kind, ok, time.perf_counter() - start, size))
+
+async def run_step(base_url, mix, rate, duration, timeout):
+    """按泊松到达发送 duration 秒的请求，等待所有请求完成
+    Returns:
+        tuple: (结果列表, 发送数, 从开始到最后一个请求完成的秒数)
+    """
+    import aiohttp
+
+    results = []
+    tasks = []
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        next_arrival = start
+        while True:
+            next_arrival += mix.random.expovariate(rate)
+            if next_arrival - start > duration:
+                break
+            await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+            tasks.append(asyncio.create_task(send_request(session, base_url, mix, mix.next_request(), results)))
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = loop.time() - start
+    return results, len(tasks), elapsed
+
+def summarize_step(rate, results, sent, elapsed, duration, peak_rss):
+    """统计一档到达率的结果"""
+    latencies = [seconds for _, ok, seconds, _ in results if ok]
+    errors = sum(1 for _, ok, _, _ in results if not ok)
+    by_type = {}
+    for kind in REQUEST_TYPES:
+        rows = [row for row in results if row[0] == kind]
+        if rows:
+            by_type[kind] = {
+                'requests': len(rows),
+                'errors': sum(1 for _, ok, _, _ in rows if not ok),
+                'latency_ms': summarize([seconds for _, ok, seconds, _ in rows if ok], PERCENTILES),
+                'bytes': sum(size for _, _, _, size in rows),
+            }
+    return {
+        'rate': rate,
+        'sent': sent,
+        'offered_rate': round(sent / duration, 3),
+        'errors': errors,
+        'error_rate': round(errors / sent, 4) if sent else 0.0,
+        # 成功请求数除以到达窗口，服务跟不上时完成时间会超出窗口
+        'throughput': round(len(latencies) / max(elapsed, duration), 3),
+        'seconds': round(elapsed, 3),
+        # 停止发送后等待排队请求完成的时间，服务跟不上到达率时随排队增长
+        'drain_seconds': round(max(0.0, elapsed - duration), 3),
+        'latency_ms': summarize(latencies, PERCENTILES),
+        'by_type': by_type,
+        'peak_rss_mb': round(peak_rss / 1024 / 1024, 1) if peak_rss else None,
+    }
+
+def is_saturated(step, args):
+    """泊松到达的发送数围绕名义到达率波动，不用吞吐量与到达率比较，而是看停止发送后的排队时间"""
+    latency = step['latency_ms'] or {}
+    return (
+        step['error_rate'] > args.max_error_rate
+        or latency.get('p95', float('inf')) > args.slo_ms
+        or step['drain_seconds'] * 1000 > args.slo_ms
+    )
+
+def run_workers(args, workers, origin, workdir):
+    """在指定 worker 数的服务上依次测试各档到达率"""
+    server = ApiServer(workdir, origin, workers=workers).start()
+    sampler = RssSampler(server.proc.pid).start()
+    mix = TrafficMix(args.mix, args.formats, args.cache_hit_ratio, args.file_content_ratio, args.seed)
+    steps = []
+    saturation_rate = None
+    try:
+        # 预热：每个 worker 导入解析器、建立连接，并生成可供下载的文件
+        if args.warmup:
+            asyncio.run(run_step(server.base_url, mix, max(args.rates[0], 1.0), args.warmup, args.timeout))
+
+        for rate in args.rates:
+            sampler.reset()
+            results, sent, elapsed = asyncio.run(run_step(server.base_url, mix, rate, args.duration, args.timeout))
+            step = summarize_step(rate, results, sent, elapsed, args.duration, sampler.peak)
+            step['saturated'] = is_saturated(step, args)
+            steps.append(step)
+            latency = step['latency_ms'] or {}
+            print(
+                f"  workers={workers} rate={rate:g}/s: 发送 {sent} ({step['offered_rate']:.2f}/s), 吞吐 {step['throughput']:.2f}/s, "
+                f"p95 {latency.get('p95', '-')} ms, 错误率 {step['error_rate']:.1%}, RSS {step['peak_rss_mb']} MB"
+                + ("，已饱和" if step['saturated'] else ''),
+                flush=True
+            )
+            if step['saturated']:
+                saturation_rate = rate
+                if not args.continue_after_saturation:
+                    break
+    finally:
+        sampler.stop()
+        process = server.stop()
+
+    sustainable = [step['rate'] for step in steps if not step['saturated']]
+    return {
+        'workers': workers,
+        'saturation_rate': saturation_rate,
+        'max_sustainable_rate': max(sustainable) if sustainable else None,
+        'peak_rss_mb': max((step['peak_rss_mb'] or 0 for step in steps), default=None),
+        'master_process': process,
+        'steps': steps,
+    }
+
+def print_report(report):
+    print(f"\n{'workers':>8}{'到达率':>8}{'吞吐':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'错误率':>8}{'RSS(MB)':>9}")
+    for result in report['results']:
+        for step in result['steps']:
+            latency = step['latency_ms'] or {}
+            print(
+                f"{result['workers']:>8}{step['rate']:>8g}{step['throughput']:>8.2f}"
+                f"{latency.get('p50', float('nan')):>10.1f}{latency.get('p95', float('nan')):>10.1f}"
+                f"{latency.get('p99', float('nan')):>10.1f}{step['error_rate']:>8.1%}{step['peak_rss_mb'] or 0:>9.1f}"
+                + ('  饱和' if step['saturated'] else '')
+            )
+        sustainable = result['max_sustainable_rate']
+        saturation = result['saturation_rate']
+        print(
+            f"{'':>8}最大可持续到达率 {f'{sustainable:g}/s' if sustainable is not None else '无'}，"
+            f"饱和点 {f'{saturation:g}/s' if saturation is not None else '未达到'}，RSS 峰值 {result['peak_rss_mb']} MB"
+        )
+
+def _parse_mix(value):
+    weights = {}
+    for item in value.split(','):
+        kind, _, weight = item.partition('=')
+        kind = kind.strip()
+        if kind not in REQUEST_TYPES:
+            raise argparse.ArgumentTypeError(f"不支持的请求类型: {kind}")
+        weights[kind] = float(weight)
+    return weights
+
+def _parse_floats(value):
+    return [float(item) for item in value.split(',') if item.strip()]
+
+def _parse_ints(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='API 服务压力测试')
+    parser.add_argument('--workers', type=_parse_ints, default=[1, 2, 4], help='依次测试的 uvicorn worker 数')
+    parser.add_argument('--rates', type=_parse_floats, default=[0.5, 1, 2, 4, 8], help='依次测试的到达率（次/秒）')
+    parser.add_argument('--duration', type=float, default=30, help='每档到达率的持续时间（秒）')
+    parser.add_argument('--warmup', type=float, default=10, help='每个 worker 数开始前的预热时间（秒），0 为不预热')
+    parser.add_argument('--mix', type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help='请求类型的比例')
+    parser.add_argument('--formats', default=','.join(FORMATS), help='解析请求随机选择的格式')
+    parser.add_argument('--cache-hit-ratio', type=float, default=0.3, help='重复请求已解析文章的比例')
+    parser.add_argument('--file-content-ratio', type=float, default=0.3, help='解析请求要求返回文件内容的比例')
+    parser.add_argument('--slo-ms', type=float, default=5000, help='p95 延迟上限（毫秒），超过视为饱和')
+    parser.add_argument('--max-error-rate', type=float, default=0.01, help='错误率上限，超过视为饱和')
+    parser.add_argument('--continue-after-saturation', action='store_true', help='饱和后继续测试更高的到达率')
+    parser.add_argument('--timeout', type=float, default=120, help='单个请求的超时时间（秒）')
+    parser.add_argument('--latency-ms', type=float, default=50, help='替身服务器每个响应的首字节延迟（毫秒）')
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help='替身服务器每个响应的带宽（KB/s），0 为不限速')
+    parser.add_argument('--seed', type=int, help='随机数种子')
+    parser.add_argument('--output', default='loadtest.json', help='JSON 报告路径')
+    parser.add_argument('--keep', action='store_true', help='保留临时工作目录（服务日志和输出文件）')
+    args = parser.parse_args(argv)
+    args.formats = [fmt.strip() for fmt in args.formats.split(',') if fmt.strip()]
+    for fmt in args.formats:
+        if fmt not in FORMATS:
+            parser.error(f"不支持的格式: {fmt}")
+    return args
+
+def main():
+    args = parse_args()
+    fixture_server, origin = start_server(latency_ms=args.latency_ms, bandwidth_kbps=args.bandwidth_kbps)
+    root = tempfile.mkdtemp(prefix='loadtest_')
+    print(f"替身服务器: {origin}，工作目录: {root}")
+
+    started = datetime.now().isoformat(timespec='seconds')
+    results = []
+    try:
+        for workers in args.workers:
+            workdir = os.path.join(root, f"workers-{workers}")
+            os.makedirs(workdir)
+            print(f"测试 {workers} 个 worker ...", flush=True)
+            results.append(run_workers(args, workers, origin, workdir))
+    finally:
+        fixture_server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    report = {
+        'started': started,
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'system': f"{platform.system()} {platform.machine()}",
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'duration': args.duration, 'warmup': args.warmup, 'mix': args.mix, 'formats': args.formats,
+            'cache_hit_ratio': args.cache_hit_ratio, 'file_content_ratio': args.file_content_ratio,
+            'slo_ms': args.slo_ms, 'max_error_rate': args.max_error_rate, 'timeout': args.timeout,
+            'latency_ms': args.latency_ms, 'bandwidth_kbps': args.bandwidth_kbps, 'seed': args.seed,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_report(report)
+    print(f"\n报告已写入 {args.output}")
+
+if __name__ == '__main__':
+    main()
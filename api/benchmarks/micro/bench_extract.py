@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""页面元素提取：_extract_element 的三种选择器和 CSS 样式收集"""
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import ARTICLE_URL
+
+SELECTORS = [
+    ('tuple', [('div', {'id': 'article_content'})]),
+    # class 不是完整的类名，回退到 find_all 部分匹配
+    ('tuple_partial_class', [('div', {'class': 'markdown'})]),
+    ('css', ['div#article_content > div.markdown_views']),
+    ('xpath', ['xpath://div[@id="article_content"]/div']),
+]
+
+@pytest.mark.benchmark(group='extract_element')
+@pytest.mark.parametrize('kind, selectors', SELECTORS, ids=[kind for kind, _ in SELECTORS])
+def bench_extract_element(benchmark, csdn_parser, large_soup, kind, selectors):
+    result = benchmark(csdn_parser._extract_element, large_soup, selectors, None, False)
+    assert result is not None
+
+@pytest.mark.benchmark(group='extract_element')
+def bench_extract_article(benchmark, csdn_parser, large_soup):
+    """解析器实际使用的选择器：标题、作者、日期和正文"""
+    def extract():
+        return (
+            csdn_parser._extract_title(large_soup),
+            csdn_parser._extract_author(large_soup),
+            csdn_parser._extract_date(large_soup),
+            csdn_parser._extract_content(large_soup),
+        )
+    title, _, _, content = benchmark(extract)
+    assert title and content is not None
+
+@pytest.mark.benchmark(group='html_css')
+def bench_get_html_css(benchmark, csdn_parser, article_html, stub_http_get):
+    """style 标签和外部样式表（从 fixtures 读取）"""
+    soup = BeautifulSoup(article_html, 'html.parser')
+    css = benchmark(csdn_parser._get_html_css, soup, ARTICLE_URL)
+    assert css
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""导出格式渲染：图片处理、HTML 模板、Markdown 转换和 MHTML 编码"""
+
+import itertools
+
+import pytest
+
+from conftest import ARTICLE_URL
+from core.save_utils import create_html_template, process_images_in_content, save_as_markdown, save_as_mhtml
+
+CSDN_IMAGE_REWRITES = [
+    {'hosts': ['csdnimg.cn'], 'query': {'x-oss-process': 'image/resize,m_lfit,w_{width}'}},
+]
+
+@pytest.mark.benchmark(group='images')
+@pytest.mark.parametrize('output_format, save_img', [('html', False), ('pdf', True)], ids=['rewrite', 'transcode'])
+def bench_process_images(benchmark, tmp_path, article_content, offline_assets, output_format, save_img):
+    """html 只改写图片地址；pdf 从快照资源读取图片，缩放、重新编码并保存"""
+    counter = itertools.count()
+
+    def setup():
+        # 已转换的图片会被直接复用，每轮使用新的目录
+        save_dir = tmp_path / str(next(counter))
+        return (article_content, ARTICLE_URL, str(save_dir), save_img, 'screen', CSDN_IMAGE_REWRITES,
+                output_format, offline_assets), {}
+
+    result = benchmark.pedantic(process_images_in_content, setup=setup, rounds=5 if save_img else 20)
+    assert result
+
+@pytest.mark.benchmark(group='template')
+def bench_create_html_template(benchmark, article_content, css_styles):
+    html = benchmark(create_html_template, '微基准测试示例文章', article_content, css_styles, ARTICLE_URL, 'CSDN')
+    assert article_content in html
+
+@pytest.mark.benchmark(group='markdown')
+def bench_save_as_markdown(benchmark, tmp_path, article_content, css_styles):
+    """不提供 base_url，不处理图片，只测 html2text 转换和写文件"""
+    result = benchmark(save_as_markdown, '微基准测试示例文章', article_content, css_styles, 'article.md', str(tmp_path))
+    assert result and result['file_content']
+
+@pytest.mark.benchmark(group='mhtml')
+@pytest.mark.parametrize('image_profile', ['original', 'screen'])
+def bench_save_as_mhtml(benchmark, tmp_path, article_content, css_styles, offline_assets, image_profile):
+    """original 档位不重新编码图片，只测 quoted-printable 和 base64 编码；screen 档位包括图片缩放"""
+    result = benchmark.pedantic(
+        save_as_mhtml,
+        args=('微基准测试示例文章', article_content, css_styles, 'article.mhtml', str(tmp_path)),
+        kwargs={'base_url': ARTICLE_URL, 'platform': 'CSDN', 'image_profile': image_profile, 'assets': offline_assets},
+        rounds=5,
+    )
+    assert result
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""微基准测试的公共数据
+
+使用 benchmarks/fixtures 中的 CSDN 示例文章：正文重复 PAGE_REPEAT 次得到大页面，用于测试元素提取；
+样式表和替身服务器一样按地址生成，图片按文件名中的尺寸生成并保存为离线快照资源（AssetStore），
+测试中不访问网络。
+"""
+
+import os
+import sys
+
+# 日志模块在导入时读取级别，避免每张图片的日志影响测量
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, API_DIR)
+
+import pytest
+from bs4 import BeautifulSoup
+
+from benchmarks.fixture_server import FIXTURES_DIR, IMAGE_FORMATS, IMAGE_PATTERN, FixtureResolver, generate_image
+
+ARTICLE_URL = 'https://blog.csdn.net/blogkeeper/article/details/1'
+ARTICLE_PAGE = os.path.join(FIXTURES_DIR, 'pages', 'csdn.html')
+
+# 大页面中正文重复的次数
+PAGE_REPEAT = 8
+
+CONTENT_START = '<div id="content_views" class="markdown_views prism-atom-one-dark">'
+CONTENT_END = '</div></div>'
+
+class FixtureResponse:
+    """http_get 的替身响应，只提供 CSS 下载用到的属性"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+_resolver = FixtureResolver()
+
+def fixture_http_get(url, session=None, **kwargs):
+    """按替身服务器的规则返回响应，替代网络请求"""
+    host, _, path = url.split('://', 1)[-1].partition('/')
+    status, _, body = _resolver.resolve(host, '/' + path.split('?', 1)[0])
+    return FixtureResponse(status, body.decode('utf-8') if status == 200 else '')
+
+@pytest.fixture(scope='session')
+def article_html():
+    with open(ARTICLE_PAGE, 'r', encoding='utf-8') as f:
+        return f.read()
+
+@pytest.fixture(scope='session')
+def large_page_html(article_html):
+    """正文重复 PAGE_REPEAT 次的大页面"""
+    start = article_html.index(CONTENT_START) + len(CONTENT_START)
+    end = article_html.index(CONTENT_END, start)
+    body = article_html[start:end]
+    return article_html[:start] + body * PAGE_REPEAT + article_html[end:]
+
+@pytest.fixture(scope='session')
+def large_soup(large_page_html):
+    return BeautifulSoup(large_page_html, 'html.parser')
+
+@pytest.fixture(scope='session')
+def csdn_parser():
+    from core.blog_parser import load_parser_class
+    return load_parser_class('platform_api.csdn:CSDNParser')()
+
+@pytest.fixture(scope='session')
+def article_content(csdn_parser, article_html):
+    """解析后的文章正文 HTML"""
+    return str(csdn_parser._extract_content(BeautifulSoup(article_html, 'html.parser')))
+
+@pytest.fixture(scope='session')
+def css_styles(csdn_parser, article_html):
+    """页面样式表和内置样式"""
+    soup = BeautifulSoup(article_html, 'html.parser')
+    from core import base_parser
+    original, base_parser.http_get = base_parser.http_get, fixture_http_get
+    try:
+        return csdn_parser._fetch_css_styles(soup, ARTICLE_URL)
+    finally:
+        base_parser.http_get = original
+
+@pytest.fixture
+def stub_http_get(monkeypatch):
+    """CSS 下载改为读取 fixtures"""
+    from core import base_parser
+    monkeypatch.setattr(base_parser, 'http_get', fixture_http_get)
+
+@pytest.fixture(scope='session')
+def offline_assets(tmp_path_factory, article_content):
+    """保存了文章所有图片的离线快照资源，图片处理不会访问网络"""
+    from core.snapshot_utils import AssetStore
+    assets = AssetStore(str(tmp_path_factory.mktemp('assets')), offline=True)
+    for img in BeautifulSoup(article_content, 'html.parser').find_all('img'):
+        url = img['src']
+        match = IMAGE_PATTERN.search(url)
+        ext = match.group(3).lower()
+        assets.put(url, generate_image(int(match.group(1)), int(match.group(2)), ext), IMAGE_FORMATS[ext][1])
+        assets.resolve(url, url)
+    return assets
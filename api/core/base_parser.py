@@ -3,23 +3,84 @@
 
 import os
 import re
-import requests
 from datetime import datetime
 from abc import ABC, abstractmethod
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
-from .save_utils import save_as_html, save_as_markdown, save_as_pdf, save_as_mhtml
+from .save_utils import save_as_html, save_as_markdown, save_as_pdf, save_as_mhtml, prefetch_images
 from .log_utils import logger
+from .snapshot_utils import get_asset_store, save_snapshot
+from .http_utils import http_get, create_session
+from .url_utils import canonicalize_url, TRACKING_PARAMS
+from .metrics_utils import observe_stages, count_output_bytes, metrics_platform
+from .timing_utils import record_span, propagate
+from .memory_utils import mark_stage
 import concurrent.futures
+import hashlib
+from functools import lru_cache
 from threading import Lock
 import time
 
+# PDF 和 MHTML 导出时已经下载了图片，在请求中补齐其余原图；
+# 只导出 HTML、Markdown 时不下载图片，快照图片在后台预取，不增加请求耗时
+INLINE_PREFETCH_FORMATS = ('pdf', 'mhtml')
+
+_prefetch_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix='prefetch')
+_prefetch_futures = set()
+_prefetch_lock = Lock()
+
+def _prefetch_snapshot(snapshot_dir, url, parser, assets, content):
+    """后台预取快照图片，有新图片时重新写入快照"""
+    try:
+        with metrics_platform(parser.platform_flag):
+            downloaded = prefetch_images(content, url, assets)
+        if downloaded:
+            save_snapshot(snapshot_dir, url, parser, assets, content)
+    except Exception as e:
+        logger.warning(f"后台预取快照图片失败 {url}: {str(e)}")
+
+def schedule_prefetch(snapshot_dir, url, parser, assets, content):
+    """提交后台快照图片预取任务"""
+    future = _prefetch_executor.submit(_prefetch_snapshot, snapshot_dir, url, parser, assets, content)
+    with _prefetch_lock:
+        _prefetch_futures.add(future)
+    future.add_done_callback(_discard_prefetch)
+    return future
+
+def _discard_prefetch(future):
+    with _prefetch_lock:
+        _prefetch_futures.discard(future)
+
+def wait_prefetch(timeout=None):
+    """等待后台预取任务完成（服务关闭时调用）
+    Returns:
+        bool: 是否全部完成
+    """
+    with _prefetch_lock:
+        futures = list(_prefetch_futures)
+    _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+    return not not_done
+
+# 内置样式目录（项目根目录下的 css 文件夹）
+CSS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'css')
+
+@lru_cache(maxsize=None)
+def read_css_file(filename):
+    """读取CSS文件内容，内置样式文件在进程内只读取一次"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            return f.read()
+    except Exception as e:
+        logger.error(f"Error reading CSS file {filename}: {e}")
+        return ""
+
 class BaseBlogParser(ABC):
     def __init__(self):
         """初始化解析器"""
         self.platform_name = "Unknown"
         self.platform_flag = "Unknown"
-        self._session = requests.Session()
+        # 会话使用共享连接池，复用到同一主机的连接
+        self._session = create_session()
         self._headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -43,12 +104,32 @@ class BaseBlogParser(ABC):
             'content': [],
             'date': [],
         }
+
+        # 图片URL改写规则，请求适合输出格式的最小图片变体，格式见 save_utils.rewrite_image_url
+        self.image_rewrites = []
         
         # 保存解析后的文件列表
         self.file_list = []
         # 添加文件列表锁
         self._file_list_lock = Lock()
 
+        # 各阶段耗时（秒）：fetch、parse、extract、css、save，以及每种格式的渲染耗时
+        self.timings = {}
+        self.format_times = {}
+
+        # 文章快照图片资源（AssetStore），保存选项提供 snapshot_dir 时使用
+        self._assets = None
+
+        # URL 规范化规则，见 url_utils.canonicalize_url：
+        # keep_params 为只保留的查询参数（None 表示只去掉跟踪参数），host_aliases 为主机名别名
+        self.keep_params = None
+        self.tracking_params = list(TRACKING_PARAMS)
+        self.host_aliases = {}
+
+    def canonicalize_url(self, url):
+        """规范化文章URL，去掉跟踪参数，统一主机名，同一篇文章只对应一个缓存条目"""
+        return canonicalize_url(url, self.keep_params, self.tracking_params, self.host_aliases)
+
     def get_file_list(self):
         """获取解析后的文件列表
         Returns:
@@ -71,14 +152,13 @@ class BaseBlogParser(ABC):
             return
             
         download_url = os.path.join(file_path, file_name)
-        logger.info("添加文件到文件列表：" + download_url)
         # 获取文件信息
         file_size = os.path.getsize(download_url)
+        count_output_bytes(format_type, file_size)
+        logger.info("添加文件到文件列表：%s", download_url)
         
         # 清理标题，移除文件扩展名
-        logger.info("添加文件到文件列表：" + file_name)
         title = os.path.splitext(file_name)[0]
-        logger.info("添加文件到文件列表：" + title)
         
         # 添加到文件列表
         with self._file_list_lock:
@@ -109,7 +189,7 @@ class BaseBlogParser(ABC):
             try:
                 # 处理XPath选择器字符串
                 if isinstance(selector, str) and selector.startswith('xpath:'):
-                    logger.debug(f"尝试XPath选择器: {selector}")
+                    logger.debug("尝试XPath选择器: %s", selector)
                     xpath_expr = selector[6:]  # 去掉 "xpath:" 前缀
                     
                     # 将BeautifulSoup对象转换为lxml的etree对象
@@ -133,7 +213,7 @@ class BaseBlogParser(ABC):
                 
                 # 处理CSS选择器字符串
                 if isinstance(selector, str):
-                    logger.debug(f"尝试CSS选择器: {selector}")
+                    logger.debug("尝试CSS选择器: %s", selector)
                     elements = soup.select(selector)
                     if elements:
                         element = elements[0]
@@ -144,7 +224,7 @@ class BaseBlogParser(ABC):
                 
                 # 处理传统的(tag, attrs)选择器
                 tag, attrs = selector
-                logger.debug(f"尝试选择器: tag={tag}, attrs={attrs}")
+                logger.debug("尝试选择器: tag=%s, attrs=%s", tag, attrs)
                 
                 # 处理正则表达式匹配
                 regex_attrs = {}
@@ -315,25 +395,17 @@ class BaseBlogParser(ABC):
 
     def _read_css_file(self, filename):
         """读取CSS文件内容"""
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            logger.error(f"Error reading CSS file {filename}: {e}")
-            return ""
+        return read_css_file(filename)
 
     def _get_platform_css(self):
         """根据平台名称返回对应的CSS样式"""
-        # CSS文件路径 - 修改为项目根目录下的css文件夹
-        project_root = os.path.dirname(os.path.dirname(__file__))
-        css_dir = os.path.join(project_root, 'css')
-        base_css_path = os.path.join(css_dir, 'base.css')
+        base_css_path = os.path.join(CSS_DIR, 'base.css')
         
         # 读取基础CSS
         css_content = self._read_css_file(base_css_path)
         
         # 如果指定了平台，添加平台特定的CSS
-        platform_css_path = os.path.join(css_dir, f'{self.platform_flag}.css')
+        platform_css_path = os.path.join(CSS_DIR, f'{self.platform_flag}.css')
         if os.path.exists(platform_css_path):
             platform_css = self._read_css_file(platform_css_path)
             css_content += f"\n/* Platform specific styles for {self.platform_name} */\n{platform_css}"
@@ -387,7 +459,7 @@ class BaseBlogParser(ABC):
         
         def fetch_css(url):
             try:
-                response = requests.get(url, headers=self._headers, timeout=10)
+                response = http_get(url, headers=self._headers, timeout=10)
                 if response.status_code == 200:
                     css_content = response.text
                     # 去掉最外层的 style 标签
@@ -402,7 +474,7 @@ class BaseBlogParser(ABC):
         # 并行获取CSS
         if css_urls:
             with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-                css_contents = executor.map(fetch_css, css_urls)
+                css_contents = executor.map(propagate(fetch_css), css_urls)
                 for content in css_contents:
                     if content:
                         css_styles.append(content)
@@ -420,8 +492,9 @@ class BaseBlogParser(ABC):
         css_styles = self._get_html_css(soup, base_url) + self._get_platform_css()     
         return css_styles
     
-    def _save_single_format(self, format_type, url, file_path):
+    def _save_single_format(self, format_type, url, file_path, image_profile=None):
         """保存单个格式的文件"""
+        start_time = time.time()
         try:
             handler = self.save_handlers[format_type]
             file_name = self._get_file_name(format_type)
@@ -432,10 +505,14 @@ class BaseBlogParser(ABC):
                 file_name=file_name,
                 file_path=file_path,
                 base_url=url,
-                platform=self.platform_flag
+                platform=self.platform_flag,
+                image_profile=image_profile,
+                image_rewrites=self.image_rewrites,
+                assets=self._assets
             )
             if result:
                 self._add_file_to_list(file_path, file_name, format_type, file_content=result['file_content'])
+            self.format_times[format_type] = time.time() - start_time
             return bool(result)
         except Exception as e:
             logger.error(f"保存{format_type}格式失败: {str(e)}")
@@ -446,13 +523,14 @@ class BaseBlogParser(ABC):
         try:
             # 获取需要保存的格式列表
             formats = save_options.get('formats', ['html'])  # 默认保存为HTML
-            logger.info(f"开始保存博客，格式: {formats}")
+            image_profile = save_options.get('image_profile')
+            logger.info(f"开始保存博客，格式: {formats}，图片档位: {image_profile}")
             
             # 创建线程池
             with concurrent.futures.ThreadPoolExecutor(max_workers=len(formats)) as executor:
                 # 提交所有任务
                 future_to_format = {
-                    executor.submit(self._save_single_format, fmt, url, output_dir): fmt
+                    executor.submit(propagate(self._save_single_format), fmt, url, output_dir, image_profile): fmt
                     for fmt in formats
                 }
             
@@ -509,22 +587,34 @@ class BaseBlogParser(ABC):
         """
         try:
             # 1. 获取页面内容
+            stage_start = time.time()
             html = self.fetch_html(url)
+            self.timings['fetch'] = time.time() - stage_start
+            mark_stage('fetch')
             #logger.info("页面内容" + html[2000:])
             if not html:
                 return False
                 
             # 2. 解析页面内容
+            stage_start = time.time()
             soup = BeautifulSoup(html, 'html.parser')
+            self.timings['parse'] = time.time() - stage_start
+            mark_stage('parse')
+            stage_start = time.time()
             self.author = self._extract_author(soup)
             self.time = self._extract_date(soup)
             self.title = self._extract_title(soup)
             self.content = self._extract_content(soup)
+            # 各格式的保存会改写图片地址，快照和图片预取使用提取后的原始内容
+            extracted_content = str(self.content) if self.content else None
+            self.timings['extract'] = time.time() - stage_start
+            mark_stage('extract')
 
-            logger.debug("内容：" + str(self.content) if self.content else "")
-            logger.info("作者：" + str(self.author))
-            logger.info("时间：" + str(self.time))
-            logger.info("标题：" + str(self.title))
+            # 参数在日志启用 DEBUG 时才会转换为字符串
+            logger.debug("内容：%s", self.content)
+            logger.info("作者：%s", self.author)
+            logger.info("时间：%s", self.time)
+            logger.info("标题：%s", self.title)
 
             
             if not all([self.title, self.content]):
@@ -535,16 +625,126 @@ class BaseBlogParser(ABC):
             file_path = self._get_file_path(output_dir)
 
             # 4. 保存文章
+            stage_start = time.time()
             self._css_styles = self._fetch_css_styles(soup, url)
+            self.timings['css'] = time.time() - stage_start
+            mark_stage('css')
+
+            # 保存选项提供 snapshot_dir 时记录下载的图片，保存后写入文章快照
+            snapshot_dir = (save_options or {}).get('snapshot_dir')
+            self._assets = get_asset_store(snapshot_dir) if snapshot_dir else None
 
-            # 5. 返回结果
+            stage_start = time.time()
             success = self.save_blog(url, file_path, save_options)
+            self.timings['save'] = time.time() - stage_start
+            mark_stage('save')
+
+            # 5. 写入快照和元数据索引并返回结果
+            if success:
+                if snapshot_dir:
+                    formats = (save_options or {}).get('formats', ['html'])
+                    if any(fmt in INLINE_PREFETCH_FORMATS for fmt in formats):
+                        stage_start = time.time()
+                        prefetch_images(extracted_content, url, self._assets)
+                        self.timings['prefetch'] = time.time() - stage_start
+                        save_snapshot(snapshot_dir, url, self, self._assets, extracted_content)
+                    else:
+                        # 先写入快照，之后可以立即从快照渲染，图片预取完成后再更新
+                        save_snapshot(snapshot_dir, url, self, self._assets, extracted_content)
+                        schedule_prefetch(snapshot_dir, url, self, self._assets, extracted_content)
+                    mark_stage('snapshot')
+                self._record_index(url, file_path, save_options)
+            observe_stages(self.platform_flag, self.timings, self.format_times)
+            self._record_spans()
             return success
             
         except Exception as e:
             logger.error(f"解析文章失败: {str(e)}")
             return False
         
+    def render_snapshot(self, snapshot_dir, snapshot, save_options=None):
+        """从文章快照渲染导出格式，不请求原站
+        Args:
+            snapshot_dir: 文章目录
+            snapshot: load_snapshot 读取的快照
+            save_options: 保存选项
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            self.title = snapshot['title']
+            self.author = snapshot['author']
+            self.time = snapshot['time']
+            self.content = snapshot['content']
+            self._css_styles = snapshot['css']
+            self._assets = get_asset_store(snapshot_dir, snapshot, offline=True)
+            file_path = self._get_file_path(snapshot_dir)
+
+            stage_start = time.time()
+            success = self.save_blog(snapshot['url'], file_path, save_options)
+            self.timings['render'] = time.time() - stage_start
+            mark_stage('render')
+
+            if success:
+                self._record_index(snapshot['url'], file_path, save_options)
+            observe_stages(self.platform_flag, self.timings, self.format_times)
+            self._record_spans()
+            return success
+
+        except Exception as e:
+            logger.error(f"从快照渲染文章失败: {str(e)}")
+            return False
+
+    def _record_spans(self):
+        """将各阶段和各格式的耗时写入当前请求的耗时分解（Server-Timing）"""
+        for stage in ('fetch', 'parse', 'extract', 'css', 'prefetch'):
+            if stage in self.timings:
+                record_span(stage, self.timings[stage])
+        for format_type, seconds in self.format_times.items():
+            record_span(f"render_{format_type}", seconds)
+
+    def _record_index(self, url, file_path, save_options):
+        """将文章和导出文件写入元数据索引
+        Args:
+            url: 文章URL
+            file_path: 文章保存目录
+            save_options: 保存选项，提供 index（ArticleIndex）和 article_id 时才写入
+        """
+        index = (save_options or {}).get('index')
+        article_id = (save_options or {}).get('article_id')
+        if not index or not article_id:
+            return
+
+        content_hash = hashlib.sha256(str(self.content).encode('utf-8')).hexdigest()
+        with self._file_list_lock:
+            # 全文索引优先使用导出的 Markdown 正文，未导出 Markdown 时使用正文纯文本
+            body = next(
+                (file_info['file_content'] for file_info in self.file_list
+                 if file_info['format'] == 'markdown' and file_info.get('file_content')),
+                None
+            )
+            artifacts = [
+                {
+                    'format': file_info['format'],
+                    'path': file_info['download_url'],
+                    'size': file_info['size'],
+                    'image_profile': save_options.get('image_profile'),
+                    'render_seconds': self.format_times.get(file_info['format']),
+                }
+                for file_info in self.file_list
+            ]
+        index.record_article(article_id, {
+            'url': (save_options or {}).get('request_url') or url,
+            'canonical_url': url,
+            'platform': self.platform_name,
+            'author': self.author,
+            'title': self.title,
+            'publish_date': self.time,
+            'content_hash': content_hash,
+            'dir': file_path,
+            'timings': self.timings,
+        }, artifacts, body or BeautifulSoup(str(self.content), 'html.parser').get_text('\n', strip=True))
+
     def fetch_html(self, url: str) -> str:
         """获取页面HTML内容
         Args:
@@ -553,7 +753,7 @@ class BaseBlogParser(ABC):
             str: HTML内容
         """
         try:
-            response = self._session.get(url, headers=self._headers, timeout=30)
+            response = http_get(url, session=self._session, headers=self._headers, timeout=30)
             response.raise_for_status()
             self.base_html = response.text
             return self.base_html
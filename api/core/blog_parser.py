@@ -1,48 +1,74 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from bs4 import BeautifulSoup
-import os
+import importlib
+from functools import lru_cache
 from urllib.parse import urlparse
-from platform_api.cnblog import CNBlogParser
-from platform_api.csdn import CSDNParser
-from platform_api.zhihu import ZhihuParser
-from platform_api.juejin import JuejinParser
-from platform_api.jianshu import JianshuParser
-from platform_api.wechat import WeChatParser
-from platform_api.yuque import YuqueParser
-from platform_api.segmentfault import SegmentfaultParser
-from platform_api.ruanyifeng import RuanYiFengParser
-from platform_api.tencentcloud import TencentCloudParser
-from platform_api.huaweicloud import HuaWeiCloudParser
-from platform_api.aliyundeveloper import AliyunDeveloperParser
-from platform_api.toutiao import ToutiaoParser
-from platform_api.wangchuan import WangchuanParser
-from platform_api.sspai import SSPaiParser
-
-from errors import PlatformError, ParseError
+
+from errors import PlatformError, ParseError, SnapshotError, UnsupportedPageError
 from .log_utils import logger
+from .metrics_utils import metrics_platform
+from .snapshot_utils import load_snapshot
+from .url_utils import canonicalize_url
+from .dispatch_utils import DomainDispatcher
+
+# 平台插件注册表：预先声明每个平台匹配的域名（含子域名）和URL路径规则，
+# 解析器模块及其依赖只在第一次处理该平台的文章时导入，注释掉的平台不会被导入
+PLATFORM_PLUGINS = [
+    {'name': '博客园', 'hosts': ['cnblogs.com'], 'parser': 'platform_api.cnblog:CNBlogParser'},
+    # 只处理文章页，个人主页、专栏列表等页面不支持
+    {'name': 'CSDN', 'hosts': ['blog.csdn.net'], 'parser': 'platform_api.csdn:CSDNParser',
+     'path_patterns': [r'/article/details/']},
+    #{'name': '知乎', 'hosts': ['zhuanlan.zhihu.com'], 'parser': 'platform_api.zhihu:ZhihuParser'},
+    #{'name': '掘金', 'hosts': ['juejin.cn'], 'parser': 'platform_api.juejin:JuejinParser'},
+    {'name': '简书', 'hosts': ['jianshu.com'], 'parser': 'platform_api.jianshu:JianshuParser'},
+    # 文章页为 /s?__biz=... 或 /s/<id>
+    {'name': '微信公众号', 'hosts': ['mp.weixin.qq.com'], 'parser': 'platform_api.wechat:WeChatParser',
+     'path_patterns': [r'^/s(/|$)']},
+    #{'name': '语雀', 'hosts': ['yuque.com'], 'parser': 'platform_api.yuque:YuqueParser'},
+    {'name': '思否', 'hosts': ['segmentfault.com'], 'parser': 'platform_api.segmentfault:SegmentfaultParser'},
+    {'name': '阮一峰', 'hosts': ['ruanyifeng.com'], 'parser': 'platform_api.ruanyifeng:RuanYiFengParser'},
+    {'name': '腾讯云开发者社区', 'hosts': ['cloud.tencent.com'], 'parser': 'platform_api.tencentcloud:TencentCloudParser'},
+    #{'name': '华为云开发者社区', 'hosts': ['bbs.huaweicloud.com'], 'parser': 'platform_api.huaweicloud:HuaWeiCloudParser'},
+    #{'name': '阿里云开发者社区', 'hosts': ['developer.aliyun.com'], 'parser': 'platform_api.aliyundeveloper:AliyunDeveloperParser'},
+    #{'name': '头条', 'hosts': ['toutiao.com'], 'parser': 'platform_api.toutiao:ToutiaoParser'},
+    {'name': '硅谷王川', 'hosts': ['chuan.us'], 'parser': 'platform_api.wangchuan:WangchuanParser'},
+    #{'name': '少数派', 'hosts': ['sspai.com'], 'parser': 'platform_api.sspai:SSPaiParser'},
+]
+
+def _build_dispatcher(plugins):
+    """按域名后缀建立插件分发索引，注册的域名匹配自身及子域名"""
+    dispatcher = DomainDispatcher()
+    for plugin in plugins:
+        for host in plugin['hosts']:
+            dispatcher.register(host, plugin, plugin.get('path_patterns'))
+    return dispatcher
+
+# 分发索引只依赖注册表，进程内共享
+PLUGIN_DISPATCHER = _build_dispatcher(PLATFORM_PLUGINS)
+
+@lru_cache(maxsize=None)
+def load_parser_class(parser_path: str):
+    """导入解析器类
+    Args:
+        parser_path: 模块路径和类名，如 platform_api.csdn:CSDNParser
+    Returns:
+        type: 解析器类，模块只在第一次调用时导入
+    """
+    module_name, _, class_name = parser_path.partition(':')
+    return getattr(importlib.import_module(module_name), class_name)
 
 class BlogParser:
     def __init__(self):
         """初始化博客解析器分发器"""
-        self.parsers = {
-            'cnblogs.com': CNBlogParser(),
-            'blog.csdn.net': CSDNParser(),
-            #'zhuanlan.zhihu.com': ZhihuParser(),
-            #'juejin.cn': JuejinParser(),
-            'jianshu.com': JianshuParser(),
-            'mp.weixin.qq.com': WeChatParser(),
-            #"yuque.com": YuqueParser(),
-            'segmentfault.com': SegmentfaultParser(),
-            "ruanyifeng.com": RuanYiFengParser(),
-            'cloud.tencent.com': TencentCloudParser(),
-            #'bbs.huaweicloud.com': HuaWeiCloudParser(),
-            #'developer.aliyun.com': AliyunDeveloperParser(),
-            #'toutiao.com': ToutiaoParser(),
-            'chuan.us': WangchuanParser(),
-            #'sspai.com': SSPaiParser(),
-        }
+        self.plugins = PLATFORM_PLUGINS
+        self.dispatcher = PLUGIN_DISPATCHER
+        # 解析器保存单次解析的状态，每个 BlogParser 实例按需创建自己的解析器
+        self.parsers = {}
+
+    @property
+    def supported_platforms(self):
+        return [plugin['name'] for plugin in self.plugins]
 
     def get_parser(self, url: str):
         """根据URL获取对应的解析器
@@ -54,12 +80,43 @@ class BlogParser:
             PlatformError: 当域名不受支持时抛出
         """
         domain = urlparse(url).netloc
-        for key, parser in self.parsers.items():
-            if key in domain:
-                logger.info(f"使用 {parser.platform_name} 解析器")
-                return parser
+        plugin = self.dispatcher.lookup(url)
+        if plugin:
+            parser = self.parsers.get(plugin['parser'])
+            if parser is None:
+                parser = load_parser_class(plugin['parser'])()
+                self.parsers[plugin['parser']] = parser
+            logger.info(f"使用 {parser.platform_name} 解析器")
+            return parser
         logger.error(f"不支持的域名:{domain}")
-        raise Exception(f"不支持的域名：{domain}")
+        raise PlatformError(domain=domain, supported_platforms=self.supported_platforms)
+
+    def resolve_parser(self, url: str):
+        """获取URL对应的解析器
+        Raises:
+            PlatformError: 当域名不受支持时抛出
+            UnsupportedPageError: 域名受支持但路径不是文章页时抛出
+        """
+        try:
+            return self.get_parser(url)
+        except PlatformError:
+            plugin = self.dispatcher.lookup(url, match_path=False)
+            if plugin:
+                raise UnsupportedPageError(url, plugin['name'])
+            raise
+
+    def canonicalize_url(self, url: str) -> str:
+        """按平台规则规范化URL，不支持的域名使用通用规则
+        Args:
+            url: 博客文章URL
+        Returns:
+            str: 规范化后的URL，用于计算缓存 stable_id 和解析
+        """
+        try:
+            parser = self.get_parser(url)
+        except PlatformError:
+            return canonicalize_url(url)
+        return parser.canonicalize_url(url)
 
     def parse(self, url: str, output_dir: str = None, save_options: dict = None) -> bool:
         """解析博客文章
@@ -70,22 +127,34 @@ class BlogParser:
         Returns:
             bool: 是否成功
         """
+        self.base_parser = self.resolve_parser(url)
+
         try:
-            self.base_parser = self.get_parser(url)
+            with metrics_platform(self.base_parser.platform_flag):
+                return self.base_parser.parse_blog(url, output_dir, save_options)
         except Exception as e:
-            domain = urlparse(url).netloc
-            supported_platforms = [parser.platform_name for parser in self.parsers.values()]
-            raise PlatformError(
-                domain=domain,
-                supported_platforms=supported_platforms
-            )
+            raise ParseError(str(e))
+        
+    def render(self, snapshot_dir: str, save_options: dict = None) -> bool:
+        """从文章快照渲染导出格式，不请求原站
+        Args:
+            snapshot_dir: 保存了快照的文章目录
+            save_options: 保存选项
+        Returns:
+            bool: 是否成功
+        """
+        snapshot = load_snapshot(snapshot_dir)
+        if not snapshot:
+            raise SnapshotError("文章快照不存在")
+
+        self.base_parser = self.resolve_parser(snapshot['url'])
 
         try:
-            success = self.base_parser.parse_blog(url, output_dir, save_options)
-            return success
+            with metrics_platform(self.base_parser.platform_flag):
+                return self.base_parser.render_snapshot(snapshot_dir, snapshot, save_options)
         except Exception as e:
             raise ParseError(str(e))
-        
+
     def get_file_list(self):
         files = self.base_parser.get_file_list()
         if not files:
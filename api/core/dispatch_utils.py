@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+from urllib.parse import urlsplit
+
+class _HostNode:
+    __slots__ = ('children', 'entries')
+
+    def __init__(self):
+        self.children = {}
+        # (路径规则列表, 解析器)
+        self.entries = []
+
+class DomainDispatcher:
+    """按域名后缀分发解析器
+
+    域名按标签倒序存放在字典树中（com -> csdn -> blog），查找时从顶级域名逐级向下，
+    耗时只与域名的标签数有关。注册的域名匹配自身及其所有子域名，只在标签边界上匹配，
+    因此 cnblogs.com 不会匹配 evilcnblogs.com.example。多个规则同时匹配时，
+    更长的后缀优先；同一域名下可以按路径规则（正则表达式）区分不同解析器。
+    """
+
+    def __init__(self):
+        self._root = _HostNode()
+
+    @staticmethod
+    def _labels(host):
+        return [label for label in host.lower().rstrip('.').split('.') if label]
+
+    def register(self, host, parser, path_patterns=None):
+        """注册解析器
+        Args:
+            host: 域名，匹配自身及子域名
+            parser: 解析器
+            path_patterns: 路径正则表达式列表，提供时URL路径需匹配其中之一
+        """
+        node = self._root
+        for label in reversed(self._labels(host)):
+            node = node.children.setdefault(label, _HostNode())
+        patterns = [re.compile(pattern) for pattern in (path_patterns or [])]
+        node.entries.append((patterns, parser))
+
+    def lookup(self, url, match_path=True):
+        """查找URL对应的解析器，没有匹配时返回 None
+        Args:
+            url: 文章URL
+            match_path: 为 False 时忽略路径规则，只按域名查找
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        node = self._root
+        matched = []
+        for label in reversed(self._labels(parts.hostname or '')):
+            node = node.children.get(label)
+            if node is None:
+                break
+            if node.entries:
+                matched.append(node.entries)
+
+        # 从最长的后缀开始检查路径规则
+        for entries in reversed(matched):
+            for patterns, parser in entries:
+                if not match_path or not patterns or any(pattern.search(path) for pattern in patterns):
+                    return parser
+        return None
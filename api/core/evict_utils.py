@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from threading import Lock
+from .log_utils import logger
+
+# 正在写入或下载的条目目录中会存在以此开头的占用标记文件
+PIN_PREFIX = '.pin-'
+
+# 待删除的条目先改名为以此开头的目录，再确认没有被占用
+TOMBSTONE_PREFIX = '.evicted-'
+
+class ArtifactEvictor:
+    """按最近访问时间、TTL 和磁盘配额增量清理缓存的文章目录
+
+    每个条目是根目录下的一个文章目录，最近访问时间记录在条目目录的修改时间上。
+    正在写入或下载的条目会放置占用标记文件，清理时跳过；标记文件放在磁盘上，
+    多个 worker 进程之间也能生效，进程异常退出遗留的标记超过 pin_timeout 后失效。
+    """
+
+    def __init__(self, root, ttl_seconds=24 * 3600, max_bytes=None, max_evictions=100, pin_timeout=3600,
+                 entry_depth=1, on_evict=None):
+        """初始化清理器
+        Args:
+            root: 缓存根目录
+            ttl_seconds: 条目超过该时间未访问即被清理
+            max_bytes: 磁盘配额（字节），超出时按最近最少使用顺序清理，None 表示不限制
+            max_evictions: 每次最多清理的条目数，避免一次删除过多文件
+            pin_timeout: 占用标记的有效时间（秒）
+            entry_depth: 条目目录相对根目录的层级，分片布局 ab/cd/<id> 为 3
+            on_evict: 条目被清理后的回调，参数为条目路径
+        """
+        self.root = str(root)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.max_evictions = max_evictions
+        self.pin_timeout = pin_timeout
+        self.entry_depth = entry_depth
+        self.on_evict = on_evict
+        # 条目大小缓存：路径 -> (修改时间, 大小)
+        self._size_cache = {}
+        self._lock = Lock()
+
+    def entry_for(self, path):
+        """获取文件所属的条目目录
+        Args:
+            path: 根目录下的文件或目录路径
+        Returns:
+            str: 条目目录路径，不在根目录下时返回 None
+        """
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+        parts = relative.split(os.sep)
+        if relative.startswith('..') or relative == '.' or len(parts) < self.entry_depth:
+            return None
+        return os.path.join(self.root, *parts[:self.entry_depth])
+
+    def iter_entries(self):
+        """遍历所有条目目录"""
+        dirs = [self.root]
+        for _ in range(self.entry_depth):
+            next_dirs = []
+            for parent in dirs:
+                if not os.path.isdir(parent):
+                    continue
+                with os.scandir(parent) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False) and not entry.name.startswith(TOMBSTONE_PREFIX):
+                            next_dirs.append(entry.path)
+            dirs = next_dirs
+        return iter(dirs)
+
+    def touch(self, entry):
+        """更新条目的最近访问时间"""
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+    @contextmanager
+    def pin(self, entry):
+        """在写入或下载期间占用条目，防止被清理，同时更新最近访问时间"""
+        pin_file = None
+        if entry and os.path.isdir(entry):
+            pin_file = os.path.join(entry, f"{PIN_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:8]}")
+            try:
+                open(pin_file, 'w').close()
+            except OSError as e:
+                logger.warning(f"创建占用标记失败 {entry}: {str(e)}")
+                pin_file = None
+        try:
+            yield
+        finally:
+            if pin_file:
+                try:
+                    os.remove(pin_file)
+                except OSError:
+                    pass
+
+    def is_pinned(self, entry, now=None):
+        """条目是否被占用（存在未过期的占用标记）"""
+        now = now or time.time()
+        try:
+            with os.scandir(entry) as it:
+                for item in it:
+                    if item.name.startswith(PIN_PREFIX) and now - item.stat().st_mtime < self.pin_timeout:
+                        return True
+        except OSError:
+            pass
+        return False
+
+    def _entry_size(self, entry, mtime):
+        """计算条目大小，修改时间不变时使用缓存"""
+        cached = self._size_cache.get(entry)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        size = 0
+        for dirpath, _, filenames in os.walk(entry):
+            for filename in filenames:
+                try:
+                    size += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        self._size_cache[entry] = (mtime, size)
+        return size
+
+    def _remove(self, entry, now=None):
+        """删除条目
+        先将条目改名为墓碑目录，之后开始的下载无法再占用它；改名后再次检查占用标记，
+        检查和改名之间开始的下载已经放置了标记，此时恢复条目。
+        Returns:
+            bool: 是否已删除
+        """
+        tombstone = os.path.join(os.path.dirname(entry), f"{TOMBSTONE_PREFIX}{os.path.basename(entry)}-{uuid.uuid4().hex[:8]}")
+        try:
+            os.rename(entry, tombstone)
+        except OSError:
+            return False
+        if self.is_pinned(tombstone, now):
+            try:
+                os.rename(tombstone, entry)
+                return False
+            except OSError:
+                # 同一路径已经重新创建了条目，旧内容不再可访问
+                logger.warning(f"恢复被占用的条目失败，直接删除: {entry}")
+        shutil.rmtree(tombstone, ignore_errors=True)
+        self._size_cache.pop(entry, None)
+        if self.on_evict:
+            try:
+                self.on_evict(entry)
+            except Exception as e:
+                logger.warning(f"清理回调执行失败 {entry}: {str(e)}")
+        return True
+
+    def run_once(self):
+        """执行一次增量清理
+        Returns:
+            int: 本次清理的条目数
+        """
+        if not self._lock.acquire(blocking=False):
+            return 0
+        try:
+            start_time = time.time()
+            now = start_time
+            entries = []
+            for entry in self.iter_entries():
+                try:
+                    mtime = os.stat(entry).st_mtime
+                except OSError:
+                    continue
+                entries.append((mtime, entry, self._entry_size(entry, mtime)))
+
+            # 按最近访问时间从旧到新排序
+            entries.sort()
+            total_size = sum(size for _, _, size in entries)
+            evicted = 0
+            freed = 0
+
+            for mtime, entry, size in entries:
+                if evicted >= self.max_evictions:
+                    break
+                expired = now - mtime > self.ttl_seconds
+                over_quota = self.max_bytes is not None and total_size > self.max_bytes
+                if not expired and not over_quota:
+                    # 剩余条目更新，且未超出配额
+                    break
+                if self.is_pinned(entry, now) or not self._remove(entry, now):
+                    continue
+                total_size -= size
+                freed += size
+                evicted += 1
+
+            # 清理已删除条目的大小缓存
+            existing = {entry for _, entry, _ in entries}
+            for entry in list(self._size_cache):
+                if entry not in existing:
+                    self._size_cache.pop(entry, None)
+
+            if evicted:
+                logger.info(
+                    f"缓存清理完成: {self.root}, 清理条目: {evicted}, 释放空间: {freed / 1024 / 1024:.1f}MB, "
+                    f"剩余空间占用: {total_size / 1024 / 1024:.1f}MB, 耗时: {time.time() - start_time:.2f}秒"
+                )
+            return evicted
+        except Exception as e:
+            logger.error(f"缓存清理出错 {self.root}: {str(e)}")
+            return 0
+        finally:
+            self._lock.release()
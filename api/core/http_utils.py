@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""统一的HTTP请求入口，支持将原始响应记录为 WARC 文件并离线回放
+
+通过环境变量 WARC_MODE 控制：
+    record  正常请求网络，并将每个响应（包括重定向）写入 WARC_DIR 下的 .warc.gz 文件
+    replay  不访问网络，从 WARC_DIR 中的记录返回响应，没有记录的地址按连接失败处理
+    其他值  正常请求网络，不记录
+
+环境变量 ORIGIN_OVERRIDE（如 http://127.0.0.1:8765）将所有请求改发到该地址，原始主机名作为
+路径的第一段（https://blog.csdn.net/a/b -> http://127.0.0.1:8765/blog.csdn.net/a/b），
+返回的响应仍使用原始地址，用于基准测试的本地替身服务器（benchmarks/fixture_server.py）。
+
+每个进程写入独立的 WARC 文件，每条记录单独 gzip 压缩，同时在 <文件>.cdx 中
+逐行记录 URL、偏移量和长度，回放时按索引直接定位记录。没有索引的 WARC 文件会在
+首次回放时扫描生成索引。
+
+列出已记录的页面（用于批量重新解析）：
+    python -m core.http_utils list [WARC_DIR]
+"""
+
+import base64
+import glob
+import gzip
+import hashlib
+import http.cookiejar
+import json
+import os
+import sys
+import uuid
+import zlib
+from urllib.parse import urlsplit
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, RLock
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from .log_utils import logger
+from .metrics_utils import count_fetch_bytes
+
+WARC_VERSION = 'WARC/1.0'
+
+# 单个 WARC 文件的最大大小，超过后切换到新文件
+WARC_MAX_SIZE = 1024 * 1024 * 1024
+
+# 回放时最多跟随的重定向次数
+MAX_REDIRECTS = 10
+
+# 连接池：缓存连接池的主机数量，以及每个主机保留的 keep-alive 连接数
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 16
+
+# requests 已经解压并合并了响应体，记录时去掉这些响应头，保证回放时内容与响应头一致
+STRIPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'content-length'}
+
+def get_warc_mode():
+    """当前 WARC 模式：record、replay 或空字符串"""
+    return os.getenv('WARC_MODE', '').strip().lower()
+
+def get_warc_dir():
+    return os.getenv('WARC_DIR', 'warc')
+
+def get_origin_override():
+    """替身服务器地址，未设置时返回空字符串"""
+    return os.getenv('ORIGIN_OVERRIDE', '').strip().rstrip('/')
+
+def override_origin(url, origin):
+    """将请求地址改写到替身服务器，原始主机名作为路径的第一段"""
+    parts = urlsplit(url)
+    target = f"{origin}/{parts.netloc}{parts.path or '/'}"
+    return f"{target}?{parts.query}" if parts.query else target
+
+def _warc_date():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _payload_digest(data):
+    return 'sha1:' + base64.b32encode(hashlib.sha1(data).digest()).decode('ascii')
+
+def _build_record(warc_type, headers, block):
+    """构建一条 WARC 记录"""
+    lines = [WARC_VERSION]
+    lines += [f"{name}: {value}" for name, value in headers]
+    lines.append(f"Content-Length: {len(block)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + block + b'\r\n\r\n'
+
+def _http_block(response):
+    """将响应转换为 HTTP 报文"""
+    reason = response.reason or ''
+    lines = [f"HTTP/1.1 {response.status_code} {reason}".rstrip()]
+    for name, value in response.headers.items():
+        if name.lower() not in STRIPPED_HEADERS:
+            lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(response.content)}")
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8', errors='replace') + response.content
+
+def _parse_record(data):
+    """解析一条 WARC 响应记录
+    Returns:
+        tuple: (WARC 头字典, HTTP 报文)
+    """
+    header_end = data.index(b'\r\n\r\n')
+    warc_headers = {}
+    for line in data[:header_end].decode('utf-8').split('\r\n')[1:]:
+        name, _, value = line.partition(':')
+        warc_headers[name.strip().lower()] = value.strip()
+    length = int(warc_headers.get('content-length', 0))
+    return warc_headers, data[header_end + 4:header_end + 4 + length]
+
+def _build_response(url, block):
+    """将 HTTP 报文还原为 requests.Response"""
+    header_end = block.index(b'\r\n\r\n')
+    lines = block[:header_end].decode('utf-8', errors='replace').split('\r\n')
+    status_parts = lines[0].split(' ', 2)
+    response = requests.Response()
+    response.status_code = int(status_parts[1])
+    response.reason = status_parts[2] if len(status_parts) > 2 else ''
+    response.headers = CaseInsensitiveDict()
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        response.headers[name.strip()] = value.strip()
+    response._content = block[header_end + 4:]
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+class WarcArchive:
+    """WARC 文件的记录与回放"""
+
+    def __init__(self, warc_dir):
+        self.warc_dir = str(warc_dir)
+        self._lock = Lock()
+        self._file = None
+        self._cdx = None
+        self._path = None
+        # 回放索引：URL -> (文件路径, 偏移量, 长度)
+        self._index = None
+
+    def _open_file(self):
+        """打开当前进程的 WARC 文件，超过大小上限时切换新文件"""
+        if self._file and self._file.tell() < WARC_MAX_SIZE:
+            return
+        self._close_file()
+        os.makedirs(self.warc_dir, exist_ok=True)
+        name = f"blogkeeper-{datetime.now().strftime('%Y%m%d%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}.warc.gz"
+        self._path = os.path.join(self.warc_dir, name)
+        self._file = open(self._path, 'ab')
+        self._cdx = open(self._path + '.cdx', 'a', encoding='utf-8')
+        info = 'software: BlogKeeper\r\nformat: WARC File Format 1.0\r\n'.encode('utf-8')
+        self._write('warcinfo', None, [
+            ('WARC-Type', 'warcinfo'),
+            ('WARC-Record-ID', f"<urn:uuid:{uuid.uuid4()}>"),
+            ('WARC-Date', _warc_date()),
+            ('WARC-Filename', name),
+            ('Content-Type', 'application/warc-fields'),
+        ], info)
+
+    def _close_file(self):
+        if self._file:
+            self._file.close()
+            self._cdx.close()
+            self._file = None
+            self._cdx = None
+
+    def _write(self, warc_type, url, headers, block):
+        """写入一条单独 gzip 压缩的记录，响应记录同时写入 cdx 索引"""
+        data = gzip.compress(_build_record(warc_type, headers, block), compresslevel=6)
+        offset = self._file.tell()
+        self._file.write(data)
+        self._file.flush()
+        if url:
+            self._cdx.write(json.dumps({'url': url, 'offset': offset, 'length': len(data)}, ensure_ascii=False) + '\n')
+            self._cdx.flush()
+
+    def record(self, response):
+        """记录响应及其重定向链"""
+        try:
+            with self._lock:
+                self._open_file()
+                for item in list(response.history) + [response]:
+                    block = _http_block(item)
+                    self._write('response', item.url, [
+                        ('WARC-Type', 'response'),
+                        ('WARC-Record-ID', f"<urn:uuid:{uuid.uuid4()}>"),
+                        ('WARC-Date', _warc_date()),
+                        ('WARC-Target-URI', item.url),
+                        ('WARC-Payload-Digest', _payload_digest(item.content)),
+                        ('Content-Type', 'application/http;msgtype=response'),
+                    ], block)
+        except Exception as e:
+            logger.error(f"写入 WARC 记录失败 {response.url}: {str(e)}")
+
+    def _load_index(self):
+        """读取所有 WARC 文件的索引，同一地址以最新的记录为准"""
+        index = {}
+        for path in sorted(glob.glob(os.path.join(self.warc_dir, '*.warc.gz'))):
+            cdx_path = path + '.cdx'
+            if not os.path.exists(cdx_path):
+                self._build_cdx(path)
+            with open(cdx_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    index[entry['url']] = (path, entry['offset'], entry['length'])
+        logger.info(f"已加载 WARC 索引: {self.warc_dir}, 地址数: {len(index)}")
+        return index
+
+    def _build_cdx(self, path):
+        """扫描没有索引的 WARC 文件，按 gzip 成员定位每条响应记录"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path + '.cdx', 'w', encoding='utf-8') as cdx:
+            offset = 0
+            while offset < len(data):
+                decompressor = zlib.decompressobj(wbits=31)
+                record = decompressor.decompress(data[offset:])
+                length = len(data) - offset - len(decompressor.unused_data)
+                warc_headers, _ = _parse_record(record)
+                if warc_headers.get('warc-type') == 'response' and warc_headers.get('warc-target-uri'):
+                    cdx.write(json.dumps({
+                        'url': warc_headers['warc-target-uri'], 'offset': offset, 'length': length
+                    }, ensure_ascii=False) + '\n')
+                offset += length
+
+    def lookup(self, url):
+        """读取地址对应的 HTTP 报文，没有记录时返回 None"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            location = self._index.get(url)
+        if not location:
+            return None
+        path, offset, length = location
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            _, block = _parse_record(gzip.decompress(f.read(length)))
+        return block
+
+    def replay(self, url):
+        """回放地址对应的响应，跟随记录中的重定向"""
+        history = []
+        for _ in range(MAX_REDIRECTS + 1):
+            block = self.lookup(url)
+            if block is None:
+                return None
+            response = _build_response(url, block)
+            location = response.headers.get('Location')
+            if not (300 <= response.status_code < 400 and location):
+                response.history = history
+                return response
+            history.append(response)
+            url = requests.compat.urljoin(url, location)
+        return None
+
+    def list_urls(self, html_only=True):
+        """列出已记录的地址"""
+        with self._lock:
+            if self._index is None:
+                self._index = self._load_index()
+            urls = list(self._index)
+        if not html_only:
+            return urls
+        pages = []
+        for url in urls:
+            block = self.lookup(url)
+            header = block[:block.find(b'\r\n\r\n')].lower()
+            if b'content-type: text/html' in header:
+                pages.append(url)
+        return pages
+
+_archive = None
+_archive_lock = Lock()
+
+def get_warc_archive():
+    """获取 WARC_DIR 对应的 WarcArchive（进程内共享）"""
+    global _archive
+    with _archive_lock:
+        if _archive is None or _archive.warc_dir != get_warc_dir():
+            _archive = WarcArchive(get_warc_dir())
+        return _archive
+
+_adapter = None
+_shared_session = None
+# 创建共享会话时会再获取共享连接池，使用可重入锁
+_pool_lock = RLock()
+
+def get_http_adapter():
+    """获取进程内共享的 HTTPAdapter，所有会话通过它复用到同一主机的连接"""
+    global _adapter
+    with _pool_lock:
+        if _adapter is None:
+            _adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        return _adapter
+
+def create_session():
+    """创建使用共享连接池的会话，cookie 等状态仍属于各自的会话"""
+    session = requests.Session()
+    adapter = get_http_adapter()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def get_shared_session():
+    """获取无状态请求（图片、CSS等）共用的会话，不保存任何 cookie"""
+    global _shared_session
+    with _pool_lock:
+        if _shared_session is None:
+            session = create_session()
+            session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+            _shared_session = session
+        return _shared_session
+
+def preconnect(hosts, timeout=5):
+    """预先建立到常用主机的 HTTPS 连接，连接保留在共享连接池中供之后的请求复用
+    Args:
+        hosts: 主机名列表，如 ['blog.csdn.net', 'img-blog.csdnimg.cn']
+        timeout: 每个主机的超时时间（秒）
+    Returns:
+        dict: 主机名 -> 是否连接成功，回放模式下不访问网络，返回空字典
+    """
+    if get_warc_mode() == 'replay':
+        return {}
+
+    session = get_shared_session()
+
+    def connect(host):
+        try:
+            session.head(f"https://{host}/", timeout=timeout, allow_redirects=False)
+            return True
+        except requests.RequestException as e:
+            logger.warning(f"预连接失败 {host}: {str(e)}")
+            return False
+
+    if not hosts:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(len(hosts), POOL_CONNECTIONS)) as executor:
+        return dict(zip(hosts, executor.map(connect, hosts)))
+
+def http_get(url, session=None, **kwargs):
+    """发送 GET 请求，按 WARC_MODE 记录或回放响应
+    Args:
+        url: 请求地址
+        session: requests.Session，不提供时使用 get_shared_session()
+        **kwargs: 传给 requests 的参数（headers、timeout、cookies 等）
+    Returns:
+        requests.Response: 响应对象
+    Raises:
+        requests.ConnectionError: 回放模式下没有该地址的记录
+    """
+    mode = get_warc_mode()
+    if mode == 'replay':
+        response = get_warc_archive().replay(url)
+        if response is None:
+            raise requests.ConnectionError(f"WARC 中没有该地址的记录: {url}")
+        count_fetch_bytes('warc', len(response.content))
+        return response
+
+    origin = get_origin_override()
+    if origin:
+        response = (session or get_shared_session()).get(override_origin(url, origin), **kwargs)
+        response.url = url
+    else:
+        response = (session or get_shared_session()).get(url, **kwargs)
+    count_fetch_bytes('network', len(response.content))
+    if mode == 'record':
+        get_warc_archive().record(response)
+    return response
+
+def main():
+    """命令行入口：python -m core.http_utils list [WARC_DIR]"""
+    if len(sys.argv) < 2 or sys.argv[1] != 'list':
+        print("用法: python -m core.http_utils list [WARC_DIR]")
+        sys.exit(1)
+    archive = WarcArchive(sys.argv[2] if len(sys.argv) > 2 else get_warc_dir())
+    for url in archive.list_urls():
+        print(url)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import html
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from .log_utils import logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    seq INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    url TEXT NOT NULL,
+    canonical_url TEXT NOT NULL,
+    platform TEXT,
+    author TEXT,
+    title TEXT,
+    publish_date TEXT,
+    content_hash TEXT,
+    dir TEXT,
+    timings TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_articles_platform_author ON articles (platform, author);
+CREATE INDEX IF NOT EXISTS idx_articles_canonical_url ON articles (canonical_url);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    article_id TEXT NOT NULL REFERENCES articles (id) ON DELETE CASCADE,
+    format TEXT NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    image_profile TEXT,
+    render_seconds REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (article_id, format)
+);
+
+-- 全文索引的 rowid 为 articles 表的 seq，VACUUM 不会改变 INTEGER PRIMARY KEY 的值
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title,
+    author,
+    body,
+    tokenize = 'trigram'
+);
+
+-- trigram 无法检索的短词：中文单字、双字和短英文单词，每篇文章去重后存放
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_short_terms USING fts5 (
+    terms,
+    detail = 'none'
+);
+"""
+
+# 摘要中标记检索词的占位符，HTML 转义后替换为 <mark> 标签
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+# trigram 分词器只能检索长度不少于 3 个字符的词，更短的词使用 articles_short_terms 检索
+MIN_MATCH_LENGTH = 3
+
+# 摘要前后保留的字符数（只有短词时手动截取摘要使用）
+SNIPPET_CONTEXT = 32
+
+CJK_RUN_PATTERN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]+')
+
+WORD_PATTERN = re.compile(r'\w+')
+
+# 正文中与检索无关的 Markdown 图片和链接地址
+MARKDOWN_NOISE_PATTERNS = [
+    (re.compile(r'!\[([^\]]*)\]\([^)]*\)'), r'\1'),
+    (re.compile(r'\[([^\]]*)\]\([^)]*\)'), r'\1'),
+    (re.compile(r'https?://\S+'), ''),
+]
+
+def to_plain_text(markdown):
+    """去掉 Markdown 正文中的图片和链接地址，只保留用于检索的文字"""
+    text = markdown or ''
+    for pattern, replacement in MARKDOWN_NOISE_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+def get_short_terms(text):
+    """提取文本中的短词：中文单字和相邻双字、长度小于 3 的英文单词"""
+    terms = set()
+    for run in CJK_RUN_PATTERN.findall(text):
+        terms.update(run)
+        terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    for word in WORD_PATTERN.findall(CJK_RUN_PATTERN.sub(' ', text).lower()):
+        if len(word) < MIN_MATCH_LENGTH:
+            terms.add(word)
+    return ' '.join(sorted(terms))
+
+def _mark_snippet(snippet):
+    """转义摘要中的正文，再将占位符替换为 <mark> 标签"""
+    return html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+
+def _quote_term(term):
+    """将检索词转义为 FTS5 短语"""
+    return '"' + term.replace('"', '""') + '"'
+
+class ArticleIndex:
+    """已归档文章的 SQLite 元数据索引
+
+    每篇文章一行（articles），每个导出文件一行（artifacts），
+    用于查询已归档的文章、文件大小和格式，以及判断是否可以直接使用缓存。
+    标题、作者和 Markdown 正文写入 FTS5 全文索引（articles_fts），使用 trigram 分词器支持中文检索，
+    trigram 无法检索的短词另外写入 articles_short_terms。
+    每个线程使用独立的连接，数据库使用 WAL 模式，多个 worker 进程可以同时读写。
+    """
+
+    def __init__(self, db_path):
+        """初始化索引
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = str(db_path)
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def record_article(self, article_id, article, artifacts, body=None):
+        """写入或更新一篇文章及其导出文件
+        Args:
+            article_id: 文章 stable_id
+            article: 文章元数据字典，包含 url、canonical_url、platform、author、title、
+                     publish_date、content_hash、dir、timings
+            artifacts: 导出文件列表，每个元素包含 format、path、size、image_profile、render_seconds
+            body: Markdown 正文，提供时同时更新全文索引
+        """
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO articles (id, url, canonical_url, platform, author, title, publish_date,
+                                          content_hash, dir, timings, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        url = excluded.url,
+                        canonical_url = excluded.canonical_url,
+                        platform = excluded.platform,
+                        author = excluded.author,
+                        title = excluded.title,
+                        publish_date = excluded.publish_date,
+                        content_hash = excluded.content_hash,
+                        dir = excluded.dir,
+                        timings = excluded.timings,
+                        updated_at = excluded.updated_at
+                    """,
+                    (
+                        article_id, article['url'], article.get('canonical_url') or article['url'],
+                        article.get('platform'), article.get('author'), article.get('title'),
+                        article.get('publish_date'), article.get('content_hash'), article.get('dir'),
+                        json.dumps(article.get('timings') or {}), now, now,
+                    )
+                )
+                conn.executemany(
+                    """
+                    INSERT OR REPLACE INTO artifacts (article_id, format, path, size, image_profile,
+                                                      render_seconds, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (article_id, item['format'], item['path'], item['size'], item.get('image_profile'),
+                         item.get('render_seconds'), now)
+                        for item in artifacts
+                    ]
+                )
+                if body is not None:
+                    rowid = conn.execute('SELECT seq FROM articles WHERE id = ?', (article_id,)).fetchone()[0]
+                    title = article.get('title') or ''
+                    author = article.get('author') or ''
+                    text = to_plain_text(body)
+                    conn.execute('DELETE FROM articles_fts WHERE rowid = ?', (rowid,))
+                    conn.execute('DELETE FROM articles_short_terms WHERE rowid = ?', (rowid,))
+                    conn.execute(
+                        'INSERT INTO articles_fts (rowid, title, author, body) VALUES (?, ?, ?, ?)',
+                        (rowid, title, author, text)
+                    )
+                    conn.execute(
+                        'INSERT INTO articles_short_terms (rowid, terms) VALUES (?, ?)',
+                        (rowid, get_short_terms(f"{title}\n{author}\n{text}"))
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"写入文章索引失败 {article_id}: {str(e)}")
+
+    def get_article(self, article_id):
+        """获取文章元数据，不存在时返回 None"""
+        row = self._connect().execute('SELECT * FROM articles WHERE id = ?', (article_id,)).fetchone()
+        return self._article_dict(row) if row else None
+
+    def get_artifacts(self, article_id):
+        """获取文章的导出文件
+        Returns:
+            dict: 格式 -> 导出文件信息
+        """
+        rows = self._connect().execute(
+            'SELECT format, path, size, image_profile, render_seconds, created_at FROM artifacts WHERE article_id = ?',
+            (article_id,)
+        ).fetchall()
+        return {row['format']: dict(row) for row in rows}
+
+    def list_articles(self, platform=None, author=None, limit=100, offset=0):
+        """按平台、作者列出已归档的文章，按更新时间倒序"""
+        conditions = []
+        params = []
+        if platform:
+            conditions.append('platform = ?')
+            params.append(platform)
+        if author:
+            conditions.append('author = ?')
+            params.append(author)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        rows = self._connect().execute(
+            f'SELECT * FROM articles {where} ORDER BY updated_at DESC LIMIT ? OFFSET ?',
+            params + [limit, offset]
+        ).fetchall()
+        return [self._article_dict(row) for row in rows]
+
+    def remove_article(self, article_id):
+        """删除文章及其导出文件记录（文章目录被清理时调用）"""
+        try:
+            with self._connect() as conn:
+                row = conn.execute('SELECT seq FROM articles WHERE id = ?', (article_id,)).fetchone()
+                if row:
+                    conn.execute('DELETE FROM articles_fts WHERE rowid = ?', (row[0],))
+                    conn.execute('DELETE FROM articles_short_terms WHERE rowid = ?', (row[0],))
+                conn.execute('DELETE FROM articles WHERE id = ?', (article_id,))
+        except sqlite3.Error as e:
+            logger.error(f"删除文章索引失败 {article_id}: {str(e)}")
+
+    def search(self, query, platform=None, limit=20, offset=0):
+        """全文检索已归档的文章
+        Args:
+            query: 检索词，多个词用空格分隔，需同时命中
+            platform: 只检索指定平台
+            limit: 返回条数
+            offset: 偏移量
+        Returns:
+            list: 文章元数据列表，按相关度排序（只有短词时按归档先后倒序），
+                  每个元素附带 snippet 摘要和 score 分数
+        """
+        terms = [term for term in (query or '').split() if term]
+        if not terms:
+            return []
+        match_terms = [term for term in terms if len(term) >= MIN_MATCH_LENGTH]
+        short_terms = [term for term in terms if len(term) < MIN_MATCH_LENGTH]
+
+        short_query = ' AND '.join(_quote_term(term.lower()) for term in short_terms)
+        conditions = []
+        params = []
+        if match_terms:
+            # 由 trigram 索引驱动查询，按 bm25 排序，权重：标题 > 作者 > 正文
+            select = "bm25(articles_fts, 10.0, 5.0, 1.0) AS score, " \
+                     f"snippet(articles_fts, -1, '{_MARK_START}', '{_MARK_END}', '...', 16) AS snippet"
+            source = 'articles_fts AS f JOIN articles AS a ON a.seq = f.rowid'
+            conditions.append('articles_fts MATCH ?')
+            params.append(' AND '.join(_quote_term(term) for term in match_terms))
+            if short_terms:
+                # "+" 阻止该条件作为 rowid 约束下推给 articles_fts，否则会对每个短词结果单独执行一次 MATCH
+                conditions.append('+f.rowid IN (SELECT rowid FROM articles_short_terms WHERE articles_short_terms MATCH ?)')
+                params.append(short_query)
+            order = 'score'
+        else:
+            # 只有短词时由短词索引驱动查询，按归档先后倒序，不需要对全部结果排序
+            select = 'NULL AS score, f.body AS snippet'
+            source = 'articles_short_terms AS s JOIN articles AS a ON a.seq = s.rowid ' \
+                     'JOIN articles_fts AS f ON f.rowid = s.rowid'
+            conditions.append('articles_short_terms MATCH ?')
+            params.append(short_query)
+            order = 's.rowid DESC'
+        if platform:
+            conditions.append('a.platform = ?')
+            params.append(platform)
+        sql = (
+            f"SELECT a.*, {select} FROM {source} "
+            f"WHERE {' AND '.join(conditions)} ORDER BY {order} LIMIT ? OFFSET ?"
+        )
+        try:
+            rows = self._connect().execute(sql, params + [limit, offset]).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"全文检索失败 {query}: {str(e)}")
+            return []
+
+        results = []
+        for row in rows:
+            article = self._article_dict(row)
+            if match_terms:
+                article['snippet'] = _mark_snippet(article['snippet'] or '')
+            else:
+                article['snippet'] = self._make_snippet(article['snippet'] or '', short_terms[0])
+            results.append(article)
+        return results
+
+    def _make_snippet(self, body, term):
+        """在正文中截取检索词附近的文字作为摘要，短词索引不区分大小写，这里同样不区分"""
+        match = re.search(re.escape(term), body, re.IGNORECASE)
+        if not match:
+            return _mark_snippet(body[:SNIPPET_CONTEXT * 2])
+        position, match_end = match.span()
+        start = max(0, position - SNIPPET_CONTEXT)
+        end = match_end + SNIPPET_CONTEXT
+        prefix = '...' if start > 0 else ''
+        suffix = '...' if end < len(body) else ''
+        return _mark_snippet(
+            f"{prefix}{body[start:position]}{_MARK_START}{body[position:match_end]}{_MARK_END}{body[match_end:end]}{suffix}"
+        )
+
+    def _article_dict(self, row):
+        article = dict(row)
+        article.pop('seq', None)
+        article['timings'] = json.loads(article['timings'] or '{}')
+        return article
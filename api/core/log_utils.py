@@ -1,12 +1,25 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
 import os
 from datetime import datetime
 from colorama import init, Fore, Style
 
+# 日志级别，低于该级别的日志在调用处直接丢弃，不会创建日志记录
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+# 控制台输出格式：text 为彩色文本，json 为每行一条 JSON（便于日志采集）；日志文件始终为 JSON
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text').lower()
+# 每张图片等高频事件的采样比例，WARNING 及以上级别不采样
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.05'))
+
 # 初始化colorama
 init()
 
@@ -36,8 +49,8 @@ class ColoredFormatter(logging.Formatter):
         color = self.COLORS.get(record.levelname, '')
         icon = self.ICONS.get(record.levelname, '')
         
-        # 添加时间戳
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        # 添加时间戳（日志在后台线程中格式化，使用记录创建的时间）
+        timestamp = datetime.fromtimestamp(record.created).strftime('%Y-%m-%d %H:%M:%S')
         
         # 格式化消息
         if record.levelname == 'INFO':
@@ -53,38 +66,132 @@ class ColoredFormatter(logging.Formatter):
         
         return formatted_message
 
+# 标准日志记录属性，其余属性（extra 参数）作为结构化字段输出
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'file': record.filename,
+            'line': record.lineno,
+            'thread': record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+# 不可变的消息参数可以原样交给日志线程格式化
+_IMMUTABLE_ARG_TYPES = (str, bytes, int, float, bool, type(None))
+
+class LocalQueueHandler(logging.handlers.QueueHandler):
+    """日志记录原样入队，消息合并和格式化都在日志线程中完成
+
+    队列只在进程内使用，不需要像 QueueHandler 默认行为那样在入队前完成格式化。
+    只有参数中含有可变对象（之后可能被修改）时，才在调用线程中合并消息。
+    """
+
+    def prepare(self, record):
+        args = record.args
+        if not args:
+            return record
+        values = args.values() if isinstance(args, dict) else args
+        if all(isinstance(value, _IMMUTABLE_ARG_TYPES) for value in values):
+            return record
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+class SampledLogger:
+    """按比例采样的日志记录器，用于每张图片等高频事件
+
+    DEBUG、INFO 日志按 rate 比例随机保留，未被采样时不会创建日志记录；
+    WARNING 及以上级别始终记录。保留的日志带有 sample_rate 字段。
+    """
+
+    def __init__(self, logger, rate):
+        self.logger = logger
+        self.rate = rate
+
+    def _log(self, level, msg, args, kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            if self.rate < 1 and random.random() >= self.rate:
+                return
+            kwargs.setdefault('extra', {})['sample_rate'] = self.rate
+        self.logger.log(level, msg, *args, stacklevel=3, **kwargs)
+
+    def debug(self, msg, *args, **kwargs):
+        self._log(logging.DEBUG, msg, args, kwargs)
+
+    def info(self, msg, *args, **kwargs):
+        self._log(logging.INFO, msg, args, kwargs)
+
+    def warning(self, msg, *args, **kwargs):
+        self._log(logging.WARNING, msg, args, kwargs)
+
+    def error(self, msg, *args, **kwargs):
+        self._log(logging.ERROR, msg, args, kwargs)
+
+_listener = None
+
 def setup_logger():
-    """设置日志记录器"""
+    """设置日志记录器
+
+    日志记录只放入队列，由后台线程（QueueListener）格式化并写入控制台和日志文件，
+    请求线程不会因为磁盘或终端输出而阻塞。进程退出时写完队列中剩余的日志。
+    """
+    global _listener
+
     # 创建logger
     logger = logging.getLogger('BlogParser')
-    logger.setLevel(logging.DEBUG)  # 设置为最低级别，捕获所有日志
+    logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
     
     # 如果logger已经有处理器，先清除
     if logger.handlers:
         logger.handlers.clear()
+    if _listener:
+        _listener.stop()
     
     # 创建控制台处理器
     console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.INFO)  # 控制台显示INFO及以上级别
-    console_handler.setFormatter(ColoredFormatter())
+    console_handler.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else ColoredFormatter())
     
-    # 创建文件处理器
+    # 创建文件处理器，每行一条 JSON
     log_dir = 'logs'
     os.makedirs(log_dir, exist_ok=True)
     log_file = os.path.join(log_dir, f'blog_parser_{datetime.now().strftime("%Y%m%d")}.log')
     file_handler = logging.FileHandler(log_file, encoding='utf-8')
-    file_handler.setLevel(logging.DEBUG)  # 文件记录DEBUG及以上级别
-    file_formatter = logging.Formatter(
-        '%(asctime)s [%(levelname)s] %(message)s (%(filename)s:%(lineno)d)',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    file_handler.setFormatter(file_formatter)
+    file_handler.setFormatter(JsonFormatter())
     
-    # 添加处理器到logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    # 日志通过队列交给后台线程处理
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(LocalQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler)
+    _listener.start()
     
     return logger
 
+def stop_logger():
+    """停止日志线程，写完队列中剩余的日志"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logger)
+
 # 创建全局logger实例
 logger = setup_logger()
+
+# 每张图片等高频事件使用的采样日志记录器
+image_logger = SampledLogger(logger, LOG_SAMPLE_RATE)
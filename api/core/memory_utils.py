@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""单次请求的内存峰值
+
+API 处理请求时通过 MemoryTracker.start() 开启 tracemalloc，解析和渲染模块在每个阶段结束时调用
+mark_stage() 记录该阶段的分配峰值（相对请求开始时），并在已分配内存达到新高时记录分配最多的代码位置。
+请求结束后停止跟踪，tracemalloc 的开销只存在于被跟踪的请求。当前没有在跟踪时，mark_stage 直接跳过。
+
+tracemalloc 的峰值是进程级的：同一时间只跟踪一个请求，其他请求在此期间不跟踪；
+被跟踪请求期间其他请求的分配也会计入，需要精确数据时在单 worker、低并发下复现。
+"""
+
+import os
+import tracemalloc
+from contextvars import ContextVar
+from threading import Lock
+
+_current = ContextVar('blogkeeper_memory', default=None)
+
+# 同一时间只跟踪一个请求
+_tracking_lock = Lock()
+
+# 记录的分配位置数量
+TOP_SITES = 10
+
+# 不计入分配位置的模块（tracemalloc 自身和导入机制）
+_IGNORED_SITES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+class MemoryTracker:
+    """一次请求中各阶段的内存分配峰值（字节）"""
+
+    def __init__(self, top=TOP_SITES):
+        self.top = top
+        self.stages = {}
+        self.peak = 0
+        self.top_sites = []
+        self._baseline = 0
+        self._snapshot_size = 0
+        self._started = False
+        self._token = None
+        self._lock = Lock()
+
+    @classmethod
+    def start(cls, top=TOP_SITES):
+        """开始跟踪当前请求
+        Returns:
+            MemoryTracker: 跟踪器，已有请求在跟踪时返回 None
+        """
+        if not _tracking_lock.acquire(blocking=False):
+            return None
+        tracker = cls(top)
+        # 进程已经开启 tracemalloc 时（如 PYTHONTRACEMALLOC）以当前已分配内存为基准，结束时不关闭
+        tracker._started = not tracemalloc.is_tracing()
+        if tracker._started:
+            tracemalloc.start()
+        else:
+            tracemalloc.reset_peak()
+        tracker._baseline = tracemalloc.get_traced_memory()[0]
+        tracker._token = _current.set(tracker)
+        return tracker
+
+    def mark(self, stage):
+        """记录刚结束的阶段的分配峰值，同一阶段多次记录时取最大值"""
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        peak = max(peak - self._baseline, 0)
+        current = max(current - self._baseline, 0)
+        with self._lock:
+            if stage:
+                self.stages[stage] = max(self.stages.get(stage, 0), peak)
+            self.peak = max(self.peak, peak)
+            take_snapshot = current > self._snapshot_size
+            if take_snapshot:
+                self._snapshot_size = current
+        # 峰值时刻的对象多数已经释放，在已分配内存达到新高时记录仍存活的分配位置
+        if take_snapshot:
+            self._record_sites()
+
+    def _record_sites(self):
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_SITES)
+        sites = [
+            {
+                'site': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                'size': stat.size,
+                'count': stat.count,
+            }
+            for stat in snapshot.statistics('lineno')[:self.top]
+        ]
+        with self._lock:
+            self.top_sites = sites
+
+    def stop(self):
+        """结束跟踪，停止 tracemalloc 并释放跟踪权"""
+        if self._token is None:
+            return self
+        try:
+            self.mark(None)
+        finally:
+            _current.reset(self._token)
+            self._token = None
+            if self._started:
+                tracemalloc.stop()
+            _tracking_lock.release()
+        return self
+
+    def to_dict(self):
+        """峰值、各阶段峰值和分配最多的代码位置（字节）"""
+        with self._lock:
+            return {
+                'peak': self.peak,
+                'stages': dict(self.stages),
+                'top_sites': list(self.top_sites),
+            }
+
+def get_memory_tracker():
+    """当前请求的跟踪器，没有在跟踪时返回 None"""
+    return _current.get()
+
+def mark_stage(stage):
+    """记录刚结束的阶段的分配峰值"""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.mark(stage)
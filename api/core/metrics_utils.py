@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Prometheus 监控指标
+
+所有指标以 blogkeeper_ 开头，通过 API 的 /metrics 接口导出。
+多个 worker 进程运行时设置环境变量 PROMETHEUS_MULTIPROC_DIR（每次启动前清空该目录），
+/metrics 汇总所有进程的指标。
+
+图片和下载字节数等在解析流程深处记录的指标，平台标签取自 metrics_platform() 设置的当前平台；
+启动预热等非用户请求在 suppress_metrics() 中执行，不计入指标。
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+)
+
+# 文章处理各阶段通常在几十毫秒到几十秒之间
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    'blogkeeper_stage_seconds', '文章处理各阶段耗时（fetch、parse、extract、css、save、render）',
+    ['stage', 'platform'], buckets=STAGE_BUCKETS
+)
+RENDER_SECONDS = Histogram(
+    'blogkeeper_render_seconds', '各导出格式的渲染耗时', ['format', 'platform'], buckets=STAGE_BUCKETS
+)
+IMAGE_SECONDS = Histogram(
+    'blogkeeper_image_seconds', '单张图片的下载（fetch）和转码（transcode）耗时', ['stage', 'platform'], buckets=STAGE_BUCKETS
+)
+ARCHIVE_SECONDS = Histogram(
+    'blogkeeper_archive_seconds', '批量下载压缩包的生成耗时（包含流式传输）', ['format'], buckets=STAGE_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    'blogkeeper_request_seconds', '文章导出请求的总耗时', ['endpoint', 'platform'], buckets=STAGE_BUCKETS
+)
+REQUESTS = Counter(
+    'blogkeeper_requests_total', '文章导出请求数', ['endpoint', 'platform', 'status']
+)
+CACHE_LOOKUPS = Counter(
+    'blogkeeper_cache_lookups_total', '缓存查找次数：article 为已归档格式，snapshot 为文章快照，negative 为失败缓存',
+    ['cache', 'result']
+)
+FETCH_BYTES = Counter(
+    'blogkeeper_fetch_bytes_total', '从原站下载的字节数（页面、CSS、图片），source 为 network 或 warc',
+    ['source', 'platform']
+)
+OUTPUT_BYTES = Counter(
+    'blogkeeper_output_bytes_total', '生成的导出文件和压缩包字节数', ['format']
+)
+MEMORY_PEAK_BYTES = Histogram(
+    'blogkeeper_memory_peak_bytes', '被跟踪请求各阶段的内存分配峰值，total 为整个请求（需要 MEMORY_TRACKING）',
+    ['stage', 'platform'], buckets=tuple(mb * 1024 * 1024 for mb in (1, 4, 16, 32, 64, 128, 256, 512, 1024, 2048))
+)
+MEMORY_ALERTS = Counter(
+    'blogkeeper_memory_alerts_total', '内存分配峰值超过 MEMORY_ALERT_MB 的请求数', ['endpoint', 'platform']
+)
+PENDING_TASKS = Gauge(
+    'blogkeeper_executor_pending_tasks', '线程池中排队和执行中的任务数', ['executor'], multiprocess_mode='livesum'
+)
+
+# 当前处理的平台标识，线程池中需要用 timing_utils.propagate() 传递
+_platform = ContextVar('blogkeeper_metrics_platform', default='unknown')
+_suppressed = ContextVar('blogkeeper_metrics_suppressed', default=False)
+
+@contextmanager
+def metrics_platform(platform):
+    """在此范围内记录的图片和下载指标使用该平台标签"""
+    token = _platform.set(platform)
+    try:
+        yield
+    finally:
+        _platform.reset(token)
+
+@contextmanager
+def suppress_metrics():
+    """在此范围内不记录指标（如启动预热），避免示例文章计入线上数据"""
+    token = _suppressed.set(True)
+    try:
+        yield
+    finally:
+        _suppressed.reset(token)
+
+def metrics_enabled():
+    return not _suppressed.get()
+
+@contextmanager
+def observe_image(stage):
+    """记录单张图片的处理耗时，也可以作为装饰器使用"""
+    start = time.time()
+    try:
+        yield
+    finally:
+        if metrics_enabled():
+            IMAGE_SECONDS.labels(stage, _platform.get()).observe(time.time() - start)
+
+def count_fetch_bytes(source, size):
+    """记录从原站下载的字节数"""
+    if metrics_enabled():
+        FETCH_BYTES.labels(source, _platform.get()).inc(size)
+
+def count_output_bytes(fmt, size):
+    """记录生成的导出文件字节数"""
+    if metrics_enabled():
+        OUTPUT_BYTES.labels(fmt).inc(size)
+
+def observe_stages(platform, timings, format_times=None):
+    """记录一篇文章各阶段和各格式的耗时
+    Args:
+        platform: 平台标识
+        timings: 阶段 -> 秒数，见 BaseBlogParser.timings
+        format_times: 格式 -> 秒数，见 BaseBlogParser.format_times
+    """
+    if not metrics_enabled():
+        return
+    for stage, seconds in timings.items():
+        STAGE_SECONDS.labels(stage, platform).observe(seconds)
+    for fmt, seconds in (format_times or {}).items():
+        RENDER_SECONDS.labels(fmt, platform).observe(seconds)
+
+def observe_memory(platform, memory):
+    """记录一次请求的内存分配峰值
+    Args:
+        platform: 平台标识
+        memory: MemoryTracker.to_dict() 的结果
+    """
+    if not metrics_enabled():
+        return
+    for stage, peak in memory['stages'].items():
+        MEMORY_PEAK_BYTES.labels(stage, platform).observe(peak)
+    MEMORY_PEAK_BYTES.labels('total', platform).observe(memory['peak'])
+
+@contextmanager
+def track_request(endpoint):
+    """记录导出请求的耗时和状态码
+    Yields:
+        dict: 请求标签，处理过程中设置 platform 和 status
+    """
+    labels = {'platform': 'unknown', 'status': '500'}
+    start = time.time()
+    try:
+        yield labels
+    finally:
+        REQUEST_SECONDS.labels(endpoint, labels['platform']).observe(time.time() - start)
+        REQUESTS.labels(endpoint, labels['platform'], labels['status']).inc()
+
+def render_metrics():
+    """生成 /metrics 响应内容
+    Returns:
+        tuple: (指标文本, content_type)
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+class NegativeCache:
+    """失败结果缓存
+
+    按键（规范化后的文章URL、域名）缓存最近一次的错误，在有效期内直接返回该错误，
+    不再请求原站。同一个键连续失败时有效期按指数增长，成功后清除。
+    缓存只在当前进程内有效，每个 worker 进程独立计数。
+    """
+
+    def __init__(self, ttl_seconds=30, max_ttl_seconds=3600, max_entries=10000):
+        """初始化失败缓存
+        Args:
+            ttl_seconds: 第一次失败的缓存时间
+            max_ttl_seconds: 连续失败时缓存时间的上限
+            max_entries: 最多缓存的键数量，超出时淘汰最早的记录
+        """
+        self.ttl_seconds = ttl_seconds
+        self.max_ttl_seconds = max_ttl_seconds
+        self.max_entries = max_entries
+        # 键 -> (错误, 过期时间, 连续失败次数)
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        """获取缓存的错误
+        Returns:
+            tuple: (错误, 剩余秒数)，没有缓存或已过期时返回 None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            error, expires_at, _ = entry
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                # 过期后允许重试，保留失败次数用于下一次退避
+                return None
+            return error, remaining
+
+    def record_failure(self, key, error):
+        """记录一次失败
+        Returns:
+            float: 本次缓存的秒数
+        """
+        with self._lock:
+            now = time.time()
+            entry = self._entries.pop(key, None)
+            failures = 1
+            if entry:
+                _, expires_at, failures = entry
+                # 上一次缓存过期很久后再次失败，重新开始计数
+                failures = failures + 1 if now - expires_at < self.max_ttl_seconds else 1
+            ttl = min(self.ttl_seconds * 2 ** (failures - 1), self.max_ttl_seconds)
+            self._entries[key] = (error, now + ttl, failures)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return ttl
+
+    def clear(self, key):
+        """成功后清除失败记录"""
+        with self._lock:
+            self._entries.pop(key, None)
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""文章合集打包格式
+
+一个合集（如 blog/<平台>-<作者>/ 下的所有文章、图片）打包为两个文件：
+    <name>.pack      数据文件，以 PACK_MAGIC 开头，之后依次追加各个成员文件的原始内容
+    <name>.pack.idx  索引文件，每行一个 JSON 记录：name、offset、size、mtime、crc32
+
+两个文件都只追加不修改：先写数据再写索引，写入中断时数据文件末尾多出的内容没有索引，
+读取时会被忽略；同名成员再次写入时追加新内容，以索引中最后一条记录为准。
+读取时通过 mmap 映射数据文件，成员内容以 memoryview 切片返回，不需要解包。
+
+命令行用法：
+    python -m core.pack_utils pack <目录> <name>.pack
+    python -m core.pack_utils unpack <name>.pack <目录>
+    python -m core.pack_utils list <name>.pack
+"""
+
+import json
+import mmap
+import os
+import sys
+import time
+import zlib
+from threading import Lock
+from .log_utils import logger
+
+PACK_MAGIC = b'BKPACK1\n'
+
+PACK_EXTENSION = '.pack'
+
+INDEX_EXTENSION = '.idx'
+
+CHUNK_SIZE = 64 * 1024
+
+def get_index_path(pack_path):
+    """获取数据文件对应的索引文件路径"""
+    return str(pack_path) + INDEX_EXTENSION
+
+def normalize_member_name(name):
+    """统一成员名：使用正斜杠，去掉开头的斜杠，不允许出现 .. 路径"""
+    name = name.replace('\\', '/').lstrip('/')
+    if not name or any(part in ('', '.', '..') for part in name.split('/')):
+        raise ValueError(f"无效的成员名: {name}")
+    return name
+
+class PackWriter:
+    """向打包文件追加成员，同一个打包文件同时只能有一个写入者"""
+
+    def __init__(self, pack_path):
+        self.pack_path = str(pack_path)
+        self.index_path = get_index_path(self.pack_path)
+        os.makedirs(os.path.dirname(os.path.abspath(self.pack_path)), exist_ok=True)
+        self._data = open(self.pack_path, 'ab')
+        if self._data.tell() == 0:
+            self._data.write(PACK_MAGIC)
+            self._data.flush()
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+
+    def add_bytes(self, name, data, mtime=None):
+        """追加一个成员
+        Args:
+            name: 成员名（相对路径）
+            data: 成员内容
+            mtime: 修改时间，默认为当前时间
+        """
+        name = normalize_member_name(name)
+        offset = self._data.tell()
+        self._data.write(data)
+        self._finish(name, offset, len(data), zlib.crc32(data), mtime or time.time())
+
+    def add_file(self, name, file_path):
+        """分块复制文件内容作为一个成员追加"""
+        name = normalize_member_name(name)
+        offset = self._data.tell()
+        size = 0
+        crc = 0
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self._data.write(chunk)
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+        self._finish(name, offset, size, crc, os.path.getmtime(file_path))
+
+    def _finish(self, name, offset, size, crc, mtime):
+        # 先写数据再写索引，读取时只接受数据完整的记录，内容由 crc32 校验
+        self._data.flush()
+        record = {'name': name, 'offset': offset, 'size': size, 'mtime': mtime, 'crc32': crc}
+        self._index.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._index.flush()
+
+    def close(self):
+        os.fsync(self._data.fileno())
+        self._data.close()
+        self._index.flush()
+        os.fsync(self._index.fileno())
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class PackReader:
+    """通过 mmap 随机读取打包文件中的成员"""
+
+    def __init__(self, pack_path):
+        self.pack_path = str(pack_path)
+        self.index_path = get_index_path(self.pack_path)
+        self.members = {}
+        self._index_offset = 0
+        self._data_size = 0
+        self._mmap = None
+        self._lock = Lock()
+        with open(self.pack_path, 'rb') as f:
+            if f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+                raise ValueError(f"不是有效的打包文件: {self.pack_path}")
+        self.refresh()
+
+    def refresh(self):
+        """读取索引中新追加的记录，数据文件变大时重新映射"""
+        with self._lock:
+            try:
+                index_size = os.path.getsize(self.index_path)
+            except OSError:
+                index_size = 0
+            if index_size == self._index_offset:
+                return
+
+            self._remap()
+            with open(self.index_path, 'rb') as f:
+                f.seek(self._index_offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        # 写入中的最后一行，下次再读
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"打包索引记录损坏: {self.index_path}")
+                        self._index_offset += len(line)
+                        continue
+                    end = record['offset'] + record['size']
+                    if end > self._data_size:
+                        # 读取索引期间追加的成员，重新映射数据文件
+                        self._remap()
+                    if end > self._data_size:
+                        # 数据尚未完整写入，保留读取位置，下次从这条记录开始
+                        break
+                    self._index_offset += len(line)
+                    self.members[record['name']] = record
+
+    def _remap(self):
+        """数据文件大小变化时重新映射"""
+        data_size = os.path.getsize(self.pack_path)
+        if data_size != self._data_size:
+            # 旧的映射可能仍被返回的 memoryview 引用，不主动关闭，由垃圾回收释放
+            with open(self.pack_path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._data_size = data_size
+
+    def names(self):
+        """所有成员名"""
+        return list(self.members)
+
+    def get(self, name):
+        """获取成员内容
+        Returns:
+            memoryview: 数据文件映射上的切片，成员不存在时返回 None
+        """
+        record = self.members.get(name)
+        if record is None:
+            return None
+        return memoryview(self._mmap)[record['offset']:record['offset'] + record['size']]
+
+    def iter_chunks(self, name, chunk_size=CHUNK_SIZE):
+        """分块读取成员内容，用于流式响应"""
+        view = self.get(name)
+        if view is None:
+            return
+        for start in range(0, len(view), chunk_size):
+            yield bytes(view[start:start + chunk_size])
+
+    def verify(self, name):
+        """校验成员内容的 CRC32"""
+        view = self.get(name)
+        return view is not None and zlib.crc32(view) == self.members[name]['crc32']
+
+def pack_directory(source_dir, pack_path):
+    """将目录下的所有文件打包（追加到已有打包文件）
+    Returns:
+        int: 打包的文件数
+    """
+    source_dir = str(source_dir)
+    count = 0
+    with PackWriter(pack_path) as writer:
+        for dirpath, dirnames, filenames in os.walk(source_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                file_path = os.path.join(dirpath, filename)
+                name = os.path.relpath(file_path, source_dir).replace(os.sep, '/')
+                writer.add_file(name, file_path)
+                count += 1
+    logger.info(f"已打包 {count} 个文件: {source_dir} -> {pack_path}")
+    return count
+
+def unpack(pack_path, target_dir):
+    """将打包文件中的所有成员解包到目录
+    Returns:
+        int: 解包的文件数
+    """
+    reader = PackReader(pack_path)
+    target_dir = str(target_dir)
+    for name, record in reader.members.items():
+        if not reader.verify(name):
+            raise ValueError(f"成员校验失败: {name}")
+        file_path = os.path.join(target_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as f:
+            f.write(reader.get(name))
+        if record.get('mtime'):
+            os.utime(file_path, (record['mtime'], record['mtime']))
+    return len(reader.members)
+
+def main():
+    """命令行入口：python -m core.pack_utils pack|unpack|list ..."""
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == 'pack' and len(sys.argv) == 4:
+        print(f"打包文件数: {pack_directory(sys.argv[2], sys.argv[3])}")
+    elif command == 'unpack' and len(sys.argv) == 4:
+        print(f"解包文件数: {unpack(sys.argv[2], sys.argv[3])}")
+    elif command == 'list' and len(sys.argv) == 3:
+        for record in PackReader(sys.argv[2]).members.values():
+            print(f"{record['size']:>12}  {record['name']}")
+    else:
+        print("用法: python -m core.pack_utils pack <目录> <name>.pack | unpack <name>.pack <目录> | list <name>.pack")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
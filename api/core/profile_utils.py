@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""单个请求的采样分析
+
+后台线程按固定间隔读取 sys._current_frames()，只记录处理该请求的线程（请求线程，以及通过
+timing_utils.propagate 进入线程池的工作线程）的调用栈，结果保存为折叠栈格式
+（每行 "根函数;...;叶子函数 采样次数"），可以直接导入 speedscope（https://www.speedscope.app）
+或用 flamegraph.pl 生成火焰图。
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from .log_utils import logger
+
+# 默认采样间隔（秒）
+DEFAULT_INTERVAL = 0.005
+
+# 单个调用栈记录的最大深度
+MAX_STACK_DEPTH = 128
+
+def _frame_name(frame):
+    code = frame.f_code
+    name = getattr(code, 'co_qualname', code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':')
+
+class SamplingProfiler:
+    """采样分析器"""
+
+    def __init__(self, get_threads, interval=DEFAULT_INTERVAL):
+        """初始化采样分析器
+        Args:
+            get_threads: 返回需要采样的线程 ident 集合的函数，每次采样时调用
+            interval: 采样间隔（秒）
+        """
+        self.get_threads = get_threads
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        frames = sys._current_frames()
+        for ident in self.get_threads():
+            frame = frames.get(ident)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self.seconds = time.perf_counter() - self._start_time
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def to_collapsed(self):
+        """折叠栈格式的分析结果，按采样次数从多到少排列"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def save(self, path):
+        """保存折叠栈文件
+        Returns:
+            str: 文件路径，保存失败时返回 None
+        """
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.to_collapsed())
+        except OSError as e:
+            logger.error(f"保存性能分析结果失败 {path}: {str(e)}")
+            return None
+        logger.info(f"性能分析结果已保存: {path}, 采样 {self.samples} 次, 耗时 {self.seconds:.2f} 秒")
+        return path
@@ -2,7 +2,6 @@
 # -*- coding: utf-8 -*-
 import os
 import re
-import markdownify
 import base64
 import requests
 import shutil
@@ -13,18 +12,20 @@ import zipfile
 import sys
 import tempfile
 import platform
-import html2text
-import pdfkit
 import random
 import string
 import quopri
 import uuid
+import hashlib
 import io
-from PIL import Image
-from urllib.parse import urljoin, urlparse
+from functools import lru_cache
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
 from bs4 import BeautifulSoup
 from datetime import datetime
-from .log_utils import logger
+from .log_utils import logger, image_logger
+from .http_utils import http_get
+from .metrics_utils import observe_image, PENDING_TASKS
+from .timing_utils import span, propagate
 
 # 构造请求头
 IMAGE_REQUEST_HEADERS = {
@@ -43,6 +44,88 @@ IMAGE_REQUEST_HEADERS = {
     'Cache-Control': 'no-cache',
 }
 
+# 图片输出档位：max_width 为宽度上限（像素），quality 为 JPEG 重新编码质量
+# original 保持原图尺寸并转为 PNG，与旧行为一致
+IMAGE_PROFILES = {
+    'original': {'max_width': None, 'quality': None},
+    'screen': {'max_width': 1600, 'quality': 85},
+    'compact': {'max_width': 1000, 'quality': 70},
+}
+# 默认保持原图，需要更小的文件时由请求的 imageProfile 选择 screen 或 compact
+DEFAULT_IMAGE_PROFILE = 'original'
+
+# 档位没有宽度上限时（original）按输出格式选择 srcset 的目标宽度
+DEFAULT_TARGET_WIDTHS = {
+    'pdf': 1600,
+    'html': 1920,
+    'markdown': 1920,
+    'mhtml': 1920,
+}
+
+SRCSET_ATTRS = ['srcset', 'data-srcset']
+
+# Pillow 可以解码的图片类型
+DECODABLE_IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/gif', 'image/bmp'}
+
+def get_image_profile(name=None):
+    """获取图片输出档位配置，未知档位回退到默认档位"""
+    return IMAGE_PROFILES.get(name or DEFAULT_IMAGE_PROFILE, IMAGE_PROFILES[DEFAULT_IMAGE_PROFILE])
+
+def rewrite_image_url(src, image_rewrites, image_profile=None, output_format=None):
+    """按平台图片改写规则请求更小的图片变体
+    Args:
+        src: 图片绝对URL
+        image_rewrites: 改写规则列表，每条规则是一个字典：
+                - hosts: 图片域名后缀列表，如 ['csdnimg.cn']
+                - host_pattern: 可选，图片域名正则表达式，用于编号的CDN域名，如 img2024.cnblogs.com
+                - query: 需要设置的查询参数，值中可以使用 {width} 占位符；原地址已有的参数保持不变
+                - suffix: 追加到路径末尾的后缀，如 '/format/webp'
+                - formats: 可选，只对这些输出格式生效
+        image_profile: 图片输出档位，{width} 取自档位的 max_width
+        output_format: 输出格式（html, markdown, pdf, mhtml）
+    Returns:
+        str: 改写后的图片URL
+    """
+    if not image_rewrites:
+        return src
+
+    parsed = urlparse(src)
+    host = (parsed.hostname or '').lower()
+    max_width = get_image_profile(image_profile)['max_width']
+    rewritten = src
+
+    for rule in image_rewrites:
+        host_pattern = rule.get('host_pattern')
+        if host_pattern:
+            if not re.fullmatch(host_pattern, host):
+                continue
+        elif not any(host == h or host.endswith('.' + h) for h in rule.get('hosts', [])):
+            continue
+        if rule.get('formats') and output_format not in rule['formats']:
+            continue
+
+        path = parsed.path
+        suffix = rule.get('suffix')
+        if suffix and not path.endswith(suffix):
+            path += suffix
+
+        query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+        for key, value in rule.get('query', {}).items():
+            # 原地址已经指定了处理参数（如已有的 x-oss-process），不覆盖
+            if key in query:
+                continue
+            # 没有宽度上限时（original 档位）跳过缩放参数，保持原图
+            if '{width}' in value:
+                if not max_width:
+                    continue
+                value = value.format(width=max_width)
+            query[key] = value
+
+        parsed = parsed._replace(path=path, query=urlencode(query, safe='/,_'))
+        rewritten = urlunparse(parsed)
+
+    return rewritten
+
 def get_save_path(file_name, file_path):
     # 拼接文件路径
     filepath = os.path.join(file_path, file_name)
@@ -51,15 +134,13 @@ def get_save_path(file_name, file_path):
     return filepath
 
 
-def base_save_handle(title, content, css_styles, file_name, file_path, base_url=None, format=None):
+def base_save_handle(title, content, css_styles, file_name, file_path, base_url=None, format=None, image_profile=None, image_rewrites=None, assets=None):
     # 处理图片
-    logger.info("base_save_handle 处理图片" + base_url)
-    logger.info(f"content类型: {type(content)}")
+    logger.debug("base_save_handle 处理图片: %s, 格式: %s", base_url, format)
     if base_url:
-        logger.info("base_save_handle 处理图片00" + base_url)
         save_img = format == 'pdf'
-        logger.info("base_save_handle 处理图片00" + str(save_img))
-        content = process_images_in_content(content, base_url, file_path, save_img)
+        with span('images'):
+            content = process_images_in_content(content, base_url, file_path, save_img, image_profile, image_rewrites, format, assets)
         
     # 如果content是BeautifulSoup对象，转换为字符串
     if isinstance(content, BeautifulSoup):
@@ -89,7 +170,7 @@ def create_html_template(title, content, css_styles, base_url=None, platform=Non
     """
     return html_template
     
-def save_as_html(title, content, css_styles, file_name, file_path, base_url=None, platform=None):
+def save_as_html(title, content, css_styles, file_name, file_path, base_url=None, platform=None, image_profile=None, image_rewrites=None, assets=None):
     """将博客内容保存为HTML格式
     Args:
         title: 文章标题
@@ -99,12 +180,15 @@ def save_as_html(title, content, css_styles, file_name, file_path, base_url=None
         file_path: 保存的文件夹路径
         base_url: 原始页面的URL，用于处理相对路径
         platform: 平台名称，用于加载特定的CSS样式
+        image_profile: 图片输出档位（original、screen、compact）
+        image_rewrites: 平台图片URL改写规则
+        assets: 文章快照图片资源（AssetStore），提供时优先使用本地保存的图片
     Returns:
         str: 保存的文件路径
     """
     try:
         filepath = get_save_path(file_name, file_path)
-        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'html')
+        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'html', image_profile, image_rewrites, assets)
             
         # 创建HTML模板
         html_template = create_html_template(title, content, css_styles, base_url, platform)
@@ -120,7 +204,7 @@ def save_as_html(title, content, css_styles, file_name, file_path, base_url=None
         logger.error(f"保存HTML文件时出错: {str(e)}")
         return None
 
-def save_as_markdown(title, content, css_styles, file_name, file_path, base_url=None, platform=None):
+def save_as_markdown(title, content, css_styles, file_name, file_path, base_url=None, platform=None, image_profile=None, image_rewrites=None, assets=None):
     """将博客内容保存为Markdown格式
     Args:
         title: 文章标题
@@ -130,14 +214,18 @@ def save_as_markdown(title, content, css_styles, file_name, file_path, base_url=
         file_path: 保存的文件夹路径
         base_url: 原始页面的URL，用于处理相对路径
         platform: 平台名称，用于加载特定的CSS样式
+        image_profile: 图片输出档位（original、screen、compact）
+        image_rewrites: 平台图片URL改写规则
+        assets: 文章快照图片资源（AssetStore），提供时优先使用本地保存的图片
     Returns:
         str: 保存的文件路径
     """
     try:
         filepath = get_save_path(file_name, file_path)
-        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'markdown')
+        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'markdown', image_profile, image_rewrites, assets)
             
         # 将HTML转换为Markdown
+        import html2text
         markdown_converter = html2text.HTML2Text()
         markdown_converter.body_width = 0  # 不限制行宽
         markdown_content = markdown_converter.handle(content)
@@ -156,10 +244,12 @@ def save_as_markdown(title, content, css_styles, file_name, file_path, base_url=
         logger.error(f"保存Markdown文件时出错: {str(e)}")
         return None
 
+@lru_cache(maxsize=1)
 def get_wkhtmltopdf_path() -> str:
     """
     获取 wkhtmltopdf 可执行文件的路径
     Linux 使用系统安装的版本，Windows 使用项目自带的版本
+    找到后在进程内缓存，之后的PDF转换不再查找
     """
     if platform.system() == 'Windows':
         # Windows 使用项目自带的版本
@@ -190,11 +280,11 @@ def get_wkhtmltopdf_path() -> str:
                     pass
         raise FileNotFoundError('wkhtmltopdf not found in system')
 
-def save_as_pdf(title, content, css_styles, file_name, file_path, base_url=None, platform=None):
+def save_as_pdf(title, content, css_styles, file_name, file_path, base_url=None, platform=None, image_profile=None, image_rewrites=None, assets=None):
     """将博客内容保存为PDF格式"""
     try:
         # 1. 处理图片
-        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'pdf')
+        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'pdf', image_profile, image_rewrites, assets)
         
         # 2. 先保存为临时HTML文件
         temp_html = os.path.join(file_path, f"{os.path.splitext(file_name)[0]}_temp.html")
@@ -216,6 +306,7 @@ def save_as_pdf(title, content, css_styles, file_name, file_path, base_url=None,
         
         try:
             # 5. 使用wkhtmltopdf转换
+            import pdfkit
             config = pdfkit.configuration(wkhtmltopdf=get_wkhtmltopdf_path())
             pdfkit.from_file(temp_html, pdf_path, options=options, configuration=config)
             
@@ -237,7 +328,7 @@ def save_as_pdf(title, content, css_styles, file_name, file_path, base_url=None,
         logger.error(f"保存PDF文件时出错: {str(e)}")
         return None
 
-def save_as_mhtml(title, content, css_styles, file_name, file_path, base_url=None, platform=None):
+def save_as_mhtml(title, content, css_styles, file_name, file_path, base_url=None, platform=None, image_profile=None, image_rewrites=None, assets=None):
     """将HTML内容保存为MHTML格式
     Args:
         title: 文章标题
@@ -247,17 +338,21 @@ def save_as_mhtml(title, content, css_styles, file_name, file_path, base_url=Non
         file_path: 保存的文件夹路径
         base_url: 原始页面的URL，用于处理相对路径
         platform: 平台名称，用于加载特定的CSS样式
+        image_profile: 图片输出档位（original、screen、compact）
+        image_rewrites: 平台图片URL改写规则
+        assets: 文章快照图片资源（AssetStore），提供时优先使用本地保存的图片
     Returns:
         str: 保存的文件路径
     """
     try:
         # 编码HTML内容
         filepath = get_save_path(file_name, file_path)
-        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'mhtml')
+        content = base_save_handle(title, content, css_styles, file_name, file_path, base_url, 'mhtml', image_profile, image_rewrites, assets)
         html_content = create_html_template(title, content, css_styles, base_url, platform)
 
         # 处理图片
-        images = handle_mhtml_images(content, base_url)
+        with span('images'):
+            images = handle_mhtml_images(content, base_url, image_profile, assets)
 
         # 生成MHTML头部
         boundary = '----=_NextPart_' + ''.join(random.choices(string.ascii_letters + string.digits, k=16))
@@ -303,7 +398,7 @@ def save_as_mhtml(title, content, css_styles, file_name, file_path, base_url=Non
         logger.error(f"保存MHTML文件时出错: {str(e)}")
         return None
 
-def handle_mhtml_images(content, base_url):
+def handle_mhtml_images(content, base_url, image_profile=None, assets=None):
     # 处理图片并收集图片信息
     if isinstance(content, str):
         soup = BeautifulSoup(content, 'html.parser')
@@ -320,73 +415,133 @@ def handle_mhtml_images(content, base_url):
                     src = urljoin(base_url, src)
                 
                 # 下载图片内容
-                session = requests.Session()
-                response = session.get(src, headers=IMAGE_REQUEST_HEADERS, timeout=10)
-                if response.status_code == 200:
-                    # 获取图片类型
-                    content_type = response.headers.get('content-type', 'image/jpeg')
+                fetched = fetch_image(src, assets)
+                if fetched:
+                    img_bytes, content_type = fetched
+                    # 按输出档位压缩图片，只有变小时才替换原图（GIF 保留动画，SVG 无需处理）
+                    profile = get_image_profile(image_profile)
+                    if profile['max_width'] and not content_type.startswith(('image/gif', 'image/svg')):
+                        try:
+                            new_bytes, new_type, _ = transcode_image(img_bytes, profile)
+                            if len(new_bytes) < len(img_bytes):
+                                img_bytes, content_type = new_bytes, new_type
+                        except Exception as e:
+                            logger.warning(f"压缩图片失败，使用原图 {src}: {str(e)}")
                     # 获取图片内容并进行base64编码
-                    img_data = base64.b64encode(response.content).decode('utf-8')
+                    img_data = base64.b64encode(img_bytes).decode('utf-8')
                     images.append({
                         'src': src,
                         'content_type': content_type,
                         'data': img_data
                     })
-                    logger.info(f"成功下载图片: {src}")
+                    image_logger.info("成功下载图片: %s", src)
             except Exception as e:
                 logger.error(f"下载图片失败 {src}: {str(e)}")
                 continue
     return images
 
-def convert_webp_to_png(image_url, save_dir):
-    """将webp格式图片转换为png格式
+@observe_image('transcode')
+def transcode_image(data, profile):
+    """按输出档位缩放并重新编码图片
+    Args:
+        data: 原始图片数据
+        profile: 图片输出档位配置，见 IMAGE_PROFILES
+    Returns:
+        tuple: (图片数据, content_type, 扩展名)
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(data))
+    max_width = profile['max_width']
+    image_logger.info("原始图片信息: 格式=%s, 模式=%s, 大小=%s", image.format, image.mode, image.size)
+
+    # JPEG 使用 draft 模式在解码阶段直接按 1/2、1/4、1/8 缩小，避免完整解码超大图片
+    if max_width and image.format == 'JPEG' and image.width > max_width:
+        image.draft('RGB', (max_width, max(1, image.height * max_width // image.width)))
+
+    # 如果图片有透明通道，保留alpha通道
+    has_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    if max_width and image.width > max_width:
+        height = max(1, round(image.height * max_width / image.width))
+        image = image.resize((max_width, height), Image.LANCZOS)
+
+    output = io.BytesIO()
+    if has_alpha or not profile['quality']:
+        image.save(output, 'PNG', optimize=bool(profile['quality']))
+        return output.getvalue(), 'image/png', '.png'
+    image.save(output, 'JPEG', quality=profile['quality'], optimize=True, progressive=True)
+    return output.getvalue(), 'image/jpeg', '.jpg'
+
+def fetch_image(image_url, assets=None):
+    """下载图片
+    Args:
+        image_url: 图片URL
+        assets: 文章快照图片资源（AssetStore），提供时优先读取本地保存的图片，并保存新下载的图片；
+                离线模式下不访问网络
+    Returns:
+        tuple: (图片数据, content_type)，下载失败时返回 None
+    """
+    if assets is not None:
+        cached = assets.get(image_url)
+        if cached:
+            return cached
+        if assets.offline:
+            logger.warning(f"快照中没有该图片，离线渲染跳过: {image_url}")
+            return None
+
+    with observe_image('fetch'):
+        response = http_get(image_url, headers=IMAGE_REQUEST_HEADERS, timeout=10)
+    if response.status_code != 200:
+        logger.error(f"下载图片失败: {image_url}, 状态码: {response.status_code}")
+        logger.error(f"响应头: {response.headers}")
+        return None
+
+    content_type = response.headers.get('content-type', 'image/jpeg')
+    if assets is not None:
+        assets.put(image_url, response.content, content_type)
+    return response.content, content_type
+
+def convert_webp_to_png(image_url, save_dir, image_profile=None, assets=None):
+    """下载图片并按输出档位转换为本地图片（original 档位转换为png格式）
     Args:
         image_url: 图片URL
         save_dir: 保存目录
+        image_profile: 图片输出档位
+        assets: 文章快照图片资源（AssetStore）
     Returns:
         str: 转换后的图片路径，如果转换失败则返回原URL
     """
     try:
-        logger.info(f"开始处理webp图片: {image_url}")
+        logger.debug("开始处理图片: %s, 保存到: %s", image_url, save_dir)
         
         # 创建保存目录
         os.makedirs(save_dir, exist_ok=True)
-        logger.info(f"图片将保存到: {save_dir}")
         
+        # 文件名由图片URL和输出档位决定，重新渲染时直接使用已转换的图片
+        name = 'img_' + hashlib.sha1(f"{image_url}|{image_profile}".encode('utf-8')).hexdigest()[:16]
+        for existing in os.listdir(save_dir):
+            if os.path.splitext(existing)[0] == name:
+                image_logger.info("使用已转换的图片: %s", existing)
+                return os.path.join('images', existing)
+
         # 下载图片
-        logger.info("正在下载图片...")
-        session = requests.Session()
-        response = session.get(image_url, headers=IMAGE_REQUEST_HEADERS, timeout=10)
-        
-        if response.status_code != 200:
-            logger.error(f"下载图片失败: {image_url}, 状态码: {response.status_code}")
-            logger.error(f"响应头: {response.headers}")
+        fetched = fetch_image(image_url, assets)
+        if not fetched:
             return image_url
+        data = fetched[0]
             
-        # 生成唯一的文件名
-        filename = f"img_{uuid.uuid4().hex[:8]}.png"
-        save_path = os.path.join(save_dir, filename)
-        logger.info(f"生成的文件名: {filename}")
-        logger.info(f"完整保存路径: {save_path}")
-        
         # 转换图片格式
         try:
-            logger.info("正在转换图片格式...")
-            image = Image.open(io.BytesIO(response.content))
-            logger.info(f"原始图片信息: 模式={image.mode}, 大小={image.size}")
-            
-            # 如果图片有透明通道，保留alpha通道
-            if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
-                logger.info("检测到透明通道，保留alpha通道")
-                image = image.convert('RGBA')
-            else:
-                logger.info("转换为RGB模式")
-                image = image.convert('RGB')
-                
-            image.save(save_path, 'PNG')
-            logger.info(f"✅ 图片已成功转换并保存: {save_path}")
+            img_bytes, _, extension = transcode_image(data, get_image_profile(image_profile))
+
+            filename = f"{name}{extension}"
+            save_path = os.path.join(save_dir, filename)
+
+            with open(save_path, 'wb') as f:
+                f.write(img_bytes)
+            image_logger.info("✅ 图片已成功转换并保存: %s, 大小: %d -> %d 字节", save_path, len(data), len(img_bytes))
             relative_path = os.path.join('images', filename)
-            logger.info(f"返回相对路径: {relative_path}")
             return relative_path
             
         except Exception as e:
@@ -403,21 +558,108 @@ def convert_webp_to_png(image_url, save_dir):
         logger.error(traceback.format_exc())
         return image_url
 
-def process_single_image(img, base_url, images_dir, save_img):
+def parse_srcset(srcset):
+    """解析 srcset 属性
+    Args:
+        srcset: srcset 属性值，如 "a.png 1x, a@2x.png 2x" 或 "a-480.png 480w, a-960.png 960w"
+    Returns:
+        list: (url, 宽度, 像素密度) 元组列表，未声明的描述符为 None
+    """
+    candidates = []
+    pos, length = 0, len(srcset)
+    while pos < length:
+        # 跳过分隔的空白和逗号
+        while pos < length and (srcset[pos].isspace() or srcset[pos] == ','):
+            pos += 1
+        start = pos
+        while pos < length and not srcset[pos].isspace():
+            pos += 1
+        url = srcset[start:pos]
+        descriptor = ''
+        # URL 本身可能包含逗号（如 x-oss-process=image/resize,w_100），只有末尾的逗号才是分隔符
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            start = pos
+            while pos < length and srcset[pos] != ',':
+                pos += 1
+            descriptor = srcset[start:pos].strip()
+            pos += 1
+        if not url:
+            continue
+
+        width, density = None, None
+        try:
+            if descriptor.endswith('w'):
+                width = int(descriptor[:-1])
+            elif descriptor.endswith('x'):
+                density = float(descriptor[:-1])
+            else:
+                density = 1.0
+        except ValueError:
+            continue
+        candidates.append((url, width, density))
+    return candidates
+
+def select_srcset_candidate(candidates, target_width):
+    """从 srcset 候选中选择最合适的图片
+    宽度描述符取不小于目标宽度的最小图片，像素密度描述符取 1x 图片，避免下载 2x/3x 的高清图
+    Args:
+        candidates: parse_srcset 返回的候选列表
+        target_width: 目标宽度（像素）
+    Returns:
+        str: 选中的图片URL，没有候选时返回 None
+    """
+    width_candidates = sorted((c for c in candidates if c[1]), key=lambda c: c[1])
+    if width_candidates:
+        for url, width, _ in width_candidates:
+            if width >= target_width:
+                return url
+        return width_candidates[-1][0]
+
+    density_candidates = sorted((c for c in candidates if c[2]), key=lambda c: c[2])
+    if density_candidates:
+        for url, _, density in density_candidates:
+            if density >= 1:
+                return url
+        return density_candidates[-1][0]
+    return None
+
+def get_srcset_candidates(img, output_format=None):
+    """收集 img 的 srcset/data-srcset 以及外层 <picture><source> 中的候选图片"""
+    srcsets = [img.get(attr) for attr in SRCSET_ATTRS]
+    parent = img.parent
+    if parent is not None and parent.name == 'picture':
+        for source in parent.find_all('source'):
+            # PDF 和 MHTML 需要本地解码图片，跳过 Pillow 无法解码的格式（如 avif）
+            source_type = source.get('type', '')
+            if output_format in ('pdf', 'mhtml') and source_type and source_type not in DECODABLE_IMAGE_TYPES:
+                continue
+            srcsets.extend(source.get(attr) for attr in SRCSET_ATTRS)
+
+    candidates = []
+    for srcset in srcsets:
+        if srcset:
+            candidates.extend(parse_srcset(srcset))
+    return candidates
+
+def process_single_image(img, base_url, images_dir, save_img, image_profile=None, image_rewrites=None, output_format=None, assets=None):
     """处理单个图片"""
     start_time = time.time()
     
-    logger.info(f"处理单个图片")      
     try:
-        # 检查所有可能的图片源属性
+        # 优先按目标宽度从 srcset 中选择图片
+        target_width = get_image_profile(image_profile)['max_width'] or DEFAULT_TARGET_WIDTHS.get(output_format, 1920)
+        src = select_srcset_candidate(get_srcset_candidates(img, output_format), target_width)
+
+        # 检查所有可能的图片源属性，跳过懒加载使用的 data: 占位图
         src_attrs = ['src', 'data-src', 'data-original-src', 'data-backgroud', 'data-original']
-        src = None
         for attr in src_attrs:
-            if attr in img.attrs and img[attr]:
-                src = img[attr]
+            if src:
                 break
+            if attr in img.attrs and img[attr] and not img[attr].startswith('data:'):
+                src = img[attr]
 
-        logger.info(f"process_single_image00 : {src}")       
         if not src:
             return False, None, None, 0
             
@@ -429,36 +671,65 @@ def process_single_image(img, base_url, images_dir, save_img):
         if not src.startswith(('http://', 'https://')):
             src = urljoin(base_url, src)
 
-        logger.info(f"process_single_image11 : {src}")
-
-        if 'sspai.com' in src:
-            if not src.endswith('/format/webp'):
-                src = src + '/format/webp'
-                img['src'] = src
+        # 按平台规则请求更小的图片变体
+        source_url = src
+        src = rewrite_image_url(src, image_rewrites, image_profile, output_format)
+        if assets is not None:
+            # 从快照渲染时，没有保存过的图片变体使用同一原图已保存的变体
+            src = assets.resolve(src, source_url)
 
-        logger.info(f"process_single_image22 : {src}")
+        logger.debug("处理单个图片: %s -> %s", source_url, src)
         if save_img:
             # 转换并保存图片
-            new_src = convert_webp_to_png(src, images_dir)
+            new_src = convert_webp_to_png(src, images_dir, image_profile, assets)
             return True, src, new_src, time.time() - start_time
 
-        logger.info(f"process_single_image33 : {src}")            
         return True, src, src, time.time() - start_time
         
     except Exception as e:
         logger.error(f"处理图片失败: {str(e)}")
         return False, None, None, time.time() - start_time
 
-def process_images_in_content(content, base_url, save_dir, save_img):
+def prefetch_images(content, base_url, assets):
+    """下载文章中尚未保存的图片原图到快照资源，之后从快照渲染任意格式都不需要请求原站
+    Args:
+        content: 文章内容
+        base_url: 原始页面的URL
+        assets: 文章快照图片资源（AssetStore）
+    Returns:
+        int: 新下载的图片数
+    """
+    soup = BeautifulSoup(str(content), 'html.parser')
+    source_urls = []
+    for img in soup.find_all('img'):
+        # 不改写地址，original 档位选择最大的 srcset 图片
+        success, source_url, _, _ = process_single_image(img, base_url, None, False, 'original', None, 'pdf')
+        # 只保存过改写后的缩小变体时仍下载原图，original 档位需要原图
+        if success and source_url not in source_urls and source_url not in assets.assets:
+            source_urls.append(source_url)
+    if not source_urls:
+        return 0
+
+    def prefetch(source_url):
+        try:
+            if fetch_image(source_url, assets):
+                assets.record_source(source_url)
+        except Exception as e:
+            logger.warning(f"预取快照图片失败 {source_url}: {str(e)}")
+
+    with ThreadPoolExecutor(max_workers=min(16, len(source_urls))) as executor:
+        list(executor.map(propagate(prefetch), source_urls))
+    logger.info(f"已预取快照图片: {len(source_urls)} 张")
+    return len(source_urls)
+
+def process_images_in_content(content, base_url, save_dir, save_img, image_profile=None, image_rewrites=None, output_format=None, assets=None):
     """处理文章内容中的图片，使用并行处理提高性能"""
     start_time = time.time()
     logger.info("=== 开始并行处理文章中的图片 ===")
     
-    if isinstance(content, str):
-        soup = BeautifulSoup(content, 'html.parser')
-    else:
-        soup = content
-        
+    # 多种格式并行保存同一篇文章，每种格式在自己的副本上改写图片，不修改共享的文章内容
+    soup = BeautifulSoup(str(content), 'html.parser')
+
     images = soup.find_all('img')
     if not images:
         return str(soup)
@@ -467,26 +738,35 @@ def process_images_in_content(content, base_url, save_dir, save_img):
     os.makedirs(images_dir, exist_ok=True)
     
     processing_times = []
+    # 排队和处理中的图片数
+    pending = PENDING_TASKS.labels('image')
     
     def process_image_wrapper(img):
         try:                
-            success, old_src, new_src, process_time = process_single_image(img, base_url, images_dir, save_img)   
-            logger.info(f"图片处理结果: {success}, 原始URL: {old_src}, 新URL: {new_src}, 处理时间: {process_time:.2f}秒")
+            success, old_src, new_src, process_time = process_single_image(img, base_url, images_dir, save_img, image_profile, image_rewrites, output_format, assets)
+            image_logger.info("图片处理结果: %s, 原始URL: %s, 新URL: %s, 处理时间: %.2f秒", success, old_src, new_src, process_time)
             processing_times.append(process_time)
             if success and new_src:
                 img['src'] = new_src
                 # 移除其他可能的图片源属性
-                for attr in ['data-src', 'data-original-src', 'data-backgroud', 'data-original']:
+                for attr in ['data-src', 'data-original-src', 'data-backgroud', 'data-original', 'sizes'] + SRCSET_ATTRS:
                     if attr in img.attrs:
                         del img[attr]
+                # 移除 <picture> 中的 <source>，确保使用处理后的图片
+                if img.parent is not None and img.parent.name == 'picture':
+                    for source in img.parent.find_all('source'):
+                        source.decompose()
 
         except Exception as e:
             logger.error(f"处理图片时出错: {str(e)}")
             logger.error(f"问题图片标签: {img}")
+        finally:
+            pending.dec()
     
     # 使用线程池并行处理图片
+    pending.inc(len(images))
     with ThreadPoolExecutor(max_workers=min(32, len(images))) as executor:
-        list(executor.map(process_image_wrapper, images))
+        list(executor.map(propagate(process_image_wrapper), images))
     
     total_time = time.time() - start_time
     if processing_times:
@@ -498,12 +778,10 @@ def process_images_in_content(content, base_url, save_dir, save_img):
         max_time = 0
         parallel_efficiency = 0
     
-    logger.info(f"=== 图片处理完成 ===")
-    logger.info(f"总图片数: {len(images)}")
-    logger.info(f"总处理时间: {total_time:.2f}秒")
-    logger.info(f"平均处理时间: {avg_time:.2f}秒/图片")
-    logger.info(f"最长处理时间: {max_time:.2f}秒")
-    logger.info(f"并行处理效率提升: {parallel_efficiency:.1f}倍")
+    logger.info(
+        "图片处理完成: 总图片数 %d, 总处理时间 %.2f秒, 平均 %.2f秒/图片, 最长 %.2f秒, 并行效率 %.1f倍",
+        len(images), total_time, avg_time, max_time, parallel_efficiency
+    )
     
     return str(soup)
 
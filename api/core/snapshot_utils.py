@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""文章快照
+
+解析完成后在文章目录中保存快照，之后新增导出格式时直接从快照渲染，不需要再次请求原站：
+    snapshot.json.gz  正文HTML、元数据、CSS样式和图片资源映射
+    assets/           导出过程中下载的图片原始数据，文件名为图片URL的摘要
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import time
+from threading import Lock
+from .log_utils import logger
+
+SNAPSHOT_FILE = 'snapshot.json.gz'
+
+ASSETS_DIR = 'assets'
+
+SNAPSHOT_VERSION = 1
+
+class AssetStore:
+    """快照图片资源：URL -> 本地保存的原始图片数据
+
+    解析时记录每张下载的图片；从快照渲染时使用 offline 模式，只读取本地资源，不访问网络。
+    sources 记录改写前的图片地址到实际下载地址的映射，换用其他图片档位渲染时，
+    改写后的地址没有下载过，可以通过原始地址找到已保存的图片。
+    """
+
+    def __init__(self, root, assets=None, sources=None, offline=False):
+        """初始化资源存储
+        Args:
+            root: 资源目录
+            assets: 已有的资源映射，URL -> {file, content_type, size}
+            sources: 已有的原始地址映射，改写前地址 -> 下载地址
+            offline: 是否只使用本地资源
+        """
+        self.root = str(root)
+        self.assets = dict(assets or {})
+        self.sources = dict(sources or {})
+        self.offline = offline
+        self._lock = Lock()
+
+    def get(self, url):
+        """读取本地保存的图片
+        Returns:
+            tuple: (图片数据, content_type)，没有保存时返回 None
+        """
+        asset = self.assets.get(url)
+        if not asset:
+            return None
+        try:
+            with open(os.path.join(self.root, asset['file']), 'rb') as f:
+                return f.read(), asset['content_type']
+        except OSError:
+            return None
+
+    def put(self, url, data, content_type):
+        """保存下载的图片原始数据"""
+        file_name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, file_name), 'wb') as f:
+                f.write(data)
+        except OSError as e:
+            logger.warning(f"保存快照图片失败 {url}: {str(e)}")
+            return
+        with self._lock:
+            self.assets[url] = {'file': file_name, 'content_type': content_type, 'size': len(data)}
+
+    def resolve(self, url, source_url):
+        """获取实际使用的图片地址
+        Args:
+            url: 按平台规则改写后的图片地址
+            source_url: 改写前的图片地址
+        Returns:
+            str: 已保存过该地址时原样返回；离线模式下使用同一原始地址已保存的图片地址，
+                 没有记录时使用保存过的原图
+        """
+        with self._lock:
+            if url in self.assets:
+                self.sources.setdefault(source_url, url)
+                return url
+            if self.offline:
+                if self.sources.get(source_url) in self.assets:
+                    return self.sources[source_url]
+                if source_url in self.assets:
+                    return source_url
+            self.sources.setdefault(source_url, url)
+            return url
+
+    def record_source(self, source_url):
+        """记录已保存原图的原始地址，覆盖之前指向未下载变体的映射"""
+        with self._lock:
+            self.sources[source_url] = source_url
+
+def get_snapshot_path(snapshot_dir):
+    return os.path.join(str(snapshot_dir), SNAPSHOT_FILE)
+
+def has_snapshot(snapshot_dir):
+    """文章目录中是否有快照"""
+    return os.path.isfile(get_snapshot_path(snapshot_dir))
+
+def save_snapshot(snapshot_dir, url, parser, assets, content=None):
+    """保存文章快照
+    Args:
+        snapshot_dir: 文章目录
+        url: 文章URL
+        parser: 已完成解析的平台解析器
+        assets: 解析过程中使用的 AssetStore
+        content: 提取后、保存前的文章内容，默认使用 parser.content
+    """
+    snapshot = {
+        'version': SNAPSHOT_VERSION,
+        'url': url,
+        'platform_name': parser.platform_name,
+        'title': parser.title,
+        'author': parser.author,
+        'time': parser.time if isinstance(parser.time, str) or parser.time is None else str(parser.time),
+        'content': content if content is not None else str(parser.content),
+        'css': parser._css_styles,
+        'assets': assets.assets if assets else {},
+        'sources': assets.sources if assets else {},
+        'created': int(time.time()),
+    }
+    path = get_snapshot_path(snapshot_dir)
+    temp_path = path + '.tmp'
+    try:
+        with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        logger.info(f"文章快照已保存: {path}")
+    except OSError as e:
+        logger.error(f"保存文章快照失败 {path}: {str(e)}")
+
+def load_snapshot(snapshot_dir):
+    """读取文章快照，不存在或版本不兼容时返回 None"""
+    path = get_snapshot_path(snapshot_dir)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        return None
+    return snapshot
+
+def get_asset_store(snapshot_dir, snapshot=None, offline=False):
+    """创建文章目录对应的资源存储"""
+    snapshot = snapshot or {}
+    return AssetStore(
+        os.path.join(str(snapshot_dir), ASSETS_DIR),
+        snapshot.get('assets'),
+        snapshot.get('sources'),
+        offline
+    )
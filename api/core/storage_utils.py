@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""文章存储目录布局
+
+文章目录按 stable_id 前四位分为两级分片存放：temp/ab/cd/<stable_id>/，
+避免单个目录下出现大量子目录。每个分片目录下有一个 index.jsonl 索引文件，
+逐行记录该分片中的文章（stable_id、原始URL、创建时间）。
+
+旧版本的扁平布局 temp/<stable_id>/ 可以通过以下命令迁移：
+    python -m core.storage_utils migrate temp
+"""
+
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from .log_utils import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows 没有 fcntl，迁移不加锁
+    fcntl = None
+
+# 扁平布局下的文章目录名：16位十六进制 stable_id
+STABLE_ID_PATTERN = re.compile(r'^[0-9a-f]{16}$')
+
+INDEX_FILE = 'index.jsonl'
+
+# 迁移时持有的锁文件，多个 worker 同时启动时只有一个执行迁移
+MIGRATE_LOCK_FILE = '.migrate.lock'
+
+# 分片索引的锁文件，追加记录和整理索引互斥
+INDEX_LOCK_FILE = INDEX_FILE + '.lock'
+
+# 分片层级深度，条目目录位于根目录下第 SHARD_DEPTH + 1 层
+SHARD_DEPTH = 2
+
+def shard_parts(stable_id):
+    """获取 stable_id 对应的分片目录名列表，如 ['ab', 'cd']"""
+    return [stable_id[i * 2:i * 2 + 2] for i in range(SHARD_DEPTH)]
+
+def get_entry_dir(root, stable_id):
+    """获取文章目录路径：<root>/ab/cd/<stable_id>"""
+    return os.path.join(str(root), *shard_parts(stable_id), stable_id)
+
+def get_relative_entry_path(stable_id):
+    """获取文章目录相对根目录的URL路径：ab/cd/<stable_id>"""
+    return '/'.join(shard_parts(stable_id) + [stable_id])
+
+def create_entry_dir(root, stable_id, url=None):
+    """创建文章目录，首次创建时写入分片索引
+    Args:
+        root: 存储根目录
+        stable_id: 文章的 stable_id
+        url: 文章原始URL
+    Returns:
+        str: 文章目录路径
+    """
+    entry_dir = get_entry_dir(root, stable_id)
+    try:
+        os.makedirs(entry_dir)
+    except FileExistsError:
+        return entry_dir
+
+    _append_index(os.path.dirname(entry_dir), {
+        'id': stable_id,
+        'url': url,
+        'created': int(time.time()),
+    })
+    return entry_dir
+
+def _append_index(shard_dir, record):
+    """向分片索引追加一条记录，与整理索引互斥，整理时追加的记录不会丢失"""
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+    try:
+        with _exclusive_lock(os.path.join(shard_dir, INDEX_LOCK_FILE)):
+            with open(os.path.join(shard_dir, INDEX_FILE), 'a', encoding='utf-8') as f:
+                f.write(line)
+    except OSError as e:
+        logger.warning(f"写入分片索引失败 {shard_dir}: {str(e)}")
+
+def read_shard_index(shard_dir):
+    """读取分片索引，只返回目录仍然存在的文章
+    Returns:
+        dict: stable_id -> 索引记录
+    """
+    records = {}
+    index_path = os.path.join(shard_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        return records
+    with open(index_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if os.path.isdir(os.path.join(shard_dir, record.get('id', ''))):
+                records[record['id']] = record
+    return records
+
+def iter_shard_dirs(root):
+    """遍历所有最底层分片目录"""
+    dirs = [str(root)]
+    for _ in range(SHARD_DEPTH):
+        next_dirs = []
+        for parent in dirs:
+            if not os.path.isdir(parent):
+                continue
+            with os.scandir(parent) as it:
+                for item in it:
+                    if item.is_dir(follow_symlinks=False) and len(item.name) == 2:
+                        next_dirs.append(item.path)
+        dirs = next_dirs
+    return dirs
+
+def iter_entry_dirs(root):
+    """遍历所有文章目录"""
+    for shard_dir in iter_shard_dirs(root):
+        with os.scandir(shard_dir) as it:
+            for item in it:
+                if item.is_dir(follow_symlinks=False):
+                    yield item.path
+
+def compact_shard_index(shard_dir):
+    """重写分片索引，去掉已删除文章的记录，期间其他 worker 的追加写入等待锁"""
+    with _exclusive_lock(os.path.join(shard_dir, INDEX_LOCK_FILE)):
+        records = read_shard_index(shard_dir)
+        temp_path = os.path.join(shard_dir, INDEX_FILE + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            for record in records.values():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        os.replace(temp_path, os.path.join(shard_dir, INDEX_FILE))
+
+def resolve_legacy_path(relative_path):
+    """将扁平布局的相对路径转换为分片布局的相对路径
+    Args:
+        relative_path: 相对存储根目录的路径，如 "0123456789abcdef/CSDN-作者/文章.html"
+    Returns:
+        str: 分片布局下的相对路径，不是旧布局路径时原样返回
+    """
+    parts = relative_path.lstrip('/').split('/', 1)
+    if parts and STABLE_ID_PATTERN.match(parts[0]):
+        parts[0] = get_relative_entry_path(parts[0])
+        return '/'.join(parts)
+    return relative_path
+
+@contextmanager
+def _exclusive_lock(path):
+    """持有文件排他锁，其他进程在此等待"""
+    with open(path, 'a') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+def migrate_flat_layout(root):
+    """将扁平布局 <root>/<stable_id>/ 迁移为分片布局
+    多个 worker 进程同时启动时通过锁文件串行执行，已被其他进程迁移的目录直接跳过。
+    Returns:
+        int: 迁移的文章目录数
+    """
+    root = str(root)
+    if not os.path.isdir(root):
+        return 0
+    migrated = 0
+    with _exclusive_lock(os.path.join(root, MIGRATE_LOCK_FILE)):
+        with os.scandir(root) as it:
+            legacy_dirs = [item for item in it if item.is_dir(follow_symlinks=False) and STABLE_ID_PATTERN.match(item.name)]
+        for item in legacy_dirs:
+            target = get_entry_dir(root, item.name)
+            if os.path.exists(target):
+                # 新布局下已经有同一篇文章，旧目录直接删除
+                shutil.rmtree(item.path, ignore_errors=True)
+                continue
+            try:
+                created = int(item.stat().st_mtime)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.rename(item.path, target)
+            except FileNotFoundError:
+                # 旧目录已经被迁移
+                continue
+            except OSError:
+                if not os.path.isdir(target):
+                    raise
+                # 目标目录已经存在，视为已迁移
+                shutil.rmtree(item.path, ignore_errors=True)
+                continue
+            _append_index(os.path.dirname(target), {
+                'id': item.name,
+                'url': None,
+                'created': created,
+            })
+            migrated += 1
+    if migrated:
+        logger.info(f"已迁移 {migrated} 个文章目录到分片布局: {root}")
+    return migrated
+
+def main():
+    """命令行入口：python -m core.storage_utils migrate|compact <root>"""
+    if len(sys.argv) != 3 or sys.argv[1] not in ('migrate', 'compact'):
+        print("用法: python -m core.storage_utils migrate|compact <root>")
+        sys.exit(1)
+    command, root = sys.argv[1], sys.argv[2]
+    if command == 'migrate':
+        print(f"迁移文章目录数: {migrate_flat_layout(root)}")
+    else:
+        shard_dirs = iter_shard_dirs(root)
+        for shard_dir in shard_dirs:
+            compact_shard_index(shard_dir)
+        print(f"已整理分片索引数: {len(shard_dirs)}")
+
+if __name__ == '__main__':
+    main()
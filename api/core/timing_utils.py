@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""单次请求的耗时分解
+
+API 处理请求时通过 collect_timings() 开始收集，解析和保存模块用 span() 或 record_span()
+记录各阶段耗时，结果写入响应的 Server-Timing 头。当前没有在收集时（如命令行），记录操作直接跳过。
+
+收集器保存在 contextvar 中，线程池不会自动传递，提交到线程池的函数需要用 propagate() 包装。
+同名阶段的耗时累加，如每种格式分别处理图片时的 images。收集器同时记录正在处理该请求的线程，
+供 profile_utils 只采样该请求的调用栈。
+"""
+
+import time
+from contextlib import contextmanager
+from collections import Counter
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from threading import Lock, get_ident
+
+_current = ContextVar('blogkeeper_timings', default=None)
+
+# 输出时按处理流程排序，其余阶段（如 render_<格式>）按记录顺序排在后面
+STAGE_ORDER = ['fetch', 'parse', 'extract', 'css', 'images', 'prefetch']
+
+class RequestTimings:
+    """一次请求中各阶段的耗时（秒）"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.descriptions = {}
+        # 正在处理该请求的线程 ident -> 进入次数
+        self._threads = Counter()
+        self._lock = Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def describe(self, name, description):
+        """记录不带耗时的说明，如缓存来源"""
+        with self._lock:
+            self.descriptions[name] = description
+
+    def enter_thread(self):
+        with self._lock:
+            self._threads[get_ident()] += 1
+
+    def exit_thread(self):
+        with self._lock:
+            self._threads[get_ident()] -= 1
+            if self._threads[get_ident()] <= 0:
+                del self._threads[get_ident()]
+
+    def get_threads(self):
+        """正在处理该请求的线程 ident 集合"""
+        with self._lock:
+            return set(self._threads)
+
+    def to_dict(self):
+        """各阶段耗时（毫秒），包含总耗时 total"""
+        with self._lock:
+            names = sorted(self.spans, key=lambda name: STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER))
+            result = {name: round(self.spans[name] * 1000, 1) for name in names}
+        result['total'] = round((time.perf_counter() - self.start) * 1000, 1)
+        return result
+
+    def to_header(self):
+        """生成 Server-Timing 头，如 fetch;dur=120.5, render_html;dur=30.2, source;desc="snapshot" """
+        items = [f"{name};dur={duration}" for name, duration in self.to_dict().items()]
+        with self._lock:
+            items += [f'{name};desc="{description}"' for name, description in self.descriptions.items()]
+        return ', '.join(items)
+
+def get_timings():
+    """当前请求的收集器，没有在收集时返回 None"""
+    return _current.get()
+
+@contextmanager
+def collect_timings():
+    """开始收集当前请求的耗时分解
+    Yields:
+        RequestTimings: 收集器
+    """
+    timings = RequestTimings()
+    token = _current.set(timings)
+    timings.enter_thread()
+    try:
+        yield timings
+    finally:
+        timings.exit_thread()
+        _current.reset(token)
+
+@contextmanager
+def span(name):
+    """记录代码块的耗时"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+def record_span(name, seconds):
+    """记录已测得的耗时"""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+def describe(name, description):
+    """记录说明信息"""
+    timings = _current.get()
+    if timings is not None:
+        timings.describe(name, description)
+
+def propagate(func):
+    """包装提交到线程池的函数，使其记录到提交时所在请求的收集器
+
+    函数在提交时上下文的副本中运行，监控指标的平台标签等其他 contextvar 也一并传递。
+    """
+    context = copy_context()
+    timings = _current.get()
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if timings is not None:
+            timings.enter_thread()
+        try:
+            # 同一个包装函数会在多个线程中同时执行，每次调用使用上下文的副本
+            return context.copy().run(func, *args, **kwargs)
+        finally:
+            if timings is not None:
+                timings.exit_thread()
+    return wrapper
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 通用的跟踪参数，以 * 结尾表示前缀匹配
+TRACKING_PARAMS = [
+    'utm_*', 'spm', 'spm_id_from', 'fbclid', 'gclid', 'share_token', 'share_source', 'share_from',
+]
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+def _is_tracking_param(name, tracking_params):
+    for pattern in tracking_params:
+        if pattern.endswith('*'):
+            if name.startswith(pattern[:-1]):
+                return True
+        elif name == pattern:
+            return True
+    return False
+
+def canonicalize_url(url, keep_params=None, tracking_params=None, host_aliases=None):
+    """规范化文章URL，同一篇文章的不同分享链接得到相同的结果
+    Args:
+        url: 原始URL
+        keep_params: 只保留的查询参数列表，None 表示保留除跟踪参数外的全部参数，[] 表示去掉全部参数
+        tracking_params: 去掉的跟踪参数，默认为 TRACKING_PARAMS
+        host_aliases: 主机名别名映射，如 {'m.blog.csdn.net': 'blog.csdn.net'}
+    Returns:
+        str: 规范化后的URL：协议和主机名小写，去掉默认端口、锚点和跟踪参数，剩余参数按名称排序
+    """
+    tracking_params = TRACKING_PARAMS if tracking_params is None else tracking_params
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+
+    host = (parts.hostname or '').rstrip('.')
+    host = (host_aliases or {}).get(host, host)
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path or '/'
+
+    params = []
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        if keep_params is not None:
+            if name in keep_params:
+                params.append((name, value))
+        elif not _is_tracking_param(name, tracking_params):
+            params.append((name, value))
+    params.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(params), ''))
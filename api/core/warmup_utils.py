@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""服务启动预热
+
+部署后的第一批请求需要导入解析器模块、查找 wkhtmltopdf、读取样式文件、建立到原站和图片CDN的连接，
+延迟明显高于稳定状态。服务启动时在后台依次执行：
+    renderer  查找并缓存 wkhtmltopdf 路径
+    css       读取内置样式文件
+    parsers   导入并实例化所有已启用的平台解析器
+    connect   预先建立到常用主机的连接（配置了主机时）
+    render    从内置示例文章快照离线渲染各导出格式（配置了格式时）
+全部完成后才报告就绪。单个阶段失败只记录在报告中，不影响就绪。
+"""
+
+import io
+import os
+import tempfile
+import time
+from threading import Lock, Thread
+from .log_utils import logger
+
+# 内置示例文章，按 CSDN 文章渲染
+WARMUP_FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'warmup_article.html')
+WARMUP_URL = 'https://blog.csdn.net/blogkeeper/article/details/1'
+WARMUP_IMAGE_URL = 'https://img-blog.csdnimg.cn/blogkeeper/warmup.png'
+
+def warm_renderer():
+    """查找 wkhtmltopdf 并缓存路径"""
+    from .save_utils import get_wkhtmltopdf_path
+    # PDF转换时才导入 pdfkit，预热时提前导入
+    import pdfkit
+    return get_wkhtmltopdf_path()
+
+def warm_css():
+    """读取所有内置样式文件
+    Returns:
+        int: 样式文件数量
+    """
+    from .base_parser import CSS_DIR, read_css_file
+    names = sorted(name for name in os.listdir(CSS_DIR) if name.endswith('.css'))
+    for name in names:
+        read_css_file(os.path.join(CSS_DIR, name))
+    return len(names)
+
+def warm_parsers():
+    """导入并实例化所有已启用的平台解析器
+    Returns:
+        list: 平台名称
+    """
+    from .blog_parser import PLATFORM_PLUGINS, load_parser_class
+    return [load_parser_class(plugin['parser'])().platform_name for plugin in PLATFORM_PLUGINS]
+
+def warm_connections(hosts):
+    """预先建立到常用主机的连接
+    Returns:
+        dict: 主机名 -> 是否连接成功
+    """
+    from .http_utils import preconnect
+    return preconnect(hosts)
+
+def _create_warmup_image():
+    """生成示例图片，宽度超过所有图片档位，渲染时会经过缩放和重新编码"""
+    from PIL import Image
+    image = Image.new('RGB', (2400, 1350), (64, 128, 192))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+def render_fixture(formats, image_profile=None):
+    """将示例文章保存为快照并离线渲染
+    Args:
+        formats: 导出格式列表，如 ['html', 'markdown', 'pdf', 'mhtml']
+        image_profile: 图片输出档位
+    Returns:
+        dict: 格式 -> 文件大小
+    """
+    from .blog_parser import BlogParser
+    from .metrics_utils import suppress_metrics
+    from .snapshot_utils import get_asset_store, save_snapshot
+
+    with open(WARMUP_FIXTURE, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    with tempfile.TemporaryDirectory(prefix='blogkeeper-warmup-') as snapshot_dir:
+        blog_parser = BlogParser()
+        parser = blog_parser.resolve_parser(WARMUP_URL)
+        parser.title = '启动预热示例文章'
+        parser.author = 'BlogKeeper'
+        parser.time = '2025-01-01'
+        parser.content = content
+        parser._css_styles = parser._get_platform_css()
+
+        assets = get_asset_store(snapshot_dir)
+        assets.put(WARMUP_IMAGE_URL, _create_warmup_image(), 'image/png')
+        assets.resolve(WARMUP_IMAGE_URL, WARMUP_IMAGE_URL)
+        save_snapshot(snapshot_dir, WARMUP_URL, parser, assets)
+
+        # 示例文章的渲染不计入监控指标
+        with suppress_metrics():
+            blog_parser.render(snapshot_dir, {'formats': formats, 'image_profile': image_profile})
+        rendered = {file_info['format']: file_info['size'] for file_info in blog_parser.base_parser.file_list}
+
+    missing = [fmt for fmt in formats if fmt not in rendered]
+    if missing:
+        raise RuntimeError(f"示例文章渲染失败的格式: {missing}")
+    return rendered
+
+class Warmup:
+    """启动预热任务及其就绪状态"""
+
+    def __init__(self, hosts=None, formats=None, image_profile=None):
+        """初始化预热任务
+        Args:
+            hosts: 预先建立连接的主机名列表，为空时跳过
+            formats: 示例文章渲染的导出格式，为空时跳过
+            image_profile: 示例文章渲染使用的图片档位
+        """
+        self.hosts = list(hosts or [])
+        self.formats = list(formats or [])
+        self.image_profile = image_profile
+        # pending、running、ready
+        self.state = 'pending'
+        self.stages = {}
+        self.seconds = None
+        self._lock = Lock()
+
+    def _run_stage(self, name, func, *args):
+        start = time.time()
+        try:
+            result = func(*args)
+            stage = {'ok': True, 'result': result}
+        except Exception as e:
+            logger.warning(f"预热阶段 {name} 失败: {str(e)}")
+            stage = {'ok': False, 'error': str(e)}
+        stage['seconds'] = round(time.time() - start, 3)
+        with self._lock:
+            self.stages[name] = stage
+
+    def run(self):
+        """依次执行各预热阶段，完成后标记为就绪"""
+        start = time.time()
+        with self._lock:
+            self.state = 'running'
+        logger.info("开始启动预热")
+
+        self._run_stage('renderer', warm_renderer)
+        self._run_stage('css', warm_css)
+        self._run_stage('parsers', warm_parsers)
+        if self.hosts:
+            self._run_stage('connect', warm_connections, self.hosts)
+        if self.formats:
+            self._run_stage('render', render_fixture, self.formats, self.image_profile)
+
+        with self._lock:
+            self.seconds = round(time.time() - start, 3)
+            self.state = 'ready'
+        logger.info(f"启动预热完成，耗时 {self.seconds:.2f} 秒")
+
+    def start(self):
+        """在后台线程中执行预热"""
+        Thread(target=self.run, name='warmup', daemon=True).start()
+
+    def skip(self):
+        """不预热，直接标记为就绪"""
+        with self._lock:
+            self.state = 'ready'
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def report(self):
+        """预热状态报告"""
+        with self._lock:
+            return {
+                'ready': self.state == 'ready',
+                'state': self.state,
+                'seconds': self.seconds,
+                'stages': dict(self.stages),
+            }
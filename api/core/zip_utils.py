@@ -0,0 +1,293 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import tarfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from .log_utils import logger
+
+# 每次从磁盘读取的块大小
+CHUNK_SIZE = 64 * 1024
+
+# 每个压缩包预先并行压缩的文件总大小上限，压缩结果在输出前保存在内存中
+PREFETCH_BYTES = 16 * 1024 * 1024
+
+# 超过该大小的文件不提交到线程池，在调用线程中边压缩边输出
+PARALLEL_MAX_SIZE = 4 * 1024 * 1024
+
+# 所有请求共用的压缩线程池，线程数等于CPU核数
+_deflate_executor = None
+_deflate_executor_lock = threading.Lock()
+
+# 不使用 ZIP64 扩展时单个字段能表示的最大值
+ZIP_MAX_SIZE = 0xFFFFFFFF
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+
+# 已经压缩过的格式直接存储，再做 deflate 只会浪费CPU
+STORED_EXTENSIONS = {
+    '.pdf', '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif',
+    '.zip', '.gz', '.zst', '.mp3', '.mp4',
+}
+
+# 通用标志位：bit 3 表示大小和CRC写在数据之后的数据描述符中，bit 11 表示文件名为UTF-8
+_FLAGS = 0x0808
+_VERSION = 20
+
+ARCHIVE_FORMATS = {
+    'zip': {'extension': '.zip', 'media_type': 'application/zip'},
+    'tar.zst': {'extension': '.tar.zst', 'media_type': 'application/zstd'},
+}
+
+def _dos_datetime(timestamp):
+    """将时间戳转换为ZIP使用的DOS日期和时间"""
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    return dos_time, dos_date
+
+def get_compress_type(filename):
+    """根据文件扩展名选择压缩方式"""
+    extension = os.path.splitext(filename)[1].lower()
+    return ZIP_STORED if extension in STORED_EXTENSIONS else ZIP_DEFLATED
+
+def zstd_available():
+    """是否安装了 zstandard，未安装时无法生成 tar.zst"""
+    try:
+        import zstandard
+        return True
+    except ImportError:
+        return False
+
+def check_zip_size(paths):
+    """检查文件总大小是否超出ZIP格式（非ZIP64）的限制
+    Args:
+        paths: 文件路径列表
+    Raises:
+        ValueError: 文件总大小超出限制时抛出
+    """
+    total = sum(os.path.getsize(path) for path in paths)
+    # 预留 deflate 对不可压缩数据的膨胀以及文件头、中央目录的空间
+    if total + total // 1000 + len(paths) * 1024 >= ZIP_MAX_SIZE:
+        raise ValueError(f"文件总大小 {total} 字节超出ZIP限制")
+
+def get_deflate_executor():
+    """获取所有请求共用的压缩线程池"""
+    global _deflate_executor
+    with _deflate_executor_lock:
+        if _deflate_executor is None:
+            _deflate_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='deflate')
+        return _deflate_executor
+
+def _deflate_file(path, compress_level, chunk_size):
+    """在工作线程中压缩整个文件（zlib 压缩时会释放GIL，可以利用多核）
+    Returns:
+        tuple: (CRC, 原始大小, 压缩数据块列表)
+    """
+    state = {'crc': 0, 'size': 0}
+    chunks = list(_deflate_chunks(path, compress_level, chunk_size, state))
+    return state['crc'], state['size'], chunks
+
+def _read_stored_file(path, chunk_size, state):
+    """按块读取需要直接存储的文件，同时计算CRC和大小"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            state['size'] += len(chunk)
+            state['crc'] = zlib.crc32(chunk, state['crc'])
+            yield chunk
+
+def _deflate_chunks(path, compress_level, chunk_size, state):
+    """按块读取并压缩文件，同时计算CRC和原始大小"""
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    for chunk in _read_stored_file(path, chunk_size, state):
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE, compress_level=6, max_workers=None):
+    """流式生成ZIP文件
+    按顺序输出本地文件头、文件数据和数据描述符，最后输出中央目录。
+    PDF、图片等已压缩格式直接存储并边读边输出；HTML、Markdown、MHTML 等文本格式
+    提前提交到共用线程池并行压缩，预先压缩的文件总大小不超过 PREFETCH_BYTES；
+    超过 PARALLEL_MAX_SIZE 的文件在调用线程中边压缩边输出，内存占用与文件大小无关。
+    Args:
+        entries: (压缩包内文件名, 磁盘文件路径) 元组列表
+        chunk_size: 每次读取的块大小
+        compress_level: deflate 压缩级别
+        max_workers: 并行压缩线程数，默认使用共用线程池；为 1 时所有文件都在调用线程中压缩
+    Yields:
+        bytes: ZIP文件数据块
+    """
+    entries = [(arcname, path, os.path.getsize(path)) for arcname, path in entries]
+    if max_workers is None:
+        executor, own_executor = get_deflate_executor(), False
+    elif max_workers > 1:
+        executor, own_executor = ThreadPoolExecutor(max_workers=max_workers), True
+    else:
+        executor, own_executor = None, False
+    # 已提交的压缩任务：压缩包内序号 -> (Future, 文件大小)
+    pending = {}
+    prefetched_bytes = 0
+    next_index = 0
+
+    def is_parallel(arcname, size):
+        return executor is not None and get_compress_type(arcname) == ZIP_DEFLATED and size <= PARALLEL_MAX_SIZE
+
+    def submit_ahead():
+        nonlocal next_index, prefetched_bytes
+        while next_index < len(entries):
+            arcname, path, size = entries[next_index]
+            if is_parallel(arcname, size):
+                if prefetched_bytes + size > PREFETCH_BYTES:
+                    break
+                pending[next_index] = (executor.submit(_deflate_file, path, compress_level, chunk_size), size)
+                prefetched_bytes += size
+            next_index += 1
+
+    central_directory = []
+    offset = 0
+    try:
+        for index, (arcname, path, _) in enumerate(entries):
+            submit_ahead()
+            name = arcname.encode('utf-8')
+            compress_type = get_compress_type(arcname)
+            dos_time, dos_date = _dos_datetime(os.path.getmtime(path))
+
+            # 1. 本地文件头，CRC和大小先写0，实际值写入数据描述符
+            header = struct.pack(
+                '<IHHHHHIIIHH',
+                0x04034b50, _VERSION, _FLAGS, compress_type, dos_time, dos_date,
+                0, 0, 0, len(name), 0
+            ) + name
+            yield header
+
+            # 2. 文件数据
+            compressed_size = 0
+            if index in pending:
+                future, size = pending.pop(index)
+                crc, file_size, chunks = future.result()
+                prefetched_bytes -= size
+                for data in chunks:
+                    compressed_size += len(data)
+                    yield data
+            else:
+                state = {'crc': 0, 'size': 0}
+                if compress_type == ZIP_DEFLATED:
+                    chunks = _deflate_chunks(path, compress_level, chunk_size, state)
+                else:
+                    chunks = _read_stored_file(path, chunk_size, state)
+                for data in chunks:
+                    compressed_size += len(data)
+                    yield data
+                crc, file_size = state['crc'], state['size']
+
+            # 3. 数据描述符
+            descriptor = struct.pack('<IIII', 0x08074b50, crc, compressed_size, file_size)
+            yield descriptor
+
+            central_directory.append(struct.pack(
+                '<IHHHHHHIIIHHHHHII',
+                0x02014b50, _VERSION, _VERSION, _FLAGS, compress_type, dos_time, dos_date,
+                crc, compressed_size, file_size, len(name), 0, 0, 0, 0,
+                0o644 << 16, offset
+            ) + name)
+            offset += len(header) + compressed_size + len(descriptor)
+    finally:
+        # 客户端提前断开时取消尚未开始的压缩任务
+        for future, _ in pending.values():
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # 4. 中央目录和结束记录
+    central_directory_size = sum(len(record) for record in central_directory)
+    yield b''.join(central_directory)
+    yield struct.pack(
+        '<IHHHHIIH',
+        0x06054b50, 0, 0, len(central_directory), len(central_directory),
+        central_directory_size, offset, 0
+    )
+
+class _ChunkBuffer:
+    """收集压缩器输出的数据块，供生成器逐块取出"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def stream_tar_zst(entries, chunk_size=CHUNK_SIZE, compress_level=3):
+    """流式生成 tar.zst 文件，zstd 使用多线程压缩
+    Args:
+        entries: (压缩包内文件名, 磁盘文件路径) 元组列表
+        chunk_size: 每次读取的块大小
+        compress_level: zstd 压缩级别
+    Yields:
+        bytes: tar.zst 文件数据块
+    """
+    import zstandard
+
+    buffer = _ChunkBuffer()
+    compressor = zstandard.ZstdCompressor(level=compress_level, threads=-1)
+    writer = compressor.stream_writer(buffer, closefd=False)
+
+    for arcname, path in entries:
+        stat = os.stat(path)
+        info = tarfile.TarInfo(arcname)
+        info.size = stat.st_size
+        info.mtime = int(stat.st_mtime)
+        info.mode = 0o644
+        writer.write(info.tobuf(tarfile.PAX_FORMAT, 'utf-8'))
+
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                data = buffer.drain()
+                if data:
+                    yield data
+
+        # tar 以 512 字节为块，文件内容需要补齐
+        remainder = stat.st_size % tarfile.BLOCKSIZE
+        if remainder:
+            writer.write(tarfile.NUL * (tarfile.BLOCKSIZE - remainder))
+
+    # tar 结束标记为两个空块
+    writer.write(tarfile.NUL * (tarfile.BLOCKSIZE * 2))
+    writer.flush(zstandard.FLUSH_FRAME)
+    yield buffer.drain()
+
+def stream_archive(entries, archive_format='zip'):
+    """按格式流式生成压缩包，未安装 zstandard 时 tar.zst 回退为 zip
+    Returns:
+        tuple: (数据块生成器, 实际使用的压缩包格式)
+    """
+    if archive_format == 'tar.zst':
+        if zstd_available():
+            return stream_tar_zst(entries), 'tar.zst'
+        logger.warning("未安装 zstandard，tar.zst 回退为 zip")
+
+    check_zip_size([path for _, path in entries])
+    return stream_zip(entries), 'zip'
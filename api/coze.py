@@ -48,7 +48,9 @@ async def main(args: Args) -> Output:
                 "files": API_URL + first_result['download_url'],
                 "title": first_result['title'],
                 "message": f"解析成功：{first_result['title']}",
-                "file_content": first_result['file_content']
+                "file_content": first_result['file_content'],
+                # 服务端各阶段耗时，如 fetch;dur=120.5, render_html;dur=30.2
+                "server_timing": getattr(response, 'headers', {}).get('Server-Timing', '')
             }
         else:
             return {
@@ -1,5 +1,8 @@
-from typing import Optional, Dict, Any
-from fastapi import HTTPException
+from typing import Optional, Dict, Any, TYPE_CHECKING
+
+# 命令行入口也会导入错误类型，FastAPI 只在转换为 HTTPException 时导入
+if TYPE_CHECKING:
+    from fastapi import HTTPException
 
 class BlogKeeperError(Exception):
     """基础错误类"""
@@ -25,11 +28,13 @@ class BlogKeeperError(Exception):
             "suggestion": self.suggestion
         }
 
-    def to_http_exception(self) -> HTTPException:
+    def to_http_exception(self, headers: Optional[Dict[str, str]] = None) -> "HTTPException":
         """转换为FastAPI的HTTPException"""
+        from fastapi import HTTPException
         return HTTPException(
             status_code=self.status_code,
-            detail=self.to_dict()
+            detail=self.to_dict(),
+            headers=headers
         )
 
 class NetworkError(BlogKeeperError):
@@ -73,6 +78,16 @@ class PlatformError(BlogKeeperError):
             suggestion=f""
         )
 
+class UnsupportedPageError(BlogKeeperError):
+    """平台支持但页面不是文章页的错误"""
+    def __init__(self, url: str, platform: str):
+        super().__init__(
+            message=f"不支持的页面: {url}，{platform} 只支持文章页",
+            error_type="UnsupportedPageError",
+            status_code=400,
+            suggestion="请使用文章详情页的链接"
+        )
+
 class FormatError(BlogKeeperError):
     """格式转换错误"""
     def __init__(self, message: str, supported_formats: list = None):
@@ -84,6 +99,16 @@ class FormatError(BlogKeeperError):
             suggestion=f"目前支持以下格式：{formats_str}"
         )
 
+class SnapshotError(BlogKeeperError):
+    """文章快照不存在错误"""
+    def __init__(self, message: str):
+        super().__init__(
+            message=message,
+            error_type="SnapshotError",
+            status_code=404,
+            suggestion="请先通过 /parse 归档该文章"
+        )
+
 class ServerError(BlogKeeperError):
     """服务器内部错误"""
     def __init__(self, message: str):
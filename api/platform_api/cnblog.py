@@ -11,6 +11,7 @@ from typing import List, Dict, Optional
 from core.base_parser import BaseBlogParser
 from urllib.parse import urlparse
 from core.log_utils import logger
+from core.http_utils import http_get
 
 class CNBlogParser(BaseBlogParser):
     def __init__(self):
@@ -50,6 +51,13 @@ class CNBlogParser(BaseBlogParser):
             ]
         })
 
+        # 博客园图片存储在阿里云OSS（img2024.cnblogs.com、images.cnblogs.com 等），支持 x-oss-process 生成缩略图；
+        # 只匹配图片域名，www.cnblogs.com 的页面和样式地址不改写
+        self.image_rewrites = [
+            {'host_pattern': r'(img|images)\d*\.cnblogs\.com', 'query': {'x-oss-process': 'image/resize,m_lfit,w_{width}'},
+             'formats': ['html', 'markdown', 'pdf', 'mhtml']},
+        ]
+
     def _parse_post_item(self, article) -> Dict:
         """解析单个文章项的信息"""
         try:
@@ -147,7 +155,7 @@ class CNBlogParser(BaseBlogParser):
             
             logger.debug(f"正在获取第 {page} 页...")
             try:
-                response = requests.get(current_url)
+                response = http_get(current_url)
                 if response.status_code != 200:
                     logger.warning(f"获取页面失败: {response.status_code}")
                     break
@@ -29,4 +29,15 @@ class CSDNParser(BaseBlogParser):
             'date': [
                 ('span', {'class': 'time'}),
             ]
-        })
\ No newline at end of file
+        })
+
+        # 文章由路径确定，查询参数（spm、utm_* 等）都是跟踪参数
+        self.keep_params = []
+        self.host_aliases = {'m.blog.csdn.net': 'blog.csdn.net'}
+
+        # CSDN图片存储在阿里云OSS，支持 x-oss-process 按宽度缩放；
+        # 各格式都按档位宽度缩放，original 档位不缩放，PDF 和 MHTML 保留原图
+        self.image_rewrites = [
+            {'hosts': ['csdnimg.cn'], 'query': {'x-oss-process': 'image/resize,m_lfit,w_{width}'},
+             'formats': ['html', 'markdown', 'pdf', 'mhtml']},
+        ]
\ No newline at end of file
@@ -7,6 +7,7 @@ import os
 from datetime import datetime
 from core.base_parser import BaseBlogParser
 from core.log_utils import logger
+from core.http_utils import http_get
 import time
 import random
 
@@ -58,7 +59,7 @@ class RuanYiFengParser(BaseBlogParser):
             # 访问主页
             main_url = 'https://www.ruanyifeng.com/'
             self._headers['Referer'] = 'https://www.google.com/'
-            response = self._session.get(main_url, headers=self._headers, timeout=30)
+            response = http_get(main_url, session=self._session, headers=self._headers, timeout=30)
             response.raise_for_status()
             
             # 随机延迟
@@ -67,7 +68,7 @@ class RuanYiFengParser(BaseBlogParser):
             # 访问博客首页
             blog_url = 'https://www.ruanyifeng.com/blog/'
             self._headers['Referer'] = main_url
-            response = self._session.get(blog_url, headers=self._headers, timeout=30)
+            response = http_get(blog_url, session=self._session, headers=self._headers, timeout=30)
             response.raise_for_status()
             
             logger.info("成功初始化会话和cookies")
@@ -92,7 +93,7 @@ class RuanYiFengParser(BaseBlogParser):
             # 打印当前的cookies
             logger.info(f"Current cookies: {dict(self._session.cookies)}")
             
-            response = self._session.get(url, headers=self._headers, timeout=30)
+            response = http_get(url, session=self._session, headers=self._headers, timeout=30)
             response.raise_for_status()
             response.encoding = 'utf-8'
             self.base_html = response.text
@@ -38,6 +38,11 @@ class SSPaiParser(BaseBlogParser):
             'Referer': 'https://sspai.com/',
         })
 
+        # 少数派图片CDN（cdnfile.sspai.com）通过路径后缀返回 webp 变体，只用于 HTML 和 Markdown
+        self.image_rewrites = [
+            {'hosts': ['cdnfile.sspai.com'], 'suffix': '/format/webp', 'formats': ['html', 'markdown']},
+        ]
+
     def _extract_date(self, soup):
         """提取文章发布日期
         
@@ -29,4 +29,13 @@ class WeChatParser(BaseBlogParser):
             'date': [
                 ('em', {'id': 'publish_time'}),
             ]
-        })
\ No newline at end of file
+        })
+
+        # 文章由 __biz、mid、idx、sn 确定，chksm、scene 等分享参数每次都不同
+        self.keep_params = ['__biz', 'mid', 'idx', 'sn']
+
+        # 微信图片CDN支持通过 tp 参数返回 webp 变体，只用于在浏览器中查看的 HTML 和 Markdown；
+        # PDF 和 MHTML 使用原格式，避免多一次 webp 解码和重新编码
+        self.image_rewrites = [
+            {'hosts': ['mmbiz.qpic.cn'], 'query': {'tp': 'webp'}, 'formats': ['html', 'markdown']},
+        ]
\ No newline at end of file
@@ -7,6 +7,7 @@ import json
 from datetime import datetime
 from core.base_parser import BaseBlogParser
 from core.log_utils import logger
+from core.http_utils import http_get, create_session
 import requests
 from urllib.parse import urlparse
 import time
@@ -19,10 +20,13 @@ class ZhihuParser(BaseBlogParser):
         self.platform_name = "知乎"
         self.platform_flag = "zhihu"
         
+        # 文章由路径确定，查询参数都是分享跟踪参数
+        self.keep_params = []
+
         self.config = ConfigManager()
         
         # 设置会话
-        self._session = requests.Session()
+        self._session = create_session()
         cookies = self.config.get_cookies(self.platform_flag)
         if cookies:
             self._session.cookies.update(cookies)
@@ -95,8 +99,9 @@ class ZhihuParser(BaseBlogParser):
             response = None
             for i in range(retry_times):
                 try:
-                    response = self._session.get(
-                        api_url, 
+                    response = http_get(
+                        api_url,
+                        session=self._session,
                         headers=headers, 
                         cookies=cookies,
                         timeout=timeout,
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""API 测试的公共夹具：在临时工作目录中启动 API，原站请求转发到本地替身服务器"""
+
+import os
+import sys
+
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+@pytest.fixture(scope='session')
+def client(tmp_path_factory):
+    from fastapi.testclient import TestClient
+    from benchmarks.fixture_server import start_server
+
+    server, origin = start_server()
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.chdir(tmp_path_factory.mktemp('api'))
+    monkeypatch.setenv('ORIGIN_OVERRIDE', origin)
+    monkeypatch.setenv('WARMUP_ENABLED', 'false')
+    monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+    import api
+    try:
+        with TestClient(api.app) as test_client:
+            yield test_client
+    finally:
+        monkeypatch.undo()
+        server.shutdown()
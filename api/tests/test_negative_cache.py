@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""失败缓存：受支持平台上的非文章页只缓存该页面，不影响同一平台的其他文章"""
+
+def parse(client, url):
+    return client.post('/parse', json={'url': url, 'formats': ['md'], 'fileContent': False})
+
+def test_unsupported_page_does_not_block_platform(client):
+    assert parse(client, 'https://blog.csdn.net/blogkeeper/article/details/1').status_code == 200
+
+    response = parse(client, 'https://blog.csdn.net/blogkeeper')
+    assert response.status_code == 400
+    assert response.json()['detail']['type'] == 'UnsupportedPageError'
+
+    # 同一平台的其他文章不受影响
+    response = parse(client, 'https://blog.csdn.net/blogkeeper/article/details/2')
+    assert response.status_code == 200
+    assert 'Retry-After' not in response.headers
+
+    # 同一页面再次请求时命中失败缓存
+    response = parse(client, 'https://blog.csdn.net/blogkeeper')
+    assert response.status_code == 400
+    assert 'Retry-After' in response.headers
+
+def test_unsupported_host_is_cached(client):
+    response = parse(client, 'https://unsupported.example.com/post/1')
+    assert response.status_code == 400
+    assert response.json()['detail']['type'] == 'PlatformError'
+
+    response = parse(client, 'https://unsupported.example.com/post/2')
+    assert response.status_code == 400
+    assert 'Retry-After' in response.headers
@@ -0,0 +1,23 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""文章快照：只导出 Markdown 后，从快照渲染的 MHTML 仍然内嵌全部图片"""
+
+from core.base_parser import wait_prefetch
+
+ARTICLE_URL = 'https://blog.csdn.net/blogkeeper/article/details/36'
+
+def test_render_mhtml_after_markdown_parse(client):
+    response = client.post('/parse', json={'url': ARTICLE_URL, 'formats': ['md'], 'fileContent': False})
+    assert response.status_code == 200
+    assert wait_prefetch(timeout=30)
+
+    response = client.post('/render', json={'url': ARTICLE_URL, 'formats': ['mhtml', 'html'], 'fileContent': False})
+    assert response.status_code == 200
+    files = {file_info['format']: file_info for file_info in response.json()}
+
+    mhtml = client.get(files['mhtml']['download_url']).text
+    image_parts = mhtml.count('Content-Type: image/')
+    assert image_parts == 8
+    # HTML 引用原站图片，不引用本地路径
+    html = client.get(files['html']['download_url']).text
+    assert 'images/img_' not in html